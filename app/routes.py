@@ -1,7 +1,39 @@
-from flask import Blueprint, render_template, request, jsonify
+import os
+import hmac
+import logging
+
+from flask import Blueprint, Response, abort, make_response, render_template, request, jsonify
+
+from metrics import profiler, registry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 bp = Blueprint('main', __name__)
 
+def require_token(env="API_TOKEN"):
+    """404 unless `env` is set and the request carries it as ?token=, so the route looks absent otherwise."""
+    token = os.getenv(env)
+    if not token or not hmac.compare_digest(request.args.get("token", ""), token):
+        abort(404)
+
+def bad_request(message):
+    """Stop the request with the routes' usual 400 JSON error."""
+    abort(make_response(jsonify({"status": "error", "message": message}), 400))
+
+def stored_strategy(payload):
+    """The strategy given inline, else the one stored for payload["user_id"] (token required)."""
+    strategy = payload.get("strategy")
+    if strategy is None and "user_id" in payload:
+        require_token()
+        from storage import get_store
+
+        try:
+            user_id = int(payload["user_id"])
+        except (KeyError, TypeError, ValueError):
+            bad_request("user_id must be an integer")
+        strategy = get_store().get_strategy(user_id)
+    return strategy
+
 @bp.route('/')
 def index():
     return render_template('form.html')
@@ -13,5 +45,102 @@ def form_test():
 @bp.route('/submit', methods=['POST'])
 def submit():
     data = request.form.to_dict()
-    print("✅ Received data:", data)
-    return jsonify({"status": "success", "data": data}), 200
\ No newline at end of file
+    logging.info(f"[web] Received form data: {data}")
+    return jsonify({"status": "success", "data": data}), 200
+
+@bp.route('/backtest', methods=['POST'])
+def run_backtest():
+    from backtest import DEFAULT_COST, backtest
+    from market_data import get_market_data
+
+    payload = request.get_json(silent=True) or {}
+    strategy = stored_strategy(payload)
+    if not strategy or not strategy.get("conditions"):
+        return jsonify({"status": "error", "message": "No strategy conditions given"}), 400
+    symbol = payload.get("symbol") or strategy.get("symbol", "EURUSD")
+    timeframe = payload.get("timeframe") or strategy.get("timeframe", "1h")
+    market = get_market_data()
+    if payload.get("refresh", True):
+        market.refresh([symbol], timeframe)
+    bars = market.bars(symbol, timeframe)
+    if bars.empty:
+        return jsonify({"status": "error", "message": f"No data for {symbol} {timeframe}"}), 404
+    try:
+        result = backtest(bars, strategy, cost=float(payload.get("cost", DEFAULT_COST)), timeframe=timeframe)
+    except (KeyError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "symbol": symbol, "timeframe": timeframe, "result": result}), 200
+
+@bp.route('/scan', methods=['POST'])
+def run_scan_route():
+    """Scan the symbol universe for a strategy's conditions; body like /backtest plus optional "symbols".
+
+    "symbols" narrows the scan to part of scanner.scan_universe(); it cannot add symbols,
+    so a request never makes the server fetch more than the configured universe.
+    """
+    from scanner import SCAN_LIMIT, run_scan, scan_universe
+
+    payload = request.get_json(silent=True) or {}
+    strategy = stored_strategy(payload)
+    if not strategy or not strategy.get("conditions"):
+        return jsonify({"status": "error", "message": "No strategy conditions given"}), 400
+    timeframe = payload.get("timeframe") or strategy.get("timeframe", "1h")
+    symbols = payload.get("symbols")
+    if symbols is not None:
+        universe = scan_universe()
+        if not isinstance(symbols, list) or not all(isinstance(s, str) for s in symbols):
+            return jsonify({"status": "error", "message": "symbols must be a list of symbol names"}), 400
+        symbols = [s.strip().upper() for s in symbols]
+        unknown = [s for s in symbols if s not in universe]
+        if unknown:
+            return jsonify({"status": "error", "message": f"Not in the scan universe: {', '.join(unknown)}"}), 400
+    try:
+        result = run_scan(
+            strategy,
+            timeframe,
+            symbols=symbols,
+            refresh=payload.get("refresh", True),
+            limit=int(payload.get("limit", SCAN_LIMIT)),
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "result": result}), 200
+
+@bp.route('/history')
+def signal_history():
+    """GET ?user_id=&token=&symbol=&before=&limit=: a newest-first page of one user's journaled
+    signals plus the next cursor. Needs API_TOKEN, like the stored-strategy lookups."""
+    from journal import HISTORY_LIMIT, get_journal
+
+    require_token()
+    user_id = request.args.get("user_id", type=int)
+    if user_id is None:
+        return jsonify({"status": "error", "message": "user_id is required"}), 400
+    symbol = request.args.get("symbol")
+    before = request.args.get("before", type=int)
+    limit = max(1, min(request.args.get("limit", HISTORY_LIMIT, type=int), 500))
+    rows, cursor = get_journal().history(
+        user=user_id, symbol=symbol.upper() if symbol else None, before=before, limit=limit
+    )
+    return jsonify({"status": "success", "signals": rows, "next": cursor}), 200
+
+@bp.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+@bp.route('/debug/profiler', methods=['GET', 'POST'])
+def profiler_toggle():
+    """POST {"enabled": true|false[, "interval": s]} switches the sampler; GET returns folded stacks.
+
+    Only available when PROFILER_TOKEN is set, and the request must carry it as ?token=.
+    """
+    require_token("PROFILER_TOKEN")
+    if request.method == 'GET':
+        limit = request.args.get("limit", type=int)
+        return Response(profiler.report(limit), mimetype="text/plain")
+    payload = request.get_json(silent=True) or {}
+    if payload.get("enabled"):
+        profiler.start(interval=payload.get("interval"))
+    else:
+        profiler.stop()
+    return jsonify({"status": "success", "profiler": profiler.status()}), 200
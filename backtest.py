@@ -0,0 +1,90 @@
+import numpy as np
+
+from engine import compile_strategy, compute_series, evaluate, required_keys
+from indicators import get_source
+
+# Round-trip cost charged per trade, as a fraction of price (about 1 pip on EURUSD).
+DEFAULT_COST = 0.0001
+# Annualization for Sharpe, in bars per year, for each timeframe (FX trades ~260 days a year).
+BARS_PER_YEAR = {
+    "1m": 260 * 1440,
+    "5m": 260 * 288,
+    "15m": 260 * 96,
+    "30m": 260 * 48,
+    "1h": 260 * 24,
+    "4h": 260 * 6,
+    "1d": 260,
+}
+
+def strategy_signal(bars, strategy, compute=None):
+    """Boolean array, true on bars where the strategy's conditions hold at the close."""
+    compiled = compile_strategy(strategy)
+    series = compute_series(bars, required_keys(compiled), compute=compute)
+    if not series:
+        return np.zeros(len(bars), dtype=bool)
+    return evaluate(compiled, series)
+
+def backtest(bars, strategy, cost=DEFAULT_COST, side=1, timeframe=None, compute=None):
+    """Vectorized long (side=1) or short (side=-1) backtest of one strategy.
+
+    A position is opened at the close of the bar where the strategy turns true and closed at
+    the close of the bar where it turns false, so bar t is held when the signal was true at
+    t-1. Everything is whole-array maths; the result is deterministic for the same bars.
+    """
+    close = get_source(bars, "Close")
+    n = len(close)
+    signal = strategy_signal(bars, strategy, compute=compute)
+    held = np.zeros(n, dtype=bool)
+    held[1:] = signal[:-1]
+
+    bar_ret = np.zeros(n)
+    if n > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bar_ret[1:] = np.where(close[:-1] != 0, close[1:] / close[:-1] - 1.0, 0.0)
+    strat_ret = np.where(held, side * bar_ret, 0.0)
+
+    # Position changes: +1 marks the bar before the first held bar (entry), -1 the last held bar (exit).
+    change = np.diff(held.astype(np.int8), append=np.int8(0))
+    entries = np.flatnonzero(change == 1)
+    exits = np.flatnonzero(change == -1)
+    # Charge half the round-trip cost on the first and last held bars of every trade.
+    strat_ret[entries + 1] -= cost / 2
+    strat_ret[exits] -= cost / 2
+
+    equity = np.cumprod(1.0 + strat_ret)
+    peak = np.maximum.accumulate(equity) if n else equity
+    drawdown = equity / peak - 1.0 if n else equity
+
+    log_equity = np.r_[0.0, np.cumsum(np.log1p(strat_ret))]
+    trade_returns = np.expm1(log_equity[exits + 1] - log_equity[entries + 1])
+
+    std = strat_ret.std() if n else 0.0
+    periods = BARS_PER_YEAR.get(timeframe)
+    sharpe = float(strat_ret.mean() / std * np.sqrt(periods)) if periods and std > 0 else None
+    return {
+        "bars": int(n),
+        "start": str(bars.index[0]) if n and hasattr(bars, "index") else None,
+        "end": str(bars.index[-1]) if n and hasattr(bars, "index") else None,
+        "trades": int(len(trade_returns)),
+        "win_rate": float((trade_returns > 0).mean()) if len(trade_returns) else 0.0,
+        "total_return": float(equity[-1] - 1.0) if n else 0.0,
+        "max_drawdown": float(drawdown.min()) if n else 0.0,
+        "avg_trade": float(trade_returns.mean()) if len(trade_returns) else 0.0,
+        "best_trade": float(trade_returns.max()) if len(trade_returns) else 0.0,
+        "worst_trade": float(trade_returns.min()) if len(trade_returns) else 0.0,
+        "exposure": float(held.mean()) if n else 0.0,
+        "sharpe": sharpe,
+    }
+
+def format_backtest(symbol, timeframe, result):
+    lines = [
+        f"📊 Backtest {symbol} {timeframe} ({result['bars']} bars)",
+        f"• Period: {result['start']} → {result['end']}",
+        f"• Trades: {result['trades']}  Win rate: {result['win_rate']:.1%}",
+        f"• Total return: {result['total_return']:.2%}",
+        f"• Max drawdown: {result['max_drawdown']:.2%}",
+        f"• Avg trade: {result['avg_trade']:.3%}  Exposure: {result['exposure']:.1%}",
+    ]
+    if result["sharpe"] is not None:
+        lines.append(f"• Sharpe: {result['sharpe']:.2f}")
+    return "\n".join(lines)
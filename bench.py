@@ -0,0 +1,416 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+# Benchmarks never touch the real strategy DB.
+os.environ.setdefault("STRATEGY_STORE", "memory")
+
+import numpy as np
+import pandas as pd
+
+from engine import ConditionIndex, compute_series, describe_condition, evaluate_strategies, indicator_key, last_signals
+from indicators import INDICATORS, OPERATORS, compute_indicator
+from market_data import synthetic_bars
+from planner import Planner
+
+INDICATOR_SIZES = [1_000, 100_000, 10_000_000]
+STRATEGY_COUNTS = [10, 1_000, 100_000]
+EVAL_BARS = 1_000
+UPDATES = 500
+CONVERSATIONS = 50
+SCAN_SYMBOLS = 300
+JOURNAL_RECORDS = 100_000
+# A typical mix of configs on one series, for the fused-vs-separate comparison.
+FUSED_SET = [
+    ("EMA", {"period": 12}), ("EMA", {"period": 20}), ("EMA", {"period": 26}), ("MACD", {}),
+    ("SMA", {"period": 20}), ("SMA", {"period": 50}), ("BollingerBands", {}),
+    ("RSI", {}), ("Stochastic", {}), ("ATR", {}), ("OBV", {}),
+]
+DEFAULT_OUTPUT = "bench_output.json"
+# A result is flagged when its median is this much slower than the baseline's.
+REGRESSION_THRESHOLD = 0.2
+
+# ========== TIMING ==========
+
+def measure(fn, repeat=5, warmup=1):
+    """Run `fn` warmup + repeat times; timings of the measured runs in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def result(name, times, size=None, **extra):
+    median = statistics.median(times)
+    row = {
+        "name": name,
+        "size": size,
+        "repeat": len(times),
+        "min": min(times),
+        "median": median,
+        "mean": statistics.fmean(times),
+    }
+    if size:
+        row["per_item_us"] = median / size * 1e6
+    row.update(extra)
+    return row
+
+def skipped(name, reason):
+    return {"name": name, "skipped": reason}
+
+def repeats_for(size):
+    return 1 if size >= 10_000_000 else 3 if size >= 100_000 else 10
+
+# ========== SYNTHETIC DATA ==========
+
+def make_bars(n, seed=0):
+    index = pd.date_range("2000-01-01", periods=n, freq="min", tz="UTC")
+    return synthetic_bars(index, seed=seed, vol=1e-4)
+
+def random_condition(rng):
+    """A condition drawn from a small param pool, so strategies share indicators like real users do."""
+    indicator = rng.choice(list(INDICATORS))
+    params = {}
+    for name, (param_type, default, options) in INDICATORS[indicator]["params"].items():
+        params[name] = rng.choice(options) if options else param_type(default) * rng.choice([1, 2])
+    operator = rng.choice(OPERATORS)
+    if operator in ("cross_above", "cross_below"):
+        compare_to = {"indicator": "EMA", "params": {"period": rng.choice([20, 50, 100])}}
+    else:
+        compare_to = {"value": round(rng.uniform(0, 100), 1)}
+    return {"indicator": indicator, "params": params, "operator": operator, "compare_to": compare_to}
+
+def random_strategies(n, seed=0):
+    rng = random.Random(seed)
+    return {
+        uid: {
+            "logic": rng.choice(["AND", "OR"]),
+            "conditions": [random_condition(rng) for _ in range(rng.randint(1, 3))],
+        }
+        for uid in range(n)
+    }
+
+# ========== BENCHMARKS ==========
+
+def bench_indicators(sizes):
+    from kernels import FusedPlan
+
+    keys = [indicator_key(indicator, params) for indicator, params in FUSED_SET]
+    plan = FusedPlan(keys)
+    rows = []
+    for size in sizes:
+        bars = make_bars(size)
+        repeat = repeats_for(size)
+        for indicator in INDICATORS:
+            times = measure(lambda: compute_indicator(bars, indicator, {}), repeat=repeat)
+            rows.append(result(f"indicator.{indicator}", times, size))
+        separate = lambda: [compute_indicator(bars, key[0], dict(key[1])) for key in keys]
+        rows.append(result("indicators.separate", measure(separate, repeat), size, outputs=len(keys)))
+        rows.append(result("indicators.fused", measure(lambda: plan.run(bars), repeat), size, outputs=len(keys)))
+        del bars
+    return rows
+
+def bench_scan(symbols=SCAN_SYMBOLS, bars=EVAL_BARS):
+    """Every indicator over a symbols x bars panel in one call vs one frame per symbol."""
+    from scanner import Panel, compute_panel
+
+    index = pd.date_range("2024-01-01", periods=bars, freq="h", tz="UTC")
+    frames = {f"S{i}": synthetic_bars(index, seed=i) for i in range(symbols)}
+    panel, _ = Panel.from_frames(frames, length=bars)
+    rows = []
+    for indicator in INDICATORS:
+        repeat = repeats_for(symbols * bars)
+        rows.append(result(f"scan.panel.{indicator}", measure(lambda: compute_panel(panel, indicator, {}), repeat), symbols, bars=bars))
+        loop = lambda: [compute_indicator(frame, indicator, {}) for frame in frames.values()]
+        rows.append(result(f"scan.per_symbol.{indicator}", measure(loop, repeat), symbols, bars=bars))
+    return rows
+
+def bench_journal(n=JOURNAL_RECORDS):
+    """Signal journal appends (one by one and per candle batch) and indexed history pages."""
+    import tempfile
+
+    from journal import SignalJournal
+
+    rows = []
+    with tempfile.TemporaryDirectory() as root:
+        journal = SignalJournal(root)
+        ts = time.time_ns()
+        single = lambda: [journal.append(ts + i, i % 1000, "EURUSD", "1h: RSI() < 30", 1.1) for i in range(n)]
+        rows.append(result("journal.append", measure(single, 3), n))
+        users = np.arange(n)
+        batch = lambda: journal.append_many(ts, users, "GBPUSD", "1h: RSI() > 70", 1.2)
+        rows.append(result("journal.append_many", measure(batch, 3), n))
+        journal.history(user=1)
+        rows.append(result("journal.history_page", measure(lambda: journal.history(user=7, symbol="EURUSD"), 10), records=len(journal)))
+        journal.close()
+    return rows
+
+def bench_evaluation(counts, bars=EVAL_BARS):
+    rows = []
+    frame = make_bars(bars)
+    for count in counts:
+        strategies = random_strategies(count)
+        repeat = repeats_for(count * 10)
+        rows.append(result("evaluate.last_bar", measure(lambda: evaluate_strategies(frame, strategies, tail=1), repeat), count, bars=bars))
+        rows.append(result("evaluate.full", measure(lambda: evaluate_strategies(frame, strategies), repeat), count, bars=bars))
+        rows.append(result("evaluate.last_signals", measure(lambda: last_signals(frame, strategies), repeat), count, bars=bars))
+        rows.append(result("evaluate.planner", measure(lambda: Planner().signals(frame, strategies), repeat), count, bars=bars))
+        # Index built once, as a long-lived process would keep it: only the per-bar lookup is timed.
+        index = ConditionIndex.from_strategies(strategies)
+        series = compute_series(frame, index.required_keys())
+        index.signals(series)
+        rows.append(result("evaluate.index_lookup", measure(lambda: index.signals(series), repeat), count, bars=bars, **index.stats()))
+    return rows
+
+def bench_formatting(n=10_000):
+    rng = random.Random(0)
+    conditions = [random_condition(rng) for _ in range(n)]
+    rows = [result("describe_condition", measure(lambda: [describe_condition(c) for c in conditions]), n)]
+    try:
+        import tg_bot
+    except ImportError as e:
+        return rows + [skipped("tg_bot.formatting", f"tg_bot not importable: {e}")]
+
+    for uid, cond in enumerate(conditions):
+        tg_bot.user_data[uid] = cond
+
+    def summaries():
+        for uid in range(n):
+            tg_bot.build_condition_summary(uid)
+
+    def keyboards():
+        for _ in range(n):
+            tg_bot.build_indicator_keyboard()
+            tg_bot.build_operator_keyboard()
+
+    rows.append(result("tg_bot.build_condition_summary", measure(summaries), n))
+    rows.append(result("tg_bot.keyboards", measure(keyboards), n))
+    tg_bot.user_data.clear()
+    return rows
+
+def bench_conversation(users=CONVERSATIONS):
+    """Full /newstrategy flow through the v13 dispatcher, replies going to a local fake Bot API."""
+    try:
+        from telegram import Bot, Update
+        import tg_bot
+    except ImportError as e:
+        return [skipped("tg_bot.conversation", f"python-telegram-bot v13 handlers not importable: {e}")]
+    from fake_telegram import FakeBotApi, callback_update, message_update
+
+    api = FakeBotApi()
+    url = api.start_thread()
+    try:
+        bot = Bot("123:BENCH", base_url=f"{url}/bot")
+        dp = tg_bot.build_dispatcher(bot, workers=0)
+        steps = [
+            lambda uid: message_update(uid, "/newstrategy"),
+            lambda uid: callback_update(uid, "RSI"),
+            lambda uid: callback_update(uid, "14"),
+            lambda uid: callback_update(uid, "Close"),
+            lambda uid: callback_update(uid, "<"),
+            lambda uid: callback_update(uid, "value"),
+            lambda uid: message_update(uid, "30"),
+        ]
+        latencies = []
+        start = time.perf_counter()
+        for uid in range(1, users + 1):
+            for step in steps:
+                update = Update.de_json(step(uid), bot)
+                t0 = time.perf_counter()
+                dp.process_update(update)
+                latencies.append(time.perf_counter() - t0)
+        total = time.perf_counter() - start
+    finally:
+        api.stop_thread()
+    return [latency_result("tg_bot.conversation_update", latencies, total)]
+
+def latency_result(name, latencies, total):
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return result(
+        name,
+        latencies,
+        updates=len(latencies),
+        p95=pick(0.95),
+        p99=pick(0.99),
+        updates_per_second=len(latencies) / total if total else None,
+    )
+
+async def _bench_updates(n):
+    import bot
+    from fake_telegram import FakeBotApi, FakeTelegramClient, message_update, web_app_data_update
+    from http_client import get_http
+    from notifier import Notifier
+    from telegram import Update
+    from webhook import create_web_app
+    from aiohttp import web
+
+    api = FakeBotApi()
+    http = get_http()
+    http.api_url = await api.start()
+    app = bot.build_application("123:BENCH", "https://example.org/form-test")
+    # Unthrottled so the numbers measure our code, not Telegram's limits.
+    notifier = app.bot_data["notifier"] = Notifier(app.bot.send_message, global_rate=1e9, global_burst=10**9)
+    # Two disjoint sets of chats, so the second run's replies aren't held back by the first run's per-chat limits.
+    feed = [
+        message_update(uid, "/start") if uid % 2 else web_app_data_update(uid, json.dumps({"period": 14, "threshold": 30}))
+        for uid in range(1, 2 * n + 1)
+    ]
+    rows = []
+    try:
+        await app.initialize()
+        notifier.start()
+
+        # Handler latency: decode + dispatch, no transport.
+        latencies = []
+        start = time.perf_counter()
+        for payload in feed[:n]:
+            t0 = time.perf_counter()
+            await app.process_update(Update.de_json(payload, app.bot))
+            latencies.append(time.perf_counter() - t0)
+        rows.append(latency_result("bot.process_update", latencies, time.perf_counter() - start))
+        await notifier.stop(drain_timeout=30)
+
+        # End to end: fake Telegram posts to the webhook, replies land on the fake Bot API.
+        api.calls.clear()
+        notifier.start()
+        runner = web.AppRunner(create_web_app(app, "/hook"))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        await app.start()
+        start = time.perf_counter()
+        async with FakeTelegramClient(f"http://{host}:{port}/hook") as client:
+            await asyncio.gather(*(client.post(payload) for payload in feed[n:]))
+            while api.count("sendMessage") < n and time.perf_counter() - start < 60:
+                await asyncio.sleep(0.005)
+        total = time.perf_counter() - start
+        rows.append(result("bot.webhook_end_to_end", [total], n, updates_per_second=n / total, delivered=api.count("sendMessage")))
+        await app.stop()
+        await runner.cleanup()
+    finally:
+        await notifier.stop(drain_timeout=0)
+        await app.shutdown()
+        await api.stop()
+        await http.close()
+    return rows
+
+def bench_updates(n=UPDATES):
+    try:
+        return asyncio.run(_bench_updates(n))
+    except ImportError as e:
+        return [skipped("bot.updates", f"bot.py not importable: {e}")]
+
+# ========== REPORT ==========
+
+def metadata():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+    }
+
+def _key(row):
+    return (row["name"], row.get("size"))
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Rows whose median got slower than `baseline` by more than `threshold` (fractional)."""
+    before = {_key(row): row for row in baseline["results"] if "median" in row}
+    regressions = []
+    for row in results:
+        old = before.get(_key(row))
+        if "median" not in row or not old or not old["median"]:
+            continue
+        ratio = row["median"] / old["median"]
+        row["baseline_median"] = old["median"]
+        row["ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(row)
+    return regressions
+
+def print_table(results):
+    for row in results:
+        label = f"{row['name']}[{row['size']}]" if row.get("size") else row["name"]
+        if "skipped" in row:
+            print(f"{label:<45} skipped: {row['skipped']}")
+            continue
+        line = f"{label:<45} median {row['median'] * 1e3:10.3f} ms"
+        if "per_item_us" in row:
+            line += f"  {row['per_item_us']:10.3f} us/item"
+        if "ratio" in row:
+            line += f"  x{row['ratio']:.2f} vs baseline"
+        print(line)
+
+SUITES = {
+    "indicators": lambda args: bench_indicators(args.sizes),
+    "evaluation": lambda args: bench_evaluation(args.strategies),
+    "scan": lambda args: bench_scan(args.symbols),
+    "journal": lambda args: bench_journal(),
+    "formatting": lambda args: bench_formatting(),
+    "conversation": lambda args: bench_conversation(args.conversations),
+    "updates": lambda args: bench_updates(args.updates),
+}
+
+def main(argv=None):
+    ints = lambda s: [int(x) for x in s.split(",")]
+    parser = argparse.ArgumentParser(description="Benchmark indicators, strategy evaluation and bot handlers.")
+    parser.add_argument("suites", nargs="*", help=f"any of {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--sizes", type=ints, default=INDICATOR_SIZES, help="bar counts for indicator runs")
+    parser.add_argument("--strategies", type=ints, default=STRATEGY_COUNTS, help="strategy counts for evaluation runs")
+    parser.add_argument("--symbols", type=int, default=SCAN_SYMBOLS, help="panel size for scan runs")
+    parser.add_argument("--updates", type=int, default=UPDATES)
+    parser.add_argument("--conversations", type=int, default=CONVERSATIONS)
+    parser.add_argument("--quick", action="store_true", help="small sizes only, for a fast sanity run")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)} (choose from {', '.join(SUITES)})")
+    if args.quick:
+        args.sizes, args.strategies = [1_000, 100_000], [10, 1_000]
+        args.updates, args.conversations, args.symbols = 100, 10, 30
+
+    results = []
+    for name in args.suites or list(SUITES):
+        print(f"[bench] {name}...", file=sys.stderr)
+        results.extend(SUITES[name](args))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    print_table(results)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print(f"[bench] Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    if regressions:
+        print(f"[bench] {len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
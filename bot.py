@@ -1,7 +1,10 @@
+import startup
+
+startup.enable_from_env()
+
 import os
 import json
 import logging
-import requests
 from urllib.parse import urljoin
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import (
@@ -14,31 +17,23 @@ from telegram.ext import (
 import nest_asyncio
 import asyncio
 import signal
-import aiohttp
+
+from http_client import AiohttpRequest, get_http
+from stats_sink import StatsSink
+from metrics import HANDLER_SECONDS, timed
+# webhook, journal, notifier, scheduler and workers (pandas, numpy, apscheduler) are
+# imported where they are first used, so the worker gets to the Bot API sooner.
 
 nest_asyncio.apply()
 
 DATA_DIR = "data"
 STATS_FILE = "stats.json"
 FORM_PATH = "form-test"
-stats = {}
-
-def load_stats():
-    stats_file = os.path.join(DATA_DIR, STATS_FILE)
-    if os.path.exists(stats_file):
-        with open(stats_file, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_stats():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-    stats_file = os.path.join(DATA_DIR, STATS_FILE)
-    with open(stats_file, "w") as f:
-        json.dump(stats, f, indent=4)
-    print(f"[save_stats] Stats saved: {stats}")
-
-def set_menu_button(token, web_app_url):
+# "polling" (default) or "webhook": one aiohttp server for updates and the Mini App pages.
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+stats = StatsSink(os.path.join(DATA_DIR, STATS_FILE))
+
+async def set_menu_button(token, web_app_url):
     payload = {
         "menu_button": {
             "type": "web_app",
@@ -46,29 +41,31 @@ def set_menu_button(token, web_app_url):
             "web_app": {"url": web_app_url},
         }
     }
-    resp = requests.post(
-        f"https://api.telegram.org/bot{token}/setChatMenuButton", json=payload
-    )
-    if resp.ok:
-        logging.info(f"✅ Menu button set: {resp.json()}")
+    try:
+        resp = await get_http().bot_api(token, "setChatMenuButton", payload)
+    except Exception as e:
+        logging.error(f"❌ Failed to set menu button: {e}")
+        return
+    if resp.get("ok"):
+        logging.info(f"✅ Menu button set: {resp}")
     else:
-        logging.error(f"❌ Failed to set menu button: {resp.text}")
+        logging.error(f"❌ Failed to set menu button: {resp}")
 
+@timed(HANDLER_SECONDS, state="start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    stats["start_count"] = stats.get("start_count", 0) + 1
-    save_stats()
+    stats.incr("start_count")
 
     form_url = context.bot_data["FORM_PATH"]
     button = InlineKeyboardButton(text="Open Mini App", web_app=WebAppInfo(url=form_url))
     keyboard = InlineKeyboardMarkup([[button]])
-    await update.message.reply_text("Click to open Mini App:", reply_markup=keyboard)
+    context.bot_data["notifier"].enqueue(update.effective_chat.id, "Click to open Mini App:", reply_markup=keyboard)
 
+@timed(HANDLER_SECONDS, state="web_app_data")
 async def handle_web_app_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message and update.message.web_app_data:
         try:
             data = json.loads(update.message.web_app_data.data)
-            stats["web_app_data_count"] = stats.get("web_app_data_count", 0) + 1
-            save_stats()
+            stats.incr("web_app_data_count")
 
             msg = (
                 f"✅ Strategy Received:\n"
@@ -76,33 +73,46 @@ async def handle_web_app_data(update: Update, context: ContextTypes.DEFAULT_TYPE
                 f"• Compare to: {data.get('compare_to')}\n"
                 f"• Threshold: {data.get('threshold')}"
             )
-            await update.message.reply_text(msg)
+            context.bot_data["notifier"].enqueue(update.effective_chat.id, msg)
         except Exception as e:
             logging.error(f"[Error parsing web app data] {e}")
-            await update.message.reply_text("❌ Error processing strategy.")
+            context.bot_data["notifier"].enqueue(update.effective_chat.id, "❌ Error processing strategy.")
 
 async def is_url_alive(url: str) -> bool:
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url, timeout=2) as response:
-                return response.status < 400
-    except Exception:
-        return False
+    return await get_http().is_alive(url)
 
 async def get_first_alive_url(candidates):
-    for url in candidates:
-        if url and await is_url_alive(url):
-            return url
-    return None
+    return await get_http().first_alive(candidates)
+
+def build_application(token, form_url):
+    from notifier import Notifier
+
+    http = get_http()
+    app = (
+        ApplicationBuilder()
+        .token(token)
+        .base_url(f"{http.api_url}/bot")
+        .request(AiohttpRequest(http))
+        .get_updates_request(AiohttpRequest(http))
+        .build()
+    )
+    app.bot_data["FORM_PATH"] = form_url
+    app.bot_data["notifier"] = Notifier(send=app.bot.send_message)
+
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, handle_web_app_data))
+    return app
 
 async def main():
     logging.basicConfig(level=logging.INFO)
-    global stats
-    stats = load_stats()
+    stats.load()
 
     TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", os.getenv("TG_BOT_TOKEN1"))
     if not TOKEN:
         raise ValueError("❌ TELEGRAM_BOT_TOKEN is missing.")
+    if BOT_MODE == "webhook" and os.getenv("WEBHOOK_URL") and not os.getenv("WEBHOOK_SECRET"):
+        # Replicas with their own secrets would reject each other's deliveries.
+        raise ValueError("❌ WEBHOOK_SECRET is missing; set the same value on every replica.")
 
     url_candidates = [
         os.getenv("LOCAL_TUNNEL_URL"),
@@ -120,16 +130,41 @@ async def main():
 
     print(f"[init] Using Web App URL: {web_app_url}")
     print(f"[init] Form path set to: {form_url}")
-    set_menu_button(TOKEN, web_app_url)
+    http = get_http()
+    with startup.phase("build_application"):
+        app = build_application(TOKEN, form_url)
+
+    menu_task = asyncio.create_task(set_menu_button(TOKEN, web_app_url))
+
+    with startup.phase("services"):
+        from journal import get_journal
+        from scheduler import SignalScheduler
+        from workers import default_worker_count, get_pool
+
+        pool = get_pool() if default_worker_count() > 1 else None
+        notifier = app.bot_data["notifier"]
+        journal = get_journal(writable=True)
+        signal_scheduler = SignalScheduler(send=notifier.send_message, pool=pool, journal=journal)
+        signal_scheduler.start()
+        notifier.start()
+        stats.start()
+    startup.report()
 
-    app = ApplicationBuilder().token(TOKEN).build()
-    app.bot_data["FORM_PATH"] = form_url
-
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, handle_web_app_data))
+    try:
+        if BOT_MODE == "webhook":
+            from webhook import run_webhook
 
-    # Run polling; this manages starting and stopping internally.
-    await app.run_polling()
+            await run_webhook(app, port=int(os.getenv("PORT", "8001")), public_url=os.getenv("WEBHOOK_URL"))
+        else:
+            # Run polling; this manages starting and stopping internally.
+            await app.run_polling()
+    finally:
+        signal_scheduler.shutdown()
+        menu_task.cancel()
+        await notifier.stop()
+        await stats.stop()
+        journal.close()
+        await http.close()
 
 if __name__ == "__main__":
     loop = asyncio.get_event_loop()
@@ -147,4 +182,7 @@ if __name__ == "__main__":
     except asyncio.CancelledError:
         logging.info("Bot shutdown gracefully")
     finally:
+        from workers import drain_pool
+
+        drain_pool()
         loop.close()
\ No newline at end of file
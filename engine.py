@@ -0,0 +1,372 @@
+import copy
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from indicators import INDICATORS, OPERATORS, resolve_params
+
+# Relative distance within which `in_zone` treats a single compare-to value as hit.
+ZONE_TOLERANCE = 0.001
+
+CompiledCondition = namedtuple("CompiledCondition", "lhs operator kind rhs")
+CompiledStrategy = namedtuple("CompiledStrategy", "logic conditions")
+
+# ========== COMPILE ==========
+
+def indicator_key(indicator, params=None):
+    """Hashable identity of an indicator config, e.g. ("RSI", (("period", 14), ("source", "Close")))."""
+    if indicator not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {indicator}")
+    return (indicator, tuple(sorted(resolve_params(indicator, params).items())))
+
+def compile_condition(cond):
+    operator = cond.get("operator")
+    if operator not in OPERATORS:
+        raise ValueError(f"Unknown operator: {operator}")
+    lhs = indicator_key(cond["indicator"], cond.get("params"))
+    comp = cond.get("compare_to") or {}
+    if "indicator" in comp:
+        return CompiledCondition(lhs, operator, "indicator", indicator_key(comp["indicator"], comp.get("params")))
+    if "zone" in comp:
+        lo, hi = sorted(float(v) for v in comp["zone"])
+        return CompiledCondition(lhs, operator, "zone", (lo, hi))
+    if "value" in comp:
+        return CompiledCondition(lhs, operator, "value", float(comp["value"]))
+    raise ValueError(f"Condition has no compare_to: {cond}")
+
+def compile_strategy(strategy):
+    logic = strategy.get("logic", "AND").upper()
+    if logic not in ("AND", "OR"):
+        raise ValueError(f"Unknown logic: {logic}")
+    return CompiledStrategy(logic, tuple(compile_condition(c) for c in strategy.get("conditions", [])))
+
+def required_keys(compiled):
+    """Distinct indicator keys needed by one or more compiled strategies."""
+    if isinstance(compiled, CompiledStrategy):
+        compiled = [compiled]
+    keys = set()
+    for strat in compiled:
+        for cond in strat.conditions:
+            keys.add(cond.lhs)
+            if cond.kind == "indicator":
+                keys.add(cond.rhs)
+    return keys
+
+def describe_condition(cond):
+    """Human-readable condition, e.g. "RSI(period=14, source=Close) < 30.0"."""
+    ind = cond["indicator"]
+    params = cond.get("params", {})
+    op = cond.get("operator", "?")
+    comp = cond.get("compare_to")
+    pstr = ", ".join(f"{k}={v}" for k, v in params.items())
+    text = f"{ind}({pstr}) {op} "
+    if comp is None:
+        text += "???"
+    elif "value" in comp:
+        text += str(comp["value"])
+    elif "zone" in comp:
+        text += f"[{comp['zone'][0]}, {comp['zone'][1]}]"
+    elif "indicator" in comp:
+        cind = comp["indicator"]
+        cparams = comp.get("params", {})
+        cstr = ", ".join(f"{k}={v}" for k, v in cparams.items())
+        text += f"{cind}({cstr})"
+    else:
+        text += "???"
+    return text
+
+# ========== EVALUATE ==========
+
+def compute_series(bars, keys, compute=None):
+    """Every distinct indicator key over `bars`.
+
+    By default the keys go through one kernels.FusedPlan, which shares rolling windows,
+    EMAs and differences between them. A `compute(bars, indicator, params)` hook is
+    called once per key unless it has a `many(bars, keys)` batch method (the cache's
+    hook does, and fills its misses through one fused run).
+    """
+    if compute is None:
+        from kernels import compute_fused
+
+        return compute_fused(bars, keys)
+    many = getattr(compute, "many", None)
+    if many is not None:
+        return many(bars, keys)
+    return {key: compute(bars, key[0], dict(key[1])) for key in keys}
+
+def apply_operator(operator, lhs, rhs):
+    """Whole-array comparison of `lhs` against `rhs` (an array or a scalar)."""
+    with np.errstate(invalid="ignore"):
+        if operator == "<":
+            return lhs < rhs
+        if operator == ">":
+            return lhs > rhs
+        if operator == "==":
+            return np.isclose(lhs, rhs)
+        if operator in ("cross_above", "cross_below"):
+            # Axis 0 is time, so a (bars, symbols) block crosses column by column.
+            out = np.zeros(np.shape(lhs), dtype=bool)
+            if len(lhs) < 2:
+                return out
+            rhs_now = rhs[1:] if np.ndim(rhs) else rhs
+            rhs_prev = rhs[:-1] if np.ndim(rhs) else rhs
+            if operator == "cross_above":
+                out[1:] = (lhs[1:] > rhs_now) & (lhs[:-1] <= rhs_prev)
+            else:
+                out[1:] = (lhs[1:] < rhs_now) & (lhs[:-1] >= rhs_prev)
+            return out
+        if operator == "in_zone":
+            if isinstance(rhs, tuple):
+                return (lhs >= rhs[0]) & (lhs <= rhs[1])
+            return np.abs(lhs - rhs) <= ZONE_TOLERANCE * np.abs(rhs)
+    raise ValueError(f"Unknown operator: {operator}")
+
+def evaluate_condition(cond, series):
+    rhs = series[cond.rhs] if cond.kind == "indicator" else cond.rhs
+    return apply_operator(cond.operator, series[cond.lhs], rhs)
+
+def evaluate(compiled, series, memo=None):
+    """Reduce a compiled strategy's conditions with its logic into one boolean array per bar.
+
+    `memo` lets callers share identical condition results across strategies.
+    """
+    if not compiled.conditions:
+        length = len(next(iter(series.values()))) if series else 0
+        return np.zeros(length, dtype=bool)
+    results = []
+    for cond in compiled.conditions:
+        if memo is None:
+            results.append(evaluate_condition(cond, series))
+            continue
+        hit = memo.get(cond)
+        if hit is None:
+            hit = memo[cond] = evaluate_condition(cond, series)
+        results.append(hit)
+    reduce = np.logical_and if compiled.logic == "AND" else np.logical_or
+    return reduce.reduce(results)
+
+def evaluate_strategies(bars, strategies, tail=None, compute=None):
+    """Evaluate many user strategies over the same bars.
+
+    Every distinct indicator is computed once and every distinct condition is compared
+    once. With `tail`, only the last `tail` bars are compared (plus one for crosses),
+    which is all a live candle-close check needs.
+    Returns {user_id: bool array}; strategies that fail to compile are skipped.
+    """
+    compiled = {}
+    for user_id, strategy in strategies.items():
+        try:
+            compiled[user_id] = compile_strategy(strategy)
+        except (KeyError, ValueError) as e:
+            logging.warning(f"[engine] Skipping strategy for {user_id}: {e}")
+    series = compute_series(bars, required_keys(compiled.values()), compute=compute)
+    if tail is not None:
+        series = {key: values[-(tail + 1):] for key, values in series.items()}
+    memo = {}
+    results = {}
+    for user_id, strat in compiled.items():
+        out = evaluate(strat, series, memo)
+        results[user_id] = out[-tail:] if tail is not None else out
+    return results
+
+def last_signals(bars, strategies, compute=None):
+    """User ids whose strategy is true on the most recent bar."""
+    index = ConditionIndex.from_strategies(strategies)
+    return index.signals(compute_series(bars, index.required_keys(), compute=compute))
+
+# ========== CONDITION INDEX ==========
+
+# Operators whose `value` comparisons against one series can be answered by bisecting
+# the sorted thresholds instead of comparing each one.
+THRESHOLD_OPERATORS = ("<", ">", "cross_above", "cross_below")
+
+class ConditionIndex:
+    """Every user's conditions deduplicated into shared nodes, for last-bar evaluation.
+
+    A node is a CompiledCondition, which is already canonical (indicator, sorted resolved
+    params, operator, compare_to), so "RSI(14) < 30" from a thousand users is one node.
+    Value thresholds against the same (series, operator) are kept sorted and the nodes
+    that fire on a bar form one contiguous slice found with two bisects; `==` and
+    `in_zone` nodes on one series are checked with a single array comparison. Strategies
+    are resolved from the fired nodes through node -> strategy postings, so the cost per
+    bar follows unique conditions and actual hits rather than the number of users.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.conditions = []
+        self.strategies = {}
+        self._sources = {}
+        self._plan = None
+
+    @classmethod
+    def from_strategies(cls, strategies):
+        index = cls()
+        for user_id, strategy in strategies.items():
+            try:
+                index.add(user_id, strategy)
+            except (KeyError, ValueError) as e:
+                logging.warning(f"[engine] Skipping strategy for {user_id}: {e}")
+        return index
+
+    def add(self, user_id, strategy):
+        """Index (or re-index) one user's strategy; raises like compile_strategy."""
+        compiled = compile_strategy(strategy)
+        ids = []
+        for cond in compiled.conditions:
+            node = self.nodes.get(cond)
+            if node is None:
+                node = self.nodes[cond] = len(self.conditions)
+                self.conditions.append(cond)
+            if node not in ids:
+                ids.append(node)
+        self.discard(user_id)
+        self.strategies[user_id] = (compiled.logic, tuple(ids), len(compiled.conditions))
+        self._plan = None
+
+    def discard(self, user_id):
+        self._sources.pop(user_id, None)
+        if self.strategies.pop(user_id, None) is not None:
+            self._plan = None
+
+    def sync(self, strategies):
+        """Bring a long-lived index in line with {user_id: strategy}, recompiling only what changed."""
+        for user_id in [u for u in self._sources if u not in strategies]:
+            self.discard(user_id)
+        for user_id, strategy in strategies.items():
+            if self._sources.get(user_id) == strategy:
+                continue
+            try:
+                self.add(user_id, strategy)
+            except (KeyError, ValueError) as e:
+                logging.warning(f"[engine] Skipping strategy for {user_id}: {e}")
+                self.discard(user_id)
+            self._sources[user_id] = copy.deepcopy(strategy)
+        return self
+
+    def __len__(self):
+        return len(self.strategies)
+
+    def _used(self):
+        """Node ids still referenced by a strategy; nodes of discarded strategies drop out here."""
+        return sorted({node for _, ids, _ in self.strategies.values() for node in ids})
+
+    def required_keys(self):
+        return required_keys([CompiledStrategy("AND", tuple(self.conditions[node] for node in self._used()))])
+
+    def _build(self):
+        """Group nodes by the series they read and build the node -> strategy postings."""
+        used = self._used()
+        if len(used) * 2 < len(self.conditions):
+            # Mostly nodes of discarded strategies: renumber so postings stay dense.
+            renumber = {node: i for i, node in enumerate(used)}
+            self.conditions = [self.conditions[node] for node in used]
+            self.nodes = {cond: i for i, cond in enumerate(self.conditions)}
+            self.strategies = {
+                user_id: (logic, tuple(renumber[node] for node in ids), size)
+                for user_id, (logic, ids, size) in self.strategies.items()
+            }
+            used = list(range(len(used)))
+        sorted_groups = {}
+        array_groups = {}
+        other = []
+        for node in used:
+            cond = self.conditions[node]
+            if cond.kind == "value" and cond.operator in THRESHOLD_OPERATORS and not np.isnan(cond.rhs):
+                sorted_groups.setdefault((cond.lhs, cond.operator), []).append((cond.rhs, node))
+            elif cond.kind == "value" and cond.operator in ("==", "in_zone") or cond.kind == "zone":
+                array_groups.setdefault((cond.lhs, cond.operator, cond.kind), []).append((cond.rhs, node))
+            else:
+                other.append(node)
+        for groups in (sorted_groups, array_groups):
+            for key, pairs in groups.items():
+                if groups is sorted_groups:
+                    pairs.sort()
+                groups[key] = (
+                    np.array([rhs for rhs, _ in pairs], dtype=float),
+                    np.array([node for _, node in pairs], dtype=np.intp),
+                )
+
+        user_ids = []
+        need = []
+        edges = [[] for _ in self.conditions]
+        for user_id, (logic, ids, _) in self.strategies.items():
+            if not ids:
+                continue
+            position = len(user_ids)
+            user_ids.append(user_id)
+            need.append(len(ids) if logic == "AND" else 1)
+            for node in ids:
+                edges[node].append(position)
+        postings = [np.array(members, dtype=np.intp) for members in edges]
+        self._plan = (sorted_groups, array_groups, other, user_ids, np.array(need, dtype=np.intp), postings)
+        return self._plan
+
+    def fired(self, series):
+        """Ids of the nodes that are true on the last bar of `series`."""
+        sorted_groups, array_groups, other, _, _, _ = self._plan or self._build()
+        hits = []
+        for (lhs, operator), (values, nodes) in sorted_groups.items():
+            column = series[lhs]
+            if not len(column) or np.isnan(column[-1]):
+                continue
+            now = column[-1]
+            if operator == "<":
+                lo, hi = np.searchsorted(values, now, side="right"), len(values)
+            elif operator == ">":
+                lo, hi = 0, np.searchsorted(values, now, side="left")
+            else:
+                if len(column) < 2 or np.isnan(column[-2]):
+                    continue
+                prev = column[-2]
+                if operator == "cross_above":
+                    # prev <= value < now
+                    lo, hi = np.searchsorted(values, [prev, now], side="left")
+                else:
+                    # now < value <= prev
+                    lo, hi = np.searchsorted(values, [now, prev], side="right")
+            if hi > lo:
+                hits.append(nodes[lo:hi])
+        for (lhs, operator, kind), (values, nodes) in array_groups.items():
+            column = series[lhs]
+            if not len(column):
+                continue
+            now = column[-1]
+            with np.errstate(invalid="ignore"):
+                if kind == "zone":
+                    mask = (now >= values[:, 0]) & (now <= values[:, 1])
+                elif operator == "==":
+                    mask = np.isclose(now, values)
+                else:
+                    mask = np.abs(now - values) <= ZONE_TOLERANCE * np.abs(values)
+            hits.append(nodes[mask])
+        if other:
+            tail = {key: values[-2:] for key, values in series.items()}
+            extra = [node for node in other if _last(evaluate_condition(self.conditions[node], tail))]
+            if extra:
+                hits.append(np.array(extra, dtype=np.intp))
+        return np.concatenate(hits) if hits else np.zeros(0, dtype=np.intp)
+
+    def signals(self, series):
+        """User ids whose strategy is true on the last bar, from the fired nodes alone."""
+        _, _, _, user_ids, need, postings = self._plan or self._build()
+        members = [postings[node] for node in self.fired(series)]
+        if not members:
+            return []
+        counts = np.bincount(np.concatenate(members), minlength=len(user_ids))
+        return [user_ids[i] for i in np.flatnonzero(counts >= need)]
+
+    def stats(self):
+        sorted_groups, array_groups, other = (self._plan or self._build())[:3]
+        return {
+            "strategies": len(self.strategies),
+            "conditions": sum(size for _, _, size in self.strategies.values()),
+            "nodes": len(self._used()),
+            "sorted_groups": len(sorted_groups),
+            "array_groups": len(array_groups),
+            "other_nodes": len(other),
+        }
+
+def _last(out):
+    return bool(len(out) and out[-1])
@@ -0,0 +1,174 @@
+import json
+import time
+import asyncio
+import itertools
+import threading
+
+import aiohttp
+from aiohttp import web
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+# ========== UPDATE BUILDERS ==========
+
+def _user(user_id):
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+def _chat(user_id):
+    return {"id": user_id, "type": "private"}
+
+def message_update(user_id, text, update_id=None):
+    """Bot API Update dict for a private text message (commands get their entity set)."""
+    message = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": _chat(user_id),
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id or next(_update_ids), "message": message}
+
+def callback_update(user_id, data, update_id=None):
+    """Bot API Update dict for an inline-keyboard button tap."""
+    message = {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": _chat(user_id),
+        "from": {"id": 0, "is_bot": True, "first_name": "bot"},
+        "text": "...",
+    }
+    return {
+        "update_id": update_id or next(_update_ids),
+        "callback_query": {
+            "id": str(next(_message_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        },
+    }
+
+def web_app_data_update(user_id, data, update_id=None):
+    update = message_update(user_id, "", update_id)
+    message = update["message"]
+    del message["text"]
+    message["web_app_data"] = {"data": data, "button_text": "📈 Strategy"}
+    return update
+
+# ========== CLIENT ==========
+
+class FakeTelegramClient:
+    """Posts updates to a local webhook the way Telegram would."""
+
+    def __init__(self, webhook_url, secret_token=None):
+        self.webhook_url = webhook_url
+        self.secret_token = secret_token
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def post(self, update):
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self.secret_token} if self.secret_token else {}
+        async with self._session.post(self.webhook_url, json=update, headers=headers) as response:
+            return response.status
+
+# ========== BOT API ==========
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bot", "username": "fake_signal_bot"}
+# Methods whose result is the sent/edited Message rather than plain True.
+MESSAGE_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup"}
+
+class FakeBotApi:
+    """Local stand-in for api.telegram.org: answers Bot API calls and records them.
+
+    Point a bot's base_url at `url + "/bot"`. Works for both the async bot (start/stop on
+    the running loop) and the sync v13 one (start_thread/stop_thread).
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.updates = []
+        # Called as on_call(method, payload, perf_counter time) from the server loop, e.g. to time deliveries.
+        self.on_call = None
+        self.url = None
+        self._runner = None
+        self._loop = None
+
+    def push_update(self, update):
+        """Queue an Update dict for the next getUpdates call."""
+        self.updates.append(update)
+
+    def count(self, method):
+        return sum(1 for name, _ in self.calls if name == method)
+
+    async def _payload(self, request):
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+    def _result(self, method, payload):
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            offset = int(payload.get("offset") or 0)
+            self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            return self.updates[:100]
+        if method in MESSAGE_METHODS:
+            chat_id = payload.get("chat_id") or 0
+            return {
+                "message_id": next(_message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id), "type": "private"},
+                "from": BOT_USER,
+                "text": payload.get("text", ""),
+            }
+        return True
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        payload = await self._payload(request)
+        if isinstance(payload.get("reply_markup"), str):
+            payload["reply_markup"] = json.loads(payload["reply_markup"])
+        self.calls.append((method, payload))
+        if self.on_call is not None:
+            self.on_call(method, payload, time.perf_counter())
+        if method == "getUpdates" and not self.updates:
+            # Long poll like Telegram, but cap the wait so tests stay quick.
+            deadline = time.monotonic() + min(float(payload.get("timeout") or 0), 1.0)
+            while not self.updates and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+        return web.json_response({"ok": True, "result": self._result(method, payload)})
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_thread(self, host="127.0.0.1", port=0):
+        """Serve from a background loop, for synchronous clients."""
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(self.start(host, port), self._loop).result()
+
+    def stop_thread(self):
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+
+import aiohttp
+from telegram.error import NetworkError, TimedOut
+from telegram.request import BaseRequest
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+POOL_LIMIT = 100
+POOL_LIMIT_PER_HOST = 32
+PROBE_TIMEOUT = 2.0
+# How long a URL health result is trusted before probing again.
+ALIVE_TTL = 300.0
+
+class HttpClient:
+    """One connection-pooled aiohttp session shared by URL probing and every Bot API call."""
+
+    def __init__(self, api_url=None, limit=POOL_LIMIT, limit_per_host=POOL_LIMIT_PER_HOST, alive_ttl=ALIVE_TTL):
+        self.api_url = (api_url or TELEGRAM_API_URL).rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.alive_ttl = alive_ttl
+        self._session = None
+        self._alive = {}
+
+    @property
+    def session(self):
+        """The shared session, created on first use inside the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # --- URL probing ---
+
+    async def is_alive(self, url, timeout=PROBE_TIMEOUT):
+        cached = self._alive.get(url)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        try:
+            async with self.session.head(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                alive = response.status < 400
+        except Exception:
+            alive = False
+        self._alive[url] = (alive, time.monotonic() + self.alive_ttl)
+        return alive
+
+    async def first_alive(self, candidates, timeout=PROBE_TIMEOUT):
+        """Probe every candidate at once; return the highest-priority one that answered healthy.
+
+        Returns as soon as that is known, cancelling probes of lower-priority candidates.
+        """
+        candidates = [url for url in candidates if url]
+        tasks = [asyncio.ensure_future(self.is_alive(url, timeout)) for url in candidates]
+        try:
+            for url, task in zip(candidates, tasks):
+                if await task:
+                    return url
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # --- Bot API ---
+
+    async def bot_api(self, token, method, payload=None):
+        """POST a Bot API method as JSON; returns the decoded response body."""
+        async with self.session.post(f"{self.api_url}/bot{token}/{method}", json=payload or {}) as response:
+            return await response.json(content_type=None)
+
+class AiohttpRequest(BaseRequest):
+    """python-telegram-bot request backend that sends through a shared HttpClient pool."""
+
+    def __init__(self, http, read_timeout=5.0, write_timeout=5.0, connect_timeout=5.0):
+        self.http = http
+        self._read_timeout = read_timeout
+        self._write_timeout = write_timeout
+        self._connect_timeout = connect_timeout
+
+    @property
+    def read_timeout(self):
+        return self._read_timeout
+
+    async def initialize(self):
+        self.http.session
+
+    async def shutdown(self):
+        # The pool is shared with the rest of the process; HttpClient.close() owns it.
+        pass
+
+    async def do_request(
+        self,
+        url,
+        method,
+        request_data=None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ):
+        if read_timeout is BaseRequest.DEFAULT_NONE:
+            read_timeout = self._read_timeout
+        if connect_timeout is BaseRequest.DEFAULT_NONE:
+            connect_timeout = self._connect_timeout
+        timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=read_timeout)
+
+        data = None
+        if request_data is not None:
+            if request_data.contains_files:
+                data = aiohttp.FormData()
+                for name, value in request_data.json_parameters.items():
+                    data.add_field(name, value)
+                for name, (filename, content, mimetype) in request_data.multipart_data.items():
+                    data.add_field(name, content, filename=filename, content_type=mimetype)
+            else:
+                data = request_data.json_parameters
+
+        try:
+            async with self.http.session.request(method, url, data=data, timeout=timeout) as response:
+                return response.status, await response.read()
+        except asyncio.TimeoutError as err:
+            raise TimedOut from err
+        except aiohttp.ClientError as err:
+            raise NetworkError(f"aiohttp.{err.__class__.__name__}: {err}") from err
+
+_http = None
+
+def get_http():
+    """Process-wide shared client."""
+    global _http
+    if _http is None:
+        _http = HttpClient()
+    return _http
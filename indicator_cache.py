@@ -0,0 +1,193 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from indicators import compute_indicator, get_source
+from engine import indicator_key
+from kernels import OUTPUTS, FusedRun
+from metrics import registry
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_EVENTS = ("hits", "misses", "evictions", "invalidations")
+
+def bars_version(bars):
+    """Cheap fingerprint of a bar set: changes when a bar is appended or the last bar is updated."""
+    n = len(bars)
+    if not n:
+        return (0, None, None)
+    if hasattr(bars, "version"):
+        # Live rings count their own writes; a full ring keeps the same length.
+        return (n, bars.version, None)
+    last_ts = bars.index[-1] if isinstance(bars, pd.DataFrame) else None
+    return (n, last_ts, float(get_source(bars, "Close")[-1]))
+
+class IndicatorCache:
+    """LRU cache of indicator series keyed by (symbol, timeframe, indicator, params).
+
+    Entries for a (symbol, timeframe) are dropped as soon as a different bar set is
+    seen for it, so every strategy on the same bars shares one computation.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, compute=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._compute = compute or compute_indicator
+        self._entries = OrderedDict()
+        self._series_keys = {}
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def observe(self, symbol, timeframe, bars):
+        """Register the current bar set for a series, invalidating it if the bars changed; returns its version."""
+        version = bars_version(bars)
+        with self._lock:
+            if self._versions.get((symbol, timeframe)) != version:
+                self._drop_series(symbol, timeframe)
+                self._versions[(symbol, timeframe)] = version
+        return version
+
+    def _stale(self, symbol, timeframe, version):
+        # Another bar set was observed since: its entries aren't ours to read or fill.
+        return version is not None and self._versions.get((symbol, timeframe)) != version
+
+    def get(self, symbol, timeframe, bars, indicator, params=None, version=None):
+        key = (symbol, timeframe) + indicator_key(indicator, params)
+        with self._lock:
+            values = None if self._stale(symbol, timeframe, version) else self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return values
+            self.misses += 1
+        values = self._compute(bars, indicator, params)
+        values.flags.writeable = False
+        with self._lock:
+            if key not in self._entries and not self._stale(symbol, timeframe, version):
+                self._entries[key] = values
+                self._series_keys.setdefault((symbol, timeframe), set()).add(key)
+                self._bytes += values.nbytes
+                self._evict()
+        return values
+
+    def get_many(self, symbol, timeframe, bars, keys, run=None, version=None):
+        """{key: values} for indicator keys on `bars`; misses are filled by a kernels.FusedRun.
+
+        Passing the same `run` across calls on one bar set lets later misses reuse the
+        intermediates earlier ones computed. With `version` (from observe()), nothing is
+        read or stored once a different bar set has been observed for the series.
+        """
+        out, missing = {}, []
+        with self._lock:
+            stale = self._stale(symbol, timeframe, version)
+            for key in set(keys):
+                values = None if stale else self._entries.get((symbol, timeframe) + key)
+                if values is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end((symbol, timeframe) + key)
+                out[key] = values
+            self.hits += len(out)
+            self.misses += len(missing)
+        if not missing:
+            return out
+        if self._compute is compute_indicator:
+            fused = [key for key in missing if key[0] in OUTPUTS]
+            computed = (run or FusedRun(bars)).many(bars, fused) if fused else {}
+        else:
+            computed = {}
+        for key in missing:
+            if key not in computed:
+                computed[key] = self._compute(bars, key[0], dict(key[1]))
+        with self._lock:
+            stale = self._stale(symbol, timeframe, version)
+            for key, values in computed.items():
+                values.flags.writeable = False
+                entry = (symbol, timeframe) + key
+                if stale:
+                    out[key] = values
+                    continue
+                if entry not in self._entries:
+                    self._entries[entry] = values
+                    self._series_keys.setdefault((symbol, timeframe), set()).add(entry)
+                    self._bytes += values.nbytes
+                out[key] = self._entries[entry]
+            self._evict()
+        return out
+
+    def compute_for(self, symbol, timeframe, bars):
+        """Return a `compute(bars, indicator, params)` hook for engine.compute_series.
+
+        The hook's `many(bars, keys)` lets compute_series fetch a whole key set at once;
+        its misses share one kernels.FusedRun for as long as the hook lives.
+        """
+        version = self.observe(symbol, timeframe, bars)
+        run = FusedRun(bars)
+        hook = lambda bars, indicator, params=None: self.get(symbol, timeframe, bars, indicator, params, version=version)
+        hook.many = lambda bars, keys: self.get_many(symbol, timeframe, bars, keys, run=run, version=version)
+        return hook
+
+    def invalidate(self, symbol=None, timeframe=None):
+        with self._lock:
+            for sym, tf in list(self._series_keys):
+                if symbol in (None, sym) and timeframe in (None, tf):
+                    self._drop_series(sym, tf)
+                    self._versions.pop((sym, tf), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._series_keys.clear()
+            self._versions.clear()
+            self._bytes = 0
+
+    def _drop_series(self, symbol, timeframe):
+        keys = self._series_keys.pop((symbol, timeframe), ())
+        if keys:
+            self.invalidations += 1
+        for key in keys:
+            values = self._entries.pop(key, None)
+            if values is not None:
+                self._bytes -= values.nbytes
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            key, values = self._entries.popitem(last=False)
+            self._bytes -= values.nbytes
+            self._series_keys.get(key[:2], set()).discard(key)
+            self.evictions += 1
+
+# Shared by every evaluator in the process.
+indicator_cache = IndicatorCache()
+
+registry.gauge(
+    "indicator_cache_hit_ratio",
+    "Share of indicator lookups served from cache",
+    fn=lambda: indicator_cache.stats()["hit_rate"],
+)
+registry.gauge("indicator_cache_bytes", "Bytes held by cached series", fn=lambda: indicator_cache.stats()["bytes"])
+registry.counter(
+    "indicator_cache_events_total",
+    "Indicator cache hits, misses, evictions and invalidations",
+    labels=("event",),
+    fn=lambda: {k: v for k, v in indicator_cache.stats().items() if k in CACHE_EVENTS},
+)
@@ -0,0 +1,87 @@
+import importlib
+
+# The indicator registry on its own, without numpy or pandas, so modules that only build
+# menus or validate strategies (tg_bot's startup) stay light. The computations live in
+# indicators.py, which re-exports everything here.
+
+SOURCES = ["Close", "Open", "High", "Low", "HL2"]
+
+# ========== REGISTRY ==========
+# "class" is the dotted path of the ta class the indicator follows; see indicator_class().
+
+INDICATORS = {
+    "RSI": {
+        "class": "ta.momentum.RSIIndicator",
+        "params": {"period": (int, 14, None), "source": (str, "Close", SOURCES)},
+    },
+    "EMA": {
+        "class": "ta.trend.EMAIndicator",
+        "params": {"period": (int, 20, None), "source": (str, "Close", SOURCES)},
+    },
+    "SMA": {
+        "class": "ta.trend.SMAIndicator",
+        "params": {"period": (int, 50, None), "source": (str, "Close", SOURCES)},
+    },
+    "MACD": {
+        "class": "ta.trend.MACD",
+        "params": {
+            "fast": (int, 12, None),
+            "slow": (int, 26, None),
+            "signal": (int, 9, None),
+            "source": (str, "Close", SOURCES),
+        },
+    },
+    "Stochastic": {
+        "class": "ta.momentum.StochasticOscillator",
+        "params": {
+            "k_period": (int, 14, None),
+            "d_period": (int, 3, None),
+            "source": (str, "High", SOURCES),
+        },
+    },
+    "BollingerBands": {
+        "class": "ta.volatility.BollingerBands",
+        "params": {
+            "period": (int, 20, None),
+            "stddev": (float, 2, None),
+            "source": (str, "Close", SOURCES),
+        },
+    },
+    "ATR": {
+        "class": "ta.volatility.AverageTrueRange",
+        "params": {"period": (int, 14, None)},
+    },
+    "OBV": {
+        "class": "ta.volume.OnBalanceVolumeIndicator",
+        "params": {"source": (str, "Close", SOURCES)},
+    },
+}
+
+OPERATORS = ["<", ">", "==", "cross_above", "cross_below", "in_zone"]
+
+# ========== HELPERS ==========
+
+_classes = {}
+
+def indicator_class(indicator):
+    """The ta class behind `indicator`, imported on first use."""
+    cls = _classes.get(indicator)
+    if cls is None:
+        module, _, name = INDICATORS[indicator]["class"].rpartition(".")
+        cls = _classes[indicator] = getattr(importlib.import_module(module), name)
+    return cls
+
+def resolve_params(indicator, params=None):
+    """Fill defaults and coerce types for `params` against the registry entry."""
+    params = params or {}
+    resolved = {}
+    for name, (param_type, default, options) in INDICATORS[indicator]["params"].items():
+        val = params.get(name, default)
+        try:
+            val = param_type(val)
+        except (TypeError, ValueError):
+            val = default
+        if options and val not in options:
+            val = default
+        resolved[name] = val
+    return resolved
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from indicator_registry import INDICATORS, OPERATORS, SOURCES, indicator_class, resolve_params
+from metrics import INDICATOR_SECONDS
+
+# ta is imported inside the functions below, on the first indicator evaluation; numpy and
+# pandas are module-level since get_source()/_series() run on every computation. Modules
+# that only need the registry import indicator_registry instead.
+
+# ========== SOURCES ==========
+
+def get_source(bars, source):
+    """Return `source` from an OHLCV frame (or any column mapping) as a float array."""
+    if source == "HL2" and "HL2" not in bars:
+        return (get_source(bars, "High") + get_source(bars, "Low")) / 2.0
+    col = bars[source]
+    if hasattr(col, "to_numpy"):
+        return col.to_numpy(dtype=float)
+    return np.asarray(col, dtype=float)
+
+def _series(bars, source):
+    return pd.Series(get_source(bars, source), copy=False)
+
+# ========== COMPUTE ==========
+
+def _rsi(bars, p):
+    from ta.momentum import RSIIndicator
+
+    return RSIIndicator(_series(bars, p["source"]), window=p["period"]).rsi()
+
+def _ema(bars, p):
+    from ta.trend import EMAIndicator
+
+    return EMAIndicator(_series(bars, p["source"]), window=p["period"]).ema_indicator()
+
+def _sma(bars, p):
+    from ta.trend import SMAIndicator
+
+    return SMAIndicator(_series(bars, p["source"]), window=p["period"]).sma_indicator()
+
+def _macd(bars, p):
+    from ta.trend import MACD
+
+    return MACD(
+        _series(bars, p["source"]), window_slow=p["slow"], window_fast=p["fast"], window_sign=p["signal"]
+    ).macd()
+
+def _stochastic(bars, p):
+    from ta.momentum import StochasticOscillator
+
+    return StochasticOscillator(
+        _series(bars, "High"), _series(bars, "Low"), _series(bars, p["source"]),
+        window=p["k_period"], smooth_window=p["d_period"],
+    ).stoch()
+
+def _bollinger(bars, p):
+    from ta.volatility import BollingerBands
+
+    return BollingerBands(_series(bars, p["source"]), window=p["period"], window_dev=p["stddev"]).bollinger_mavg()
+
+def _atr(bars, p):
+    # Same output as AverageTrueRange.average_true_range(), whose Wilder smoothing is a per-bar
+    # Python loop: seed with the mean of the first window, then an adjust=False ewm.
+    window = p["period"]
+    high, low, close = get_source(bars, "High"), get_source(bars, "Low"), get_source(bars, "Close")
+    prev_close = np.r_[np.nan, close[:-1]]
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    atr = np.zeros(len(tr))
+    if len(tr) >= window:
+        seeded = tr[window - 1:].copy()
+        seeded[0] = tr[:window].mean()
+        atr[window - 1:] = pd.Series(seeded).ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+    return pd.Series(atr)
+
+def _obv(bars, p):
+    from ta.volume import OnBalanceVolumeIndicator
+
+    return OnBalanceVolumeIndicator(_series(bars, p["source"]), _series(bars, "Volume")).on_balance_volume()
+
+# ========== REGISTRY ==========
+
+COMPUTE = {
+    "RSI": _rsi,
+    "EMA": _ema,
+    "SMA": _sma,
+    "MACD": _macd,
+    "Stochastic": _stochastic,
+    "BollingerBands": _bollinger,
+    "ATR": _atr,
+    "OBV": _obv,
+}
+
+def compute_indicator(bars, indicator, params=None):
+    """Compute the primary output series of `indicator` over `bars` as a float array."""
+    params = resolve_params(indicator, params)
+    with INDICATOR_SECONDS.time(indicator=indicator):
+        out = COMPUTE[indicator](bars, params)
+        return out.to_numpy(dtype=float)
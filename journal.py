@@ -0,0 +1,378 @@
+import os
+import glob
+import threading
+
+import numpy as np
+
+DATA_DIR = "data"
+JOURNAL_DIR = "journal"
+# 32-byte records; a segment is 2**20 of them (32 MB, allocated sparse on disk).
+RECORD = np.dtype([("ts", "<i8"), ("user", "<i8"), ("symbol", "<u4"), ("condition", "<u4"), ("value", "<f8")])
+SEGMENT_RECORDS = 1 << 20
+SEGMENT_PATTERN = "segment-{:06d}.bin"
+# Slot index written next to a full segment: "<segment>.<field>.keys.npy" and ".slots.npy".
+INDEX_FIELDS = ("user", "symbol")
+TERM_FILES = {"symbol": "symbols.txt", "condition": "conditions.txt"}
+HISTORY_LIMIT = 10
+
+# ========== TERMS ==========
+
+class _Terms:
+    """Append-only string dictionary (symbols, condition texts) stored one term per line."""
+
+    def __init__(self, path, writable):
+        self.path = path
+        self.writable = writable
+        self.terms = []
+        self.ids = {}
+        self._size = 0
+
+    def reload(self):
+        """Pick up terms another process appended since the last read."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == self._size:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._size)
+            chunk = f.read(size - self._size)
+        # A term still being written has no newline yet; leave it for the next reload.
+        complete = chunk[: chunk.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            self.ids[line] = len(self.terms)
+            self.terms.append(line)
+        self._size += len(complete)
+
+    def intern(self, term):
+        term = term.replace("\n", " ")
+        term_id = self.ids.get(term)
+        if term_id is None:
+            with open(self.path, "ab") as f:
+                f.write(term.encode("utf-8") + b"\n")
+            self._size += len(term.encode("utf-8")) + 1
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def lookup(self, term_id):
+        if term_id >= len(self.terms):
+            self.reload()
+        return self.terms[term_id] if term_id < len(self.terms) else "?"
+
+# ========== SEGMENTS ==========
+
+def _group(keys, slots, index):
+    """Append `slots` to index[key] for each key, grouping with one sort instead of a Python loop per record."""
+    order = np.argsort(keys, kind="stable")
+    keys, slots = keys[order], slots[order]
+    bounds = np.flatnonzero(np.diff(keys)) + 1
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+        key = int(keys[start])
+        new = slots[start:stop]
+        old = index.get(key)
+        index[key] = new if old is None else np.concatenate([old, new])
+
+class _SlotIndex:
+    """Read-only key -> ascending slots map: sorted keys, offsets and one slots array.
+
+    Full segments keep theirs in two .npy files next to the segment, mapped rather than
+    read, so a lookup only touches the key row and that key's run of slots.
+    """
+
+    def __init__(self, heads, slots):
+        # heads[0] is the sorted keys (plus one pad), heads[1] the offsets of each key's slots.
+        self.heads = heads
+        self.slots = slots
+
+    @classmethod
+    def build(cls, keys):
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order].astype(np.int64)
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_keys)) + 1] if len(keys) else np.zeros(0, dtype=np.int64)
+        heads = np.stack([np.r_[sorted_keys[starts], 0], np.r_[starts, len(keys)]]).astype(np.int64)
+        return cls(heads, order.astype(np.uint32))
+
+    @classmethod
+    def load(cls, prefix):
+        """The index saved under `prefix`, or None if it was never (completely) written."""
+        try:
+            heads = np.load(prefix + ".keys.npy", mmap_mode="r")
+        except OSError:
+            return None
+        return cls(heads, np.load(prefix + ".slots.npy", mmap_mode="r"))
+
+    def save(self, prefix):
+        # Slots first and keys last, each swapped in whole: a reader that finds the keys finds both.
+        for suffix, array in ((".slots.npy", self.slots), (".keys.npy", self.heads)):
+            with open(prefix + suffix + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(prefix + suffix + ".tmp", prefix + suffix)
+
+    def get(self, key, default=None):
+        keys = self.heads[0, :-1]
+        i = int(np.searchsorted(keys, key))
+        if i == len(keys) or keys[i] != key:
+            return default
+        return np.asarray(self.slots[self.heads[1, i]:self.heads[1, i + 1]])
+
+class _Segment:
+    """One mapped segment file plus its per-user and per-symbol slot index.
+
+    The segment being written is indexed in memory, a batch of appended records at a
+    time; a full one gets a _SlotIndex written next to it that readers map instead.
+    """
+
+    def __init__(self, path, number, writable, capacity):
+        self.path = path
+        self.number = number
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            self.records = np.memmap(path, dtype=RECORD, mode="w+", shape=(capacity,))
+        else:
+            self.records = np.memmap(path, dtype=RECORD, mode="r+" if writable else "r")
+        self.capacity = len(self.records)
+        self.count = self._find_count()
+        self.base = 0
+        self.indexed = 0
+        self.users = {}
+        self.symbols = {}
+        if self.count == self.capacity:
+            self._load_index()
+
+    def _find_count(self):
+        # Records are written front to back with a non-zero timestamp written last, so the
+        # filled part is the prefix before the first zero timestamp.
+        ts = self.records["ts"]
+        lo, hi = 0, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ts[mid] != 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _index_prefix(self, field):
+        return f"{self.path[:-len('.bin')]}.{field}"
+
+    def _load_index(self):
+        indexes = [_SlotIndex.load(self._index_prefix(field)) for field in INDEX_FIELDS]
+        if None not in indexes:
+            self.users, self.symbols = indexes
+            self.indexed = self.count
+            return True
+        return False
+
+    def seal(self):
+        """Write the slot index of a full segment next to it (the writer does this once per segment)."""
+        indexes = [_SlotIndex.build(self.records[field]) for field in INDEX_FIELDS]
+        for field, index in zip(INDEX_FIELDS, indexes):
+            index.save(self._index_prefix(field))
+        self.users, self.symbols = indexes
+        self.indexed = self.count
+
+    def catch_up(self):
+        """Index records appended since the last call (by this or another process)."""
+        self.count = self._find_count()
+        if self.indexed >= self.count:
+            return
+        if self.indexed == 0 and self.count == self.capacity:
+            # A full segment whose index is missing (e.g. the writer stopped before sealing it).
+            if self._load_index():
+                return
+            if self.writable:
+                self.seal()
+                return
+        new = self.records[self.indexed:self.count]
+        slots = np.arange(self.indexed, self.count, dtype=np.uint32)
+        _group(new["user"], slots, self.users)
+        _group(new["symbol"], slots, self.symbols)
+        self.indexed = self.count
+
+    def slots(self, user=None, symbol=None):
+        """Ascending slots matching the filters; None means no filter."""
+        if user is None and symbol is None:
+            return np.arange(self.indexed, dtype=np.uint32)
+        slots = self.users.get(user) if user is not None else self.symbols.get(symbol)
+        if slots is None:
+            return np.zeros(0, dtype=np.uint32)
+        if user is not None and symbol is not None:
+            # A user's list is the short one: check its records' symbols rather than intersecting.
+            slots = slots[self.records["symbol"][slots] == symbol]
+        return slots
+
+# ========== JOURNAL ==========
+
+class SignalJournal:
+    """Append-only log of fired signals in memory-mapped, fixed-width segment files.
+
+    Each record is (ts ns, user, symbol id, condition id, value); symbol and condition
+    strings are interned in small text dictionaries next to the segments. One process
+    writes (the scheduler); any number of processes can read. Readers map the same
+    files, so new records show up without reopening. A full segment's per-user and
+    per-symbol slot index is written next to it and mapped by readers; the segment still
+    being written is indexed in memory, each query first adding the records appended
+    since the previous one. Pages are gathered straight from the mapped records.
+    """
+
+    def __init__(self, root=None, writable=True, segment_records=SEGMENT_RECORDS):
+        self.root = root or os.path.join(DATA_DIR, JOURNAL_DIR)
+        self.writable = writable
+        self.segment_records = segment_records
+        self.segments = []
+        self._lock = threading.Lock()
+        if writable:
+            os.makedirs(self.root, exist_ok=True)
+        self.terms = {kind: _Terms(os.path.join(self.root, name), writable) for kind, name in TERM_FILES.items()}
+        self._open_segments()
+
+    def _open_segments(self):
+        known = {seg.number for seg in self.segments}
+        for path in sorted(glob.glob(os.path.join(self.root, "segment-*.bin"))):
+            number = int(os.path.basename(path)[len("segment-"):-len(".bin")])
+            if number not in known:
+                self.segments.append(_Segment(path, number, self.writable, self.segment_records))
+        self.segments.sort(key=lambda seg: seg.number)
+        self._number_segments()
+        for terms in self.terms.values():
+            terms.reload()
+
+    def _number_segments(self):
+        # Sequence numbers run on across segments: a record's is its segment's base plus its slot.
+        base = 0
+        for seg in self.segments:
+            seg.base = base
+            base += seg.capacity
+
+    def _active(self):
+        if not self.segments or self.segments[-1].count >= self.segments[-1].capacity:
+            number = self.segments[-1].number + 1 if self.segments else 0
+            path = os.path.join(self.root, SEGMENT_PATTERN.format(number))
+            self.segments.append(_Segment(path, number, True, self.segment_records))
+            self._number_segments()
+        return self.segments[-1]
+
+    # ========== WRITES ==========
+
+    def append_many(self, ts, users, symbol, condition, values):
+        """Append one record per user for signals sharing a symbol and condition (one candle's hits)."""
+        if not self.writable:
+            raise PermissionError("Journal opened read-only")
+        users = np.asarray(users, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(values, dtype=float), users.shape)
+        with self._lock:
+            symbol_id = self.terms["symbol"].intern(symbol)
+            condition_id = self.terms["condition"].intern(condition)
+            done = 0
+            while done < len(users):
+                seg = self._active()
+                n = min(len(users) - done, seg.capacity - seg.count)
+                block = seg.records[seg.count:seg.count + n]
+                block["user"] = users[done:done + n]
+                block["symbol"] = symbol_id
+                block["condition"] = condition_id
+                block["value"] = values[done:done + n]
+                # Timestamp last: it is what marks the record as written for readers.
+                block["ts"] = ts
+                seg.count += n
+                done += n
+                if seg.count == seg.capacity:
+                    seg.seal()
+        return done
+
+    def append(self, ts, user, symbol, condition, value=float("nan")):
+        return self.append_many(ts, [user], symbol, condition, value)
+
+    def flush(self):
+        with self._lock:
+            for seg in self.segments:
+                if self.writable:
+                    seg.records.flush()
+
+    # ========== READS ==========
+
+    def refresh(self):
+        with self._lock:
+            self._open_segments()
+            for seg in self.segments:
+                seg.catch_up()
+
+    def history(self, user=None, symbol=None, before=None, limit=HISTORY_LIMIT):
+        """Newest-first page of signals, optionally for one user and/or symbol.
+
+        `before` is the cursor returned by the previous page (a global sequence number).
+        Returns (records as dicts, cursor for the next page or None).
+        """
+        self.refresh()
+        symbol_id = None
+        if symbol is not None:
+            symbol_id = self.terms["symbol"].ids.get(symbol)
+            if symbol_id is None:
+                return [], None
+        page = []
+        for seg in reversed(self.segments):
+            base = seg.base
+            if before is not None and base >= before:
+                continue
+            slots = seg.slots(user, symbol_id)
+            if before is not None and before - base < seg.indexed:
+                slots = slots[:np.searchsorted(slots, before - base)]
+            take = slots[-(limit - len(page)):][::-1]
+            if len(take):
+                page.extend((base + int(slot), rec) for slot, rec in zip(take, seg.records[take]))
+            if len(page) >= limit:
+                break
+        rows = [self._row(seq, rec) for seq, rec in page]
+        more = len(page) >= limit and self._has_older(user, symbol_id, page[-1][0])
+        return rows, (page[-1][0] if more else None)
+
+    def _has_older(self, user, symbol_id, seq):
+        for seg in reversed(self.segments):
+            base = seg.base
+            if base >= seq:
+                continue
+            slots = seg.slots(user, symbol_id)
+            if len(slots) and int(slots[0]) + base < seq:
+                return True
+        return False
+
+    def _row(self, seq, rec):
+        return {
+            "seq": seq,
+            "ts": int(rec["ts"]),
+            "user": int(rec["user"]),
+            "symbol": self.terms["symbol"].lookup(int(rec["symbol"])),
+            "condition": self.terms["condition"].lookup(int(rec["condition"])),
+            "value": float(rec["value"]),
+        }
+
+    def __len__(self):
+        self.refresh()
+        return sum(seg.count for seg in self.segments)
+
+    def stats(self):
+        self.refresh()
+        return {
+            "segments": len(self.segments),
+            "records": sum(seg.count for seg in self.segments),
+            "bytes": sum(seg.count for seg in self.segments) * RECORD.itemsize,
+            "symbols": len(self.terms["symbol"].terms),
+            "conditions": len(self.terms["condition"].terms),
+        }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            # Mappings are released once the segments are garbage collected.
+            self.segments = []
+
+_journals = {}
+
+def get_journal(writable=False):
+    """Process-wide journal under data/journal: the writer in the bot process, readers elsewhere."""
+    journal = _journals.get(writable)
+    if journal is None:
+        journal = _journals[writable] = SignalJournal(writable=writable)
+    return journal
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from indicators import get_source
+from metrics import INDICATOR_SECONDS
+
+# Fused computation of several indicator configs over one bar set. Every output is built
+# from named intermediates (a source column, its first difference, a rolling window, an
+# EMA...) that are computed once per bar set and shared by every output that needs them:
+# SMA(20) and BollingerBands(20) read one rolling mean, EMA(12)/EMA(26) and MACD(12, 26)
+# read the same two EMAs, RSI and OBV share Close.diff(). The intermediates use the same
+# pandas operations as the ta classes, so outputs equal compute_indicator() exactly.
+#
+# A scanner.Panel (symbols x bars) runs as one (bars x symbols) frame, so pandas'
+# column-wise rolling/ewm kernels do every symbol in one call. Its short rows are
+# left-padded with NaN, which every formula treats as bars before the symbol's first.
+
+# Distinct key sets whose plans are kept for reuse.
+MAX_PLANS = 256
+
+# ========== INTERMEDIATES ==========
+# Each takes the run and its arguments; dependencies go through run.get() so they are shared too.
+
+def _pandas(values):
+    """A Series for one bar set, a (bars x symbols) frame for a panel's (symbols x bars) array."""
+    return pd.Series(values, copy=False) if values.ndim == 1 else pd.DataFrame(values.T, copy=False)
+
+def _source(run, source):
+    return _pandas(get_source(run.bars, source))
+
+def _diff(run, source):
+    return run.get("source", source).diff(1)
+
+def _gains(run, source):
+    diff = run.get("diff", source)
+    # The first bar's NaN difference counts as 0, as in ta; padding stays NaN.
+    return diff.where(diff > 0, 0.0).where(run.get("source", source).notna())
+
+def _losses(run, source):
+    diff = run.get("diff", source)
+    return -diff.where(diff < 0, 0.0).where(run.get("source", source).notna())
+
+def _wilder(run, series, source, window):
+    """Wilder smoothing (alpha = 1/window) of the gains or losses of `source`."""
+    return run.get(series, source).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+
+def _rolling(run, source, window):
+    # One window object per (source, window); mean/min/max/std of it are separate intermediates.
+    return run.get("source", source).rolling(window, min_periods=window)
+
+def _rolling_mean(run, source, window):
+    return run.get("rolling", source, window).mean()
+
+def _rolling_min(run, source, window):
+    return run.get("rolling", source, window).min()
+
+def _rolling_max(run, source, window):
+    return run.get("rolling", source, window).max()
+
+def _ema(run, source, span):
+    return run.get("source", source).ewm(span=span, min_periods=span, adjust=False).mean()
+
+def _true_range(run):
+    high, low, close = (run.get("source", f).to_numpy() for f in ("High", "Low", "Close"))
+    prev_close = np.concatenate([np.full((1,) + close.shape[1:], np.nan), close[:-1]])
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+INTERMEDIATES = {
+    "source": _source,
+    "diff": _diff,
+    "gains": _gains,
+    "losses": _losses,
+    "wilder": _wilder,
+    "rolling": _rolling,
+    "rolling_mean": _rolling_mean,
+    "rolling_min": _rolling_min,
+    "rolling_max": _rolling_max,
+    "ema": _ema,
+    "true_range": _true_range,
+}
+
+# ========== OUTPUTS ==========
+# Same formulas as indicators.py / the ta classes, written against run.get().
+
+def _rsi(run, p):
+    up = run.get("wilder", "gains", p["source"], p["period"])
+    down = run.get("wilder", "losses", p["source"], p["period"])
+    return np.where(down == 0, 100, 100 - (100 / (1 + up / down)))
+
+def _ema_output(run, p):
+    return run.get("ema", p["source"], p["period"])
+
+def _sma(run, p):
+    return run.get("rolling_mean", p["source"], p["period"])
+
+def _macd(run, p):
+    return run.get("ema", p["source"], p["fast"]) - run.get("ema", p["source"], p["slow"])
+
+def _stochastic(run, p):
+    window = p["k_period"]
+    low = run.get("rolling_min", "Low", window)
+    high = run.get("rolling_max", "High", window)
+    return 100 * (run.get("source", p["source"]) - low) / (high - low)
+
+def _bollinger(run, p):
+    return run.get("rolling_mean", p["source"], p["period"])
+
+def _atr(run, p):
+    window = p["period"]
+    tr = run.get("true_range")
+    columns = tr.reshape(len(tr), -1)
+    # Each column is seeded with the mean of its first `window` true ranges and is 0 before
+    # that, as in ta; the ewm then skips the NaN rows ahead of every seed.
+    first = np.argmax(~np.isnan(columns), axis=0)
+    seed = first + window - 1
+    rows = np.arange(len(columns))[:, None]
+    seeded = np.where(rows > seed, columns, np.nan)
+    for col in np.flatnonzero(seed < len(columns)):
+        seeded[seed[col], col] = columns[first[col]:seed[col] + 1, col].mean()
+    atr = pd.DataFrame(seeded).ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+    return np.where(rows >= seed, atr, 0.0).reshape(tr.shape)
+
+def _obv(run, p):
+    # close < previous close, i.e. a negative first difference (NaN on the first bar counts as not).
+    falling = (run.get("diff", p["source"]) < 0).to_numpy()
+    volume = run.get("source", "Volume").to_numpy()
+    # pandas' cumsum skips the NaN padding instead of carrying it forward.
+    return _pandas(np.where(falling, -volume, volume).T).cumsum()
+
+OUTPUTS = {
+    "RSI": _rsi,
+    "EMA": _ema_output,
+    "SMA": _sma,
+    "MACD": _macd,
+    "Stochastic": _stochastic,
+    "BollingerBands": _bollinger,
+    "ATR": _atr,
+    "OBV": _obv,
+}
+
+# ========== PLAN ==========
+
+class _Run:
+    """Memo of the intermediates computed on one bar set."""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.memo = {}
+        self.requests = 0
+
+    def get(self, name, *args):
+        self.requests += 1
+        key = (name,) + args
+        value = self.memo.get(key)
+        if value is None:
+            value = self.memo[key] = INTERMEDIATES[name](self, *args)
+        return value
+
+def _output(run, key):
+    values = OUTPUTS[key[0]](run, dict(key[1]))
+    return values.to_numpy(dtype=float) if hasattr(values, "to_numpy") else np.asarray(values, dtype=float)
+
+class FusedPlan:
+    """The indicator keys (engine.indicator_key) wanted on one series and how they share work.
+
+    Built once for a key set and run on any number of bar sets. run() returns
+    {key: float array}; explain() lists the intermediates the last run computed once and
+    how many times outputs asked for them.
+    """
+
+    def __init__(self, keys):
+        self.keys = sorted(set(keys))
+        unknown = [key[0] for key in self.keys if key[0] not in OUTPUTS]
+        if unknown:
+            raise ValueError(f"No fused kernel for: {', '.join(unknown)}")
+        self._last = ([], 0)
+
+    def run(self, bars):
+        run = _Run(bars)
+        with INDICATOR_SECONDS.time(indicator="fused"):
+            out = {key: _output(run, key) for key in self.keys}
+        self._last = (list(run.memo), run.requests)
+        return out
+
+    def explain(self):
+        intermediates, requests = self._last
+        return {
+            "outputs": len(self.keys),
+            "intermediates": [f"{name}({', '.join(map(str, args))})" for name, *args in intermediates],
+            "requests": requests,
+        }
+
+class FusedRun:
+    """Fused outputs on one bar set, computed as they are asked for.
+
+    For callers that don't know their key set up front (the planner): intermediates
+    computed for earlier keys are reused by later ones. Usable as an engine.compute_series
+    `compute` hook; the `bars` argument is ignored in favour of the bound bar set.
+    """
+
+    def __init__(self, bars):
+        self._run = _Run(bars)
+
+    def __call__(self, bars, indicator, params=None):
+        from engine import indicator_key
+
+        return self.many(bars, [indicator_key(indicator, params)])[indicator_key(indicator, params)]
+
+    def many(self, bars, keys):
+        with INDICATOR_SECONDS.time(indicator="fused"):
+            return {key: _output(self._run, key) for key in keys}
+
+_plans = {}
+
+def compute_fused(bars, keys):
+    """{key: values} for every indicator key on `bars`, sharing intermediates; plans are reused per key set."""
+    keys = frozenset(keys)
+    plan = _plans.get(keys)
+    if plan is None:
+        if len(_plans) >= MAX_PLANS:
+            _plans.clear()
+        plan = _plans[keys] = FusedPlan(keys)
+    return plan.run(bars)
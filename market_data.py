@@ -0,0 +1,256 @@
+import os
+import zlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import FETCH_SECONDS
+
+DATA_DIR = "data"
+BARS_DIR = "bars"
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Timeframes we evaluate on and the yfinance interval each is downloaded with.
+YF_INTERVALS = {"1m": "1m", "5m": "5m", "15m": "15m", "30m": "30m", "1h": "60m", "1d": "1d"}
+# Timeframes yfinance has no interval for, built by resampling a finer one it does have.
+YF_RESAMPLED = {"4h": "1h"}
+# yfinance caps how far back intraday intervals go; used for the first (cold) download.
+YF_MAX_PERIOD = {"1m": "7d", "5m": "60d", "15m": "60d", "30m": "60d", "1h": "730d", "1d": "max"}
+
+TIMEFRAME_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400}
+
+def yf_symbol(symbol):
+    """EURUSD -> EURUSD=X; anything that already looks like a yfinance ticker is left alone."""
+    if len(symbol) == 6 and symbol.isalpha():
+        return f"{symbol.upper()}=X"
+    return symbol
+
+def _empty_frame():
+    return pd.DataFrame({f: np.empty(0) for f in FIELDS}, index=pd.DatetimeIndex([], tz="UTC"))
+
+def _normalize(df):
+    if df is None or df.empty:
+        return _empty_frame()
+    df = df[[f for f in FIELDS if f in df.columns]].dropna(how="all")
+    for f in FIELDS:
+        if f not in df.columns:
+            df[f] = 0.0
+    index = pd.DatetimeIndex(df.index)
+    df.index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    return df[FIELDS].astype(float)
+
+def resample_bars(df, timeframe):
+    """Aggregate finer OHLCV bars into `timeframe` candles, binned from the UTC midnight like the scheduler."""
+    if df.empty:
+        return df
+    rule = f"{TIMEFRAME_SECONDS[timeframe]}s"
+    agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+    return df.resample(rule, label="left", closed="left").agg(agg).dropna(subset=["Close"])
+
+# ========== PROVIDERS ==========
+
+class YFinanceProvider:
+    """Downloads every requested symbol for one timeframe in a single yfinance call."""
+
+    def fetch(self, symbols, timeframe, start=None):
+        import yfinance as yf
+
+        base = YF_RESAMPLED.get(timeframe)
+        if base is not None:
+            # Start at a candle boundary so the first resampled candle is complete.
+            start = pd.Timestamp(start).floor(f"{TIMEFRAME_SECONDS[timeframe]}s") if start is not None else None
+            frames = self.fetch(symbols, base, start=start)
+            return {symbol: resample_bars(df, timeframe) for symbol, df in frames.items()}
+        interval = YF_INTERVALS.get(timeframe)
+        if interval is None:
+            raise ValueError(f"Unsupported timeframe for yfinance: {timeframe}")
+        tickers = {yf_symbol(s): s for s in symbols}
+        kwargs = {"start": start} if start is not None else {"period": YF_MAX_PERIOD[timeframe]}
+        raw = yf.download(
+            tickers=list(tickers),
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            **kwargs,
+        )
+        frames = {}
+        for ticker, symbol in tickers.items():
+            if isinstance(raw.columns, pd.MultiIndex):
+                df = raw[ticker] if ticker in raw.columns.get_level_values(0) else None
+            else:
+                df = raw
+            frames[symbol] = _normalize(df)
+        return frames
+
+class FakeProvider:
+    """Deterministic offline provider: a seeded random walk per symbol, plus a call log."""
+
+    def __init__(self, end="2024-01-01", history=500, seed=0):
+        self.end = pd.Timestamp(end, tz="UTC")
+        self.history = history
+        self.seed = seed
+        self.calls = []
+        self._origin = {}
+
+    def fetch(self, symbols, timeframe, start=None):
+        self.calls.append((tuple(symbols), timeframe, start))
+        step = pd.Timedelta(seconds=TIMEFRAME_SECONDS[timeframe])
+        # Walks start from a fixed origin so overlapping fetches agree bar for bar.
+        origin = self._origin.setdefault(timeframe, self.end - (self.history - 1) * step)
+        index = pd.date_range(start=origin, end=self.end, freq=step)
+        frames = {}
+        for symbol in symbols:
+            frame = synthetic_bars(index, seed=zlib.crc32(f"{self.seed}:{symbol}".encode()))
+            frames[symbol] = frame.iloc[-self.history:] if start is None else frame[frame.index >= start]
+        return frames
+
+    def advance(self, bars=1, timeframe="1h"):
+        """Move the fake clock forward so the next fetch has new bars."""
+        self.end += bars * pd.Timedelta(seconds=TIMEFRAME_SECONDS[timeframe])
+
+def synthetic_bars(index, seed=0, start_price=1.1, vol=1e-3):
+    """Seeded random-walk OHLCV frame over `index`."""
+    # One generator per field, so a longer index extends a shorter one bar for bar.
+    close_rng, wick_rng, volume_rng = (np.random.default_rng([seed, field]) for field in range(3))
+    n = len(index)
+    close = start_price + np.cumsum(close_rng.normal(0, vol, n))
+    open_ = np.r_[close[:1], close[:-1]]
+    wick = np.abs(wick_rng.normal(0, vol / 2, n))
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) + wick,
+            "Low": np.minimum(open_, close) - wick,
+            "Close": close,
+            "Volume": volume_rng.integers(100, 10_000, n).astype(float),
+        },
+        index=index,
+    )
+
+# ========== STORE ==========
+
+class BarStore:
+    """Columnar on-disk bars: one .npy file per field under DATA_DIR/bars/<symbol>/<timeframe>/.
+
+    Reads are memory-mapped; writes go to a temp file and are renamed into place.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, BARS_DIR)
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol.replace("/", "_"), timeframe)
+
+    def load(self, symbol, timeframe):
+        path = self._dir(symbol, timeframe)
+        ts_file = os.path.join(path, "ts.npy")
+        if not os.path.exists(ts_file):
+            return _empty_frame()
+        # Fields first and ts last, the order _write replaces them in, then trimmed to the
+        # shortest: a write landing between the opens can only have lengthened the later files.
+        cols = {f: np.load(os.path.join(path, f"{f}.npy"), mmap_mode="r") for f in FIELDS}
+        ts = np.load(ts_file, mmap_mode="r")
+        n = min(len(ts), *(len(values) for values in cols.values()))
+        index = pd.DatetimeIndex(np.asarray(ts[:n]).view("datetime64[ns]"), tz="UTC")
+        return pd.DataFrame({f: values[:n] for f, values in cols.items()}, index=index, copy=False)
+
+    def last_timestamp(self, symbol, timeframe):
+        ts_file = os.path.join(self._dir(symbol, timeframe), "ts.npy")
+        if not os.path.exists(ts_file):
+            return None
+        ts = np.load(ts_file, mmap_mode="r")
+        return pd.Timestamp(int(ts[-1]), tz="UTC") if len(ts) else None
+
+    def append(self, symbol, timeframe, df):
+        """Merge `df` into the stored series; bars at or after df's first timestamp are replaced."""
+        df = _normalize(df)
+        if df.empty:
+            return 0
+        with self._lock:
+            old = self.load(symbol, timeframe)
+            old = old[old.index < df.index[0]]
+            merged = pd.concat([old, df]) if len(old) else df
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            self._write(symbol, timeframe, merged)
+        return len(df)
+
+    def _write(self, symbol, timeframe, df):
+        path = self._dir(symbol, timeframe)
+        os.makedirs(path, exist_ok=True)
+        columns = {"ts": df.index.as_unit("ns").asi8}
+        columns.update({f: df[f].to_numpy(dtype=float) for f in FIELDS})
+        # Field files first and the timestamp file last; load() reads them in the same order
+        # and trims to the shortest, so a concurrent reader gets a consistent prefix.
+        for name in FIELDS + ["ts"]:
+            tmp = os.path.join(path, f".{name}.npy.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, columns[name])
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+
+# ========== MARKET DATA ==========
+
+class MarketData:
+    """Batched refresh from a provider into a BarStore; all reads come from local disk."""
+
+    def __init__(self, provider=None, store=None):
+        self.provider = provider or YFinanceProvider()
+        self.store = store or BarStore()
+
+    def refresh(self, symbols, timeframe):
+        """Pull only the missing tail for every symbol in one provider call.
+
+        The last stored bar is re-fetched too, since it may have been incomplete.
+        Returns {symbol: number of bars written}.
+        """
+        symbols = sorted(set(symbols))
+        if not symbols:
+            return {}
+        last = {s: self.store.last_timestamp(s, timeframe) for s in symbols}
+        cold = [s for s in symbols if last[s] is None]
+        warm = [s for s in symbols if last[s] is not None]
+        written = {}
+        batches = []
+        if cold:
+            batches.append((cold, None))
+        if warm:
+            batches.append((warm, min(last[s] for s in warm)))
+        for batch, start in batches:
+            try:
+                with FETCH_SECONDS.time(timeframe=timeframe):
+                    frames = self.provider.fetch(batch, timeframe, start=start)
+            except Exception as e:
+                logging.error(f"[market_data] Fetch failed for {batch} {timeframe}: {e}")
+                continue
+            for symbol in batch:
+                df = frames.get(symbol)
+                if df is None or df.empty:
+                    written[symbol] = 0
+                    continue
+                if last[symbol] is not None:
+                    df = df[df.index >= last[symbol]]
+                written[symbol] = self.store.append(symbol, timeframe, df)
+        return written
+
+    def bars(self, symbol, timeframe, limit=None):
+        df = self.store.load(symbol, timeframe)
+        return df.iloc[-limit:] if limit else df
+
+    def load_group(self, symbols, timeframe, limit=None, refresh=False):
+        """Bars for several symbols at once, optionally refreshing them first in one batch."""
+        if refresh:
+            self.refresh(symbols, timeframe)
+        return {s: self.bars(s, timeframe, limit) for s in symbols}
+
+_market_data = None
+
+def get_market_data():
+    """Process-wide default MarketData (yfinance into data/bars)."""
+    global _market_data
+    if _market_data is None:
+        _market_data = MarketData()
+    return _market_data
@@ -0,0 +1,255 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+from metrics import registry
+
+# Telegram allows roughly 30 messages/s overall and 1 message/s to the same chat.
+GLOBAL_RATE = 25.0
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+SENDERS = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# Messages enqueued with the same dedupe_key inside this window are sent once.
+DEDUPE_TTL = 300.0
+MAX_MESSAGE_LENGTH = 4096
+MAX_IDLE_BUCKETS = 10_000
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Consume a token if one is available; otherwise return seconds until one is."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class Notifier:
+    """Outbound message queue with dedupe, per-chat coalescing and rate limiting.
+
+    enqueue() is synchronous and never touches the network. Sender tasks take chats from a
+    ready queue, merge everything pending for that chat into one message, wait for the
+    global and per-chat token buckets, and retry with backoff (honouring 429 retry_after).
+    """
+
+    def __init__(
+        self,
+        send,
+        global_rate=GLOBAL_RATE,
+        global_burst=GLOBAL_BURST,
+        chat_rate=CHAT_RATE,
+        chat_burst=CHAT_BURST,
+        senders=SENDERS,
+        max_retries=MAX_RETRIES,
+        dedupe_ttl=DEDUPE_TTL,
+    ):
+        self.send = send
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.senders = senders
+        self.max_retries = max_retries
+        self.dedupe_ttl = dedupe_ttl
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chat_buckets = {}
+        self._pending = {}
+        self._attempts = {}
+        self._seen = {}
+        self._seen_order = deque()
+        self._ready = None
+        self._tasks = []
+        self._sent_times = deque()
+        self.counters = {
+            "enqueued": 0,
+            "deduped": 0,
+            "coalesced": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+        }
+        registry.gauge("notifier_queue_depth", "Messages waiting to be sent", fn=self.queue_depth)
+        registry.gauge("notifier_chats_pending", "Chats with queued messages", fn=lambda: len(self._pending))
+        registry.counter("notifier_messages_total", "Outbound message events", labels=("event",), fn=lambda: dict(self.counters))
+
+    # --- producer side ---
+
+    def enqueue(self, chat_id, text, dedupe_key=None, **kwargs):
+        """Queue a message. Extra kwargs (e.g. reply_markup) make it a standalone send.
+
+        Messages given a `dedupe_key` (signal alerts) are sent once per key within the dedupe
+        window; everything else, like handler replies, is always sent.
+        """
+        self.counters["enqueued"] += 1
+        if dedupe_key is not None and not kwargs and self._is_duplicate(dedupe_key):
+            self.counters["deduped"] += 1
+            return False
+        queue = self._pending.get(chat_id)
+        if queue is None:
+            queue = self._pending[chat_id] = deque()
+            self._mark_ready(chat_id)
+        queue.append((text, kwargs))
+        return True
+
+    async def send_message(self, chat_id, text, **kwargs):
+        """Drop-in for bot.send_message that only enqueues."""
+        self.enqueue(chat_id, text, **kwargs)
+
+    def _is_duplicate(self, key):
+        now = time.monotonic()
+        while self._seen_order and self._seen_order[0][0] < now:
+            expires, old = self._seen_order.popleft()
+            if self._seen.get(old) == expires:
+                del self._seen[old]
+        if key in self._seen:
+            return True
+        expires = now + self.dedupe_ttl
+        self._seen[key] = expires
+        self._seen_order.append((expires, key))
+        return False
+
+    def _mark_ready(self, chat_id, delay=0.0):
+        if self._ready is None:
+            return
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, chat_id)
+        else:
+            self._ready.put_nowait(chat_id)
+
+    # --- sender side ---
+
+    def start(self):
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        for chat_id in self._pending:
+            self._ready.put_nowait(chat_id)
+        self._tasks = [asyncio.create_task(self._sender()) for _ in range(self.senders)]
+
+    async def stop(self, drain_timeout=5.0):
+        """Give queued messages up to `drain_timeout` seconds, then cancel the senders."""
+        deadline = time.monotonic() + drain_timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._ready = None
+
+    async def _sender(self):
+        while True:
+            chat_id = await self._ready.get()
+            try:
+                await self._deliver(chat_id)
+            except Exception as e:
+                logging.error(f"[notifier] Unexpected error for chat {chat_id}: {e}")
+
+    def _next_batch(self, queue):
+        """Pop one standalone message, or as many plain ones as fit in a single Telegram message."""
+        text, kwargs = queue.popleft()
+        if kwargs:
+            return text, kwargs
+        parts = [text]
+        length = len(text)
+        while queue and not queue[0][1] and length + 2 + len(queue[0][0]) <= MAX_MESSAGE_LENGTH:
+            parts.append(queue.popleft()[0])
+            length += 2 + len(parts[-1])
+        self.counters["coalesced"] += len(parts) - 1
+        return "\n\n".join(parts), {}
+
+    async def _deliver(self, chat_id):
+        queue = self._pending.get(chat_id)
+        if not queue:
+            self._pending.pop(chat_id, None)
+            return
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        wait = bucket.take()
+        if wait > 0:
+            self._mark_ready(chat_id, wait)
+            return
+        wait = self._global.take()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._global.take()
+
+        text, kwargs = self._next_batch(queue)
+        try:
+            await self.send(chat_id=chat_id, text=text, **kwargs)
+        except RetryAfter as e:
+            self.counters["rate_limited"] += 1
+            retry_after = e.retry_after
+            retry_after = retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+            self._retry(chat_id, queue, text, kwargs, retry_after)
+            return
+        except (TimedOut, NetworkError) as e:
+            attempt = self._attempts.get(chat_id, 0)
+            self._retry(chat_id, queue, text, kwargs, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt), error=e)
+            return
+        except Exception as e:
+            self.counters["failed"] += 1
+            logging.error(f"[notifier] Dropping message to {chat_id}: {e}")
+        else:
+            self.counters["sent"] += 1
+            self._sent_times.append(time.monotonic())
+        self._attempts.pop(chat_id, None)
+        if queue:
+            self._mark_ready(chat_id)
+        else:
+            self._pending.pop(chat_id, None)
+            if len(self._chat_buckets) > MAX_IDLE_BUCKETS:
+                self._prune_buckets()
+
+    def _prune_buckets(self):
+        # A bucket that has refilled completely carries no state; drop it for idle chats.
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            if chat_id not in self._pending and bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.capacity:
+                del self._chat_buckets[chat_id]
+
+    def _retry(self, chat_id, queue, text, kwargs, delay, error=None):
+        attempt = self._attempts.get(chat_id, 0) + 1
+        if attempt > self.max_retries:
+            self.counters["failed"] += 1
+            self._attempts.pop(chat_id, None)
+            logging.error(f"[notifier] Giving up on chat {chat_id} after {attempt - 1} retries: {error}")
+            if queue:
+                self._mark_ready(chat_id)
+            else:
+                self._pending.pop(chat_id, None)
+            return
+        self._attempts[chat_id] = attempt
+        self.counters["retries"] += 1
+        queue.appendleft((text, kwargs))
+        self._mark_ready(chat_id, delay)
+
+    # --- metrics ---
+
+    def queue_depth(self):
+        return sum(len(q) for q in self._pending.values())
+
+    def metrics(self):
+        now = time.monotonic()
+        while self._sent_times and self._sent_times[0] < now - 60:
+            self._sent_times.popleft()
+        return {
+            **self.counters,
+            "queue_depth": self.queue_depth(),
+            "chats_pending": len(self._pending),
+            "sent_per_second_1m": len(self._sent_times) / 60.0,
+        }
@@ -0,0 +1,184 @@
+import copy
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest import DEFAULT_COST, backtest
+from engine import indicator_key
+from indicators import INDICATORS, compute_indicator, get_source, resolve_params
+from workers import default_worker_count
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+# Param sets handed to a worker at a time; neighbours in the grid share indicator configs.
+CHUNK_SIZE = 64
+
+# ========== PARAM PATHS ==========
+
+def _parse_path(strategy, path):
+    """"0.period" -> lhs param, "0.compare_to.period" -> compare-to param, "0.value" -> threshold."""
+    parts = path.split(".")
+    try:
+        idx = int(parts[0])
+        cond = strategy["conditions"][idx]
+    except (ValueError, IndexError):
+        raise ValueError(f"Bad parameter path '{path}': no condition {parts[0]}")
+    if parts[1:] == ["value"]:
+        return idx, "value", None
+    if len(parts) == 3 and parts[1] == "compare_to":
+        indicator = (cond.get("compare_to") or {}).get("indicator")
+        name, where = parts[2], "compare_to"
+    elif len(parts) == 2:
+        indicator, name, where = cond["indicator"], parts[1], "params"
+    else:
+        raise ValueError(f"Bad parameter path '{path}'")
+    if indicator not in INDICATORS or name not in INDICATORS[indicator]["params"]:
+        raise ValueError(f"Bad parameter path '{path}': {indicator} has no param '{name}'")
+    return idx, where, name
+
+def apply_params(strategy, assignment):
+    """Copy of `strategy` with {path: value} assignments applied."""
+    strategy = copy.deepcopy(strategy)
+    for path, value in assignment.items():
+        idx, where, name = _parse_path(strategy, path)
+        cond = strategy["conditions"][idx]
+        if where == "value":
+            cond["compare_to"] = {"value": float(value)}
+        elif where == "compare_to":
+            cond["compare_to"].setdefault("params", {})[name] = value
+        else:
+            cond.setdefault("params", {})[name] = value
+    return strategy
+
+def grid(ranges):
+    """Every combination of {path: [values]}, varying the last path fastest."""
+    paths = list(ranges)
+    for values in itertools.product(*(list(ranges[p]) for p in paths)):
+        yield dict(zip(paths, values))
+
+def random_sample(ranges, n, seed=0):
+    rng = random.Random(seed)
+    paths = list(ranges)
+    seen = set()
+    total = int(np.prod([len(list(ranges[p])) for p in paths])) if paths else 0
+    while len(seen) < min(n, total):
+        combo = tuple(rng.choice(list(ranges[p])) for p in paths)
+        if combo not in seen:
+            seen.add(combo)
+            yield dict(zip(paths, combo))
+
+# ========== SHARED INTERMEDIATES ==========
+
+class SharedCompute:
+    """compute(bars, indicator, params) hook that shares work across parameter sets.
+
+    Every indicator config is computed once per sweep; SMA and the Bollinger middle band
+    for any length come from one cumulative-sum pass per source.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._cumsum = {}
+        self.computed = 0
+        self.reused = 0
+
+    def __call__(self, bars, indicator, params=None):
+        key = indicator_key(indicator, params)
+        values = self._series.get(key)
+        if values is not None:
+            self.reused += 1
+            return values
+        self.computed += 1
+        p = resolve_params(indicator, params)
+        if indicator in ("SMA", "BollingerBands"):
+            values = self._rolling_mean(bars, p["source"], p["period"])
+        else:
+            values = compute_indicator(bars, indicator, p)
+        self._series[key] = values
+        return values
+
+    def _rolling_mean(self, bars, source, window):
+        if source not in self._cumsum:
+            x = get_source(bars, source)
+            # Offset by the first value to keep the running sum small and precise.
+            base = x[0] if len(x) else 0.0
+            self._cumsum[source] = (base, np.r_[0.0, np.cumsum(x - base)])
+        base, sums = self._cumsum[source]
+        n = len(sums) - 1
+        out = np.full(n, np.nan)
+        if window <= n:
+            out[window - 1:] = (sums[window:] - sums[:-window]) / window + base
+        return out
+
+# ========== SWEEP ==========
+
+_worker_bars = None
+_worker_compute = None
+
+def _init_worker(columns, index):
+    global _worker_bars, _worker_compute
+    _worker_bars = pd.DataFrame(columns, index=index)
+    _worker_compute = SharedCompute()
+
+def _run_chunk(strategy, assignments, cost, timeframe, bars=None, compute=None):
+    if bars is None:
+        bars, compute = _worker_bars, _worker_compute
+    rows = []
+    for assignment in assignments:
+        try:
+            candidate = apply_params(strategy, assignment)
+            result = backtest(bars, candidate, cost=cost, timeframe=timeframe, compute=compute)
+        except (KeyError, ValueError):
+            continue
+        rows.append({**assignment, **result})
+    return rows
+
+def optimize(
+    bars,
+    strategy,
+    ranges,
+    method="grid",
+    samples=200,
+    seed=0,
+    metric="total_return",
+    cost=DEFAULT_COST,
+    timeframe=None,
+    workers=None,
+    top=None,
+):
+    """Sweep `ranges` ({param path: values}) over historical `bars` and rank by `metric`.
+
+    Paths look like "0.period" (condition 0's indicator), "0.compare_to.period" (its
+    compare-to indicator) or "0.value" (its threshold). Returns a DataFrame, best first.
+    """
+    for path in ranges:
+        _parse_path(strategy, path)
+    assignments = list(grid(ranges) if method == "grid" else random_sample(ranges, samples, seed))
+    chunks = [assignments[i:i + CHUNK_SIZE] for i in range(0, len(assignments), CHUNK_SIZE)]
+    workers = min(workers or default_worker_count(), len(chunks) or 1)
+
+    rows = []
+    if workers <= 1:
+        compute = SharedCompute()
+        for chunk in chunks:
+            rows.extend(_run_chunk(strategy, chunk, cost, timeframe, bars=bars, compute=compute))
+    else:
+        columns = {f: get_source(bars, f) for f in FIELDS if f in bars}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(columns, getattr(bars, "index", None)),
+        ) as executor:
+            futures = [executor.submit(_run_chunk, strategy, chunk, cost, timeframe) for chunk in chunks]
+            for future in futures:
+                rows.extend(future.result())
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table.sort_values(metric, ascending=False, kind="stable").reset_index(drop=True)
+    return table.head(top) if top else table
@@ -0,0 +1,95 @@
+import time
+from collections.abc import MutableMapping
+
+from telegram.ext import BasePersistence
+
+# How long a worker trusts a conversation state it read. ConversationHandler reads the
+# state several times per update; this keeps that to one store read without letting
+# another worker's newer state go unseen for longer than a double tap.
+STATE_CACHE_TTL = 0.05
+
+class HandlerStates(MutableMapping):
+    """ConversationHandler.conversations backed by a Store.
+
+    Reads go through a short-lived local cache to the store; writes update the cache and
+    are queued in the store (write-behind), so every worker sharing the store can pick up
+    any user's conversation.
+    """
+
+    def __init__(self, store, name, ttl=STATE_CACHE_TTL):
+        self.store = store
+        self.name = name
+        self.ttl = ttl
+        self._cache = {}
+
+    def __getitem__(self, key):
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > now:
+            state = cached[0]
+        else:
+            state = self.store.get_handler_state(self.name, key)
+            self._cache[key] = (state, now + self.ttl)
+        if state is None:
+            raise KeyError(key)
+        return state
+
+    def __setitem__(self, key, state):
+        self._cache[key] = (state, time.monotonic() + self.ttl)
+        # (old_state, Promise) pairs from run_async handlers only make sense in this process.
+        if not isinstance(state, tuple):
+            self.store.save_handler_state(self.name, key, state)
+
+    def __delitem__(self, key):
+        self[key]
+        self._cache[key] = (None, time.monotonic() + self.ttl)
+        self.store.delete_handler_state(self.name, key)
+
+    def __iter__(self):
+        return iter(self.store.handler_states(self.name))
+
+    def __len__(self):
+        return len(self.store.handler_states(self.name))
+
+class StorePersistence(BasePersistence):
+    """python-telegram-bot persistence that keeps ConversationHandler states in a Store.
+
+    Only conversation states are handled here: tg_bot keeps user_data and strategies in
+    the same store through StoredMapping, so user/chat/bot data are left off.
+    """
+
+    def __init__(self, store, ttl=STATE_CACHE_TTL):
+        super().__init__(store_user_data=False, store_chat_data=False, store_bot_data=False)
+        self.store = store
+        self.ttl = ttl
+        self._conversations = {}
+
+    def get_conversations(self, name):
+        if name not in self._conversations:
+            self._conversations[name] = HandlerStates(self.store, name, self.ttl)
+        return self._conversations[name]
+
+    def update_conversation(self, name, key, new_state):
+        # HandlerStates already queued the write when the handler assigned the new state.
+        pass
+
+    def get_user_data(self):
+        return {}
+
+    def get_chat_data(self):
+        return {}
+
+    def get_bot_data(self):
+        return {}
+
+    def update_user_data(self, user_id, data):
+        pass
+
+    def update_chat_data(self, chat_id, data):
+        pass
+
+    def update_bot_data(self, data):
+        pass
+
+    def flush(self):
+        self.store.flush()
@@ -0,0 +1,249 @@
+import time
+import logging
+import threading
+
+from engine import CompiledCondition, compile_strategy, compute_series, describe_condition, evaluate_condition
+from kernels import FusedRun
+from metrics import INDICATOR_SECONDS, registry
+
+# Weight of the newest measurement in the running cost averages.
+COST_ALPHA = 0.2
+# Assumed cost of an indicator nothing has measured yet (seconds).
+DEFAULT_COST = 0.001
+# Floor for the probabilities used in ranks, so a condition that has never been false
+# (or true) still gets a finite rank.
+MIN_PROBABILITY = 0.01
+PLANNER_EVENTS = ("conditions", "short_circuits", "indicators")
+# Name the scheduler keeps its statistics under in the store, for /explain in the bot process.
+STATS_NAME = "planner"
+
+class BarState:
+    """What has already been computed on one bar set: indicator series and condition results."""
+
+    def __init__(self, bars, compute):
+        self.bars = bars
+        self.compute = compute
+        self.series = {}
+        self.results = {}
+
+class Planner:
+    """Orders a strategy's conditions by cost and selectivity and short-circuits on the last bar.
+
+    Each condition's cost is the running average compute time of the indicators it
+    still needs on this bar set (already computed ones are free), and its selectivity
+    is the observed share of bars on which it held. AND chains run the condition most
+    likely to be false per unit of cost first and stop at the first false one; OR chains
+    mirror that. Indicators are computed lazily, so one that no surviving condition needs
+    is never computed. The statistics keep updating, so the order follows the market.
+
+    One planner is shared by the scheduler's worker threads, so the statistics are only
+    read and written under its lock; `version` counts updates, so save() can skip a
+    store write when nothing changed, and prune() drops conditions no strategy uses.
+    """
+
+    def __init__(self, alpha=COST_ALPHA):
+        self.alpha = alpha
+        # indicator key -> running average seconds
+        self.costs = {}
+        # CompiledCondition -> [evaluations, times true]
+        self.nodes = {}
+        self.counts = dict.fromkeys(PLANNER_EVENTS, 0)
+        self.version = 0
+        self._saved_version = None
+        self._lock = threading.Lock()
+
+    # ========== STATISTICS ==========
+
+    def cost(self, key):
+        """Measured cost of computing an indicator key, else the process-wide histogram average."""
+        with self._lock:
+            cost = self.costs.get(key)
+        if cost is not None:
+            return cost
+        count, total = INDICATOR_SECONDS.snapshot(indicator=key[0])
+        return total / count if count else DEFAULT_COST
+
+    def selectivity(self, cond):
+        """Share of evaluations on which `cond` was true (Laplace-smoothed, 0.5 when unseen)."""
+        with self._lock:
+            evaluations, hits = self.nodes.get(cond, (0, 0))
+        return (hits + 1) / (evaluations + 2)
+
+    def _record_cost(self, key, seconds):
+        with self._lock:
+            previous = self.costs.get(key)
+            self.costs[key] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+            self.counts["indicators"] += 1
+            self.version += 1
+
+    def _record_result(self, cond, value):
+        with self._lock:
+            stats = self.nodes.setdefault(cond, [0, 0])
+            stats[0] += 1
+            stats[1] += value
+            self.counts["conditions"] += 1
+            self.version += 1
+
+    def prune(self, strategies):
+        """Drop the statistics of conditions and indicators no strategy in `strategies` uses."""
+        live = set()
+        for strategy in strategies.values():
+            try:
+                live.update(compile_strategy(strategy).conditions)
+            except (KeyError, ValueError):
+                continue
+        keys = {key for cond in live for key in ((cond.lhs, cond.rhs) if cond.kind == "indicator" else (cond.lhs,))}
+        with self._lock:
+            stale = [cond for cond in self.nodes if cond not in live]
+            for cond in stale:
+                del self.nodes[cond]
+            unused = [key for key in self.costs if key not in keys]
+            for key in unused:
+                del self.costs[key]
+            if stale or unused:
+                self.version += 1
+        return len(stale)
+
+    # ========== PLANNING ==========
+
+    def condition_cost(self, cond, computed=()):
+        keys = {cond.lhs, cond.rhs} if cond.kind == "indicator" else {cond.lhs}
+        return sum(self.cost(key) for key in keys if key not in computed)
+
+    def rank(self, logic, cond, computed=(), results=()):
+        """Expected cost per chain-ending outcome; lower runs first."""
+        if cond in results:
+            return 0.0
+        p = self.selectivity(cond)
+        stop = 1 - p if logic == "AND" else p
+        return self.condition_cost(cond, computed) / max(stop, MIN_PROBABILITY)
+
+    def plan(self, compiled, computed=(), results=()):
+        """Conditions in the order evaluate() would try them, given what is already computed."""
+        remaining = list(dict.fromkeys(compiled.conditions))
+        computed = set(computed)
+        order = []
+        while remaining:
+            cond = min(remaining, key=lambda c: self.rank(compiled.logic, c, computed, results))
+            remaining.remove(cond)
+            order.append(cond)
+            computed.add(cond.lhs)
+            if cond.kind == "indicator":
+                computed.add(cond.rhs)
+        return order
+
+    # ========== EVALUATION ==========
+
+    def _series(self, state, keys):
+        """The condition's indicator series; the missing ones come from one compute_series call."""
+        missing = [key for key in keys if key not in state.series]
+        if missing:
+            start = time.perf_counter()
+            state.series.update(compute_series(state.bars, missing, compute=state.compute))
+            seconds = (time.perf_counter() - start) / len(missing)
+            for key in missing:
+                self._record_cost(key, seconds)
+        return {key: state.series[key] for key in keys}
+
+    def _condition(self, state, cond):
+        value = state.results.get(cond)
+        if value is None:
+            series = self._series(state, {cond.lhs, cond.rhs} if cond.kind == "indicator" else {cond.lhs})
+            tail = {key: values[-2:] for key, values in series.items()}
+            out = evaluate_condition(cond, tail)
+            value = state.results[cond] = bool(len(out) and out[-1])
+            self._record_result(cond, value)
+        return value
+
+    def evaluate(self, compiled, state):
+        """Last-bar value of one compiled strategy, computing only what the plan reaches."""
+        if not compiled.conditions:
+            return False
+        stop = compiled.logic != "AND"
+        remaining = list(dict.fromkeys(compiled.conditions))
+        while remaining:
+            # Re-planned after every step: a condition sharing a just-computed indicator gets cheaper.
+            cond = min(remaining, key=lambda c: self.rank(compiled.logic, c, state.series, state.results))
+            remaining.remove(cond)
+            if self._condition(state, cond) == stop:
+                if remaining:
+                    with self._lock:
+                        self.counts["short_circuits"] += 1
+                return stop
+        return not stop
+
+    def signals(self, bars, strategies, compute=None):
+        """User ids whose strategy is true on the most recent bar (same result as engine.last_signals)."""
+        state = BarState(bars, compute or FusedRun(bars))
+        hits = []
+        for user_id, strategy in strategies.items():
+            try:
+                compiled = compile_strategy(strategy)
+            except (KeyError, ValueError) as e:
+                logging.warning(f"[planner] Skipping strategy for {user_id}: {e}")
+                continue
+            if self.evaluate(compiled, state):
+                hits.append(user_id)
+        return hits
+
+    def explain(self, strategy):
+        """The plan for `strategy` as text, one line per condition with its estimates."""
+        compiled = compile_strategy(strategy)
+        descriptions = dict(zip(compiled.conditions, (describe_condition(c) for c in strategy["conditions"])))
+        lines = [f"Plan ({compiled.logic}, stops at the first {'false' if compiled.logic == 'AND' else 'true'}):"]
+        computed = set()
+        for step, cond in enumerate(self.plan(compiled), 1):
+            with self._lock:
+                evaluations = self.nodes.get(cond, (0, 0))[0]
+            lines.append(
+                f"{step}. {descriptions[cond]}"
+                f" | cost {self.condition_cost(cond, computed) * 1000:.2f} ms"
+                f" | P(true) {self.selectivity(cond):.2f}"
+                f" | rank {self.rank(compiled.logic, cond, computed) * 1000:.2f}"
+                f" | seen {evaluations}"
+            )
+            computed.add(cond.lhs)
+            if cond.kind == "indicator":
+                computed.add(cond.rhs)
+        return "\n".join(lines)
+
+    # ========== PERSISTENCE ==========
+
+    def save(self, store):
+        """Write the measured costs and selectivities to `store`; False if unchanged since the last save."""
+        with self._lock:
+            if self.version == self._saved_version:
+                return False
+            version = self.version
+            stats = {
+                "costs": [[key, seconds] for key, seconds in self.costs.items()],
+                "nodes": [[cond, list(counts)] for cond, counts in self.nodes.items()],
+            }
+        store.save_stats(STATS_NAME, stats)
+        self._saved_version = version
+        return True
+
+    def load(self, store):
+        """Replace the statistics with those last saved to `store` (if any); returns self."""
+        stats = store.get_stats(STATS_NAME)
+        if stats:
+            costs = {_tuples(key): seconds for key, seconds in stats["costs"]}
+            nodes = {CompiledCondition(*_tuples(cond)): list(counts) for cond, counts in stats["nodes"]}
+            with self._lock:
+                self.costs, self.nodes = costs, nodes
+                self._saved_version = self.version
+        return self
+
+def _tuples(value):
+    """JSON lists back into the nested tuples of indicator keys and conditions."""
+    return tuple(_tuples(v) for v in value) if isinstance(value, list) else value
+
+# Shared by the schedulers in a process; /explain reads what they save to the store.
+planner = Planner()
+
+registry.counter(
+    "planner_events_total",
+    "Conditions evaluated, chains short-circuited and indicators computed by the planner",
+    labels=("event",),
+    fn=lambda: dict(planner.counts),
+)
@@ -0,0 +1,561 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import contextvars
+import tracemalloc
+from collections import deque
+
+# Replays never touch the real strategy DB.
+os.environ.setdefault("STRATEGY_STORE", "memory")
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from fake_telegram import FakeBotApi, callback_update, message_update
+from indicators import INDICATORS
+from journal import SignalJournal
+from market_data import FIELDS, TIMEFRAME_SECONDS, synthetic_bars
+from notifier import DEDUPE_TTL, Notifier
+from resampler import NS, Resampler
+from scanner import DEFAULT_UNIVERSE
+from scheduler import SignalScheduler, describe_strategy
+from storage import get_store
+
+# Offline load test: a tick tape (synthetic or recorded) is replayed through the resampler
+# into the scheduler's group evaluation, hits go through the notifier to a local fake Bot
+# API, and simulated users build their strategies through the tg_bot conversation first.
+SYMBOLS = 8
+USERS = 200
+TIMEFRAMES = ["1m", "5m", "15m"]
+# Tape length (seconds of market time) and spacing of synthetic ticks per symbol.
+DURATION = 2 * 3600
+TICK_SECONDS = 1.0
+# 1m bars fed before the tape so the slowest indicator is warm on every timeframe.
+WARMUP_BARS = 1440
+START = "2024-01-02"
+# Market seconds per wall second; 0 replays as fast as possible.
+SPEED = 0.0
+TOKEN = "123:REPLAY"
+SIGNAL_PREFIX = "📈 Signal on"
+# Ticks between forced yields to the loop when nothing else yields (unpaced replays).
+YIELD_EVERY = 256
+DRAIN_TIMEOUT = 60.0
+DEFAULT_OUTPUT = "replay_output.json"
+
+# Wall time of the tick that closed the candle a group task is evaluating; each task
+# gets its own copy of the context, so it survives later candles closing meanwhile.
+_candle_tick = contextvars.ContextVar("candle_tick", default=None)
+
+# ========== TICKS ==========
+
+def _seed(seed, symbol):
+    # Same scheme as FakeProvider, so a symbol's walk only depends on (seed, symbol).
+    return zlib.crc32(f"{seed}:{symbol}".encode())
+
+def warmup_bars(symbol, start, bars=WARMUP_BARS, seed=0, end_price=None):
+    """Seeded 1m history ending just before `start`, scaled so its last close is `end_price`.
+
+    A synthetic tape starts at the unscaled history's last close, so replaying a saved
+    tape rebuilds exactly the history the original run had.
+    """
+    index = pd.date_range(end=pd.Timestamp(start) - pd.Timedelta(minutes=1), periods=bars, freq="1min")
+    history = synthetic_bars(index, seed=_seed(seed, symbol))
+    if end_price is not None:
+        prices = ["Open", "High", "Low", "Close"]
+        history[prices] *= end_price / history["Close"].iloc[-1]
+    return history
+
+def synthetic_ticks(symbols, start, duration=DURATION, interval=TICK_SECONDS, seed=0, last_close=None):
+    """Seeded random-walk ticks for every symbol, merged into one time-ordered tape.
+
+    Each symbol ticks once per `interval` at a random offset inside it, the first tick at
+    `last_close[symbol]` (e.g. the end of its warmup history). Returns a DataFrame with
+    ts (ns since epoch), symbol, price and volume.
+    """
+    start_ns = pd.Timestamp(start).value
+    n = int(duration / interval)
+    frames = []
+    for symbol in symbols:
+        rng = np.random.default_rng(_seed(seed, symbol) + 1)
+        price = (last_close or {}).get(symbol, 1.1)
+        offsets = (np.arange(n) + rng.uniform(0, 1, n)) * interval
+        frames.append(
+            pd.DataFrame(
+                {
+                    "ts": start_ns + (offsets * NS).astype(np.int64),
+                    "symbol": symbol,
+                    # The 1m bar volatility (1e-3 of the price) spread over the ticks in a minute.
+                    "price": price + np.r_[0.0, np.cumsum(rng.normal(0, price * 1e-3 * np.sqrt(interval / 60), n - 1))],
+                    "volume": rng.integers(1, 100, n).astype(float),
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True).sort_values("ts", kind="stable", ignore_index=True)
+
+def load_ticks(path):
+    """Recorded tape from CSV: ts (ISO-8601 or epoch seconds), symbol, price[, volume]."""
+    df = pd.read_csv(path)
+    if pd.api.types.is_numeric_dtype(df["ts"]):
+        ts = pd.to_datetime(df["ts"], unit="s", utc=True)
+    else:
+        ts = pd.to_datetime(df["ts"], utc=True)
+    ticks = pd.DataFrame(
+        {
+            "ts": ts.dt.as_unit("ns").astype("int64"),
+            "symbol": df["symbol"].astype(str).str.upper(),
+            "price": df["price"].astype(float),
+            "volume": df["volume"].astype(float) if "volume" in df else 0.0,
+        }
+    )
+    return ticks.sort_values("ts", kind="stable", ignore_index=True)
+
+def save_ticks(ticks, path):
+    out = ticks.assign(ts=pd.to_datetime(ticks["ts"], utc=True).dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ"))
+    out.to_csv(path, index=False)
+
+# ========== SIMULATED USERS ==========
+
+def _params(indicator, period):
+    return {
+        name: period if name in ("period", "k_period") else default
+        for name, (param_type, default, options) in INDICATORS[indicator]["params"].items()
+    }
+
+def user_script(user_id, rng, symbols, timeframes):
+    """The (kind, data) updates one simulated user sends, and the strategy they should end up with.
+
+    Half the users set a threshold on an oscillator (typed as a number), half a moving-average
+    crossover (picked with buttons); every one then watches a symbol and timeframe.
+    """
+    symbol = symbols[user_id % len(symbols)]
+    timeframe = timeframes[user_id % len(timeframes)]
+    if rng.random() < 0.5:
+        indicator = rng.choice(["RSI", "Stochastic"])
+        params = _params(indicator, rng.choice([9, 14, 21]))
+        operator = rng.choice(["<", ">"])
+        threshold = rng.randint(30, 70) if indicator == "RSI" else rng.randint(20, 80)
+        compare_to = {"value": float(threshold)}
+        tail = [("callback", "value"), ("message", str(threshold))]
+    else:
+        indicator, other = rng.choice([("EMA", "SMA"), ("SMA", "EMA"), ("EMA", "EMA"), ("SMA", "SMA")])
+        params = _params(indicator, rng.choice([5, 9, 12]))
+        other_params = _params(other, rng.choice([20, 26, 50]))
+        operator = rng.choice(["cross_above", "cross_below"])
+        compare_to = {"indicator": other, "params": other_params}
+        tail = [("callback", other)] + [("callback", str(v)) for v in other_params.values()]
+    steps = (
+        [("message", "/newstrategy"), ("callback", indicator)]
+        + [("callback", str(v)) for v in params.values()]
+        + [("callback", operator)]
+        + tail
+        + [("message", f"/watch {symbol} {timeframe}"), ("message", "/done")]
+    )
+    condition = {"indicator": indicator, "params": params, "operator": operator, "compare_to": compare_to}
+    strategy = {"logic": "AND", "conditions": [condition], "symbol": symbol, "timeframe": timeframe}
+    return steps, strategy
+
+def _update(user_id, kind, data):
+    return message_update(user_id, data) if kind == "message" else callback_update(user_id, data)
+
+def simulate_users(url, scripts):
+    """Send every script's updates through the v13 tg_bot dispatcher; replies go to the fake Bot API at `url`."""
+    from telegram import Bot, Update
+    import tg_bot
+
+    bot = Bot(TOKEN, base_url=f"{url}/bot")
+    dp = tg_bot.build_dispatcher(bot, workers=0)
+    latencies = []
+    start = time.perf_counter()
+    for user_id, (steps, _) in scripts.items():
+        for kind, data in steps:
+            update = Update.de_json(_update(user_id, kind, data), bot)
+            t0 = time.perf_counter()
+            dp.process_update(update)
+            latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    store = get_store()
+    mismatched = [
+        user_id
+        for user_id, (_, expected) in scripts.items()
+        if not _same_strategy(store.get_strategy(user_id), expected)
+    ]
+    return {
+        "users": len(scripts),
+        "updates": len(latencies),
+        "updates_per_second": len(latencies) / total if total else None,
+        "latency_ms": percentiles(latencies),
+        "mismatched": len(mismatched),
+    }
+
+def _same_strategy(stored, expected):
+    if not stored or not stored.get("conditions"):
+        return False
+    keys = ("symbol", "timeframe")
+    return describe_strategy(stored) == describe_strategy(expected) and all(stored[k] == expected[k] for k in keys)
+
+# ========== REPLAY ==========
+
+class ReplayClock:
+    """Paces the tape: market time runs `speed` times faster than the wall clock (0: unpaced)."""
+
+    def __init__(self, speed=SPEED):
+        self.speed = speed
+        self.origin = None
+        self.max_lag = 0.0
+
+    async def wait(self, ts):
+        if not self.speed:
+            return
+        now = time.perf_counter()
+        if self.origin is None:
+            self.origin = (ts, now)
+        due = self.origin[1] + (ts - self.origin[0]) / NS / self.speed
+        if due > now:
+            await asyncio.sleep(due - now)
+        else:
+            # Behind schedule: the pipeline can't keep up with this speed.
+            self.max_lag = max(self.max_lag, now - due)
+
+class RingMarketData:
+    """SignalScheduler market data backed by the resampler's live rings.
+
+    A candle's ring is copied out when it closes, since the ring moves on to the next
+    candle while the group may still be queued; if a newer copy has replaced it by then,
+    scheduler.closed_bars() cuts that back to the candle being evaluated.
+    """
+
+    def __init__(self):
+        self._closed = {}
+
+    def close(self, symbol, timeframe, ring):
+        """Keep `ring`'s bars at a candle close; returns the time the candle ended."""
+        frame = self._closed[(symbol, timeframe)] = ring.to_frame()
+        return frame.index[-1] + pd.Timedelta(seconds=TIMEFRAME_SECONDS[timeframe])
+
+    def refresh(self, symbols, timeframe):
+        """Nothing to fetch: bars arrive through close()."""
+
+    def bars(self, symbol, timeframe, limit=None):
+        frame = self._closed.get((symbol, timeframe))
+        if frame is None:
+            return pd.DataFrame(columns=FIELDS)
+        return frame.iloc[-limit:] if limit else frame
+
+class Replay:
+    """Resampler -> SignalScheduler -> notifier, with per-signal timing.
+
+    Each closed candle's group goes through SignalScheduler.submit_group, as at a live
+    candle close: backpressure, the concurrency limit, the indicator cache, the worker pool
+    (for large groups) and the journal all run. The scheduler sends through the notifier
+    with its dedupe key. Each signal the notifier accepts remembers the wall time of the
+    tick that closed its candle. The fake Bot API's receipt times are matched back to
+    those in order, giving tick-to-delivery latency.
+    """
+
+    def __init__(self, timeframes, notifier, store, pool=None, journal=None):
+        self.notifier = notifier
+        self.store = store
+        self.market = RingMarketData()
+        self.scheduler = SignalScheduler(send=self.send, market_data=self.market, pool=pool, journal=journal)
+        self.resampler = Resampler(timeframes)
+        self.resampler.subscribe(self.on_candle)
+        self.live = False
+        self.tick_time = None
+        self.enqueued = {}
+        self.eval_seconds = []
+        self.tasks = set()
+        self.counts = dict.fromkeys(("candles", "evaluations", "signals", "enqueued", "deduped"), 0)
+        self._yield = False
+
+    def warm_up(self, history):
+        """Feed {symbol: 1m frame} through the resampler without evaluating anything."""
+        for symbol, bars in history.items():
+            self.resampler.feed(symbol, bars)
+
+    def on_candle(self, symbol, timeframe, ring):
+        if not self.live:
+            return
+        self.counts["candles"] += 1
+        now = self.market.close(symbol, timeframe, ring)
+        group = {u: s for u, s in self.store.strategies_for(symbol=symbol, timeframe=timeframe).items() if s.get("conditions")}
+        if not group:
+            return
+        _candle_tick.set(self.tick_time)
+        task = self.scheduler.submit_group(symbol, timeframe, group, now)
+        if task is None:
+            return
+        self.counts["evaluations"] += len(group)
+        self.tasks.add(task)
+        task.add_done_callback(lambda task, start=time.perf_counter(): self._done(task, start))
+        # Let the group start before the next tick.
+        self._yield = True
+
+    def _done(self, task, start):
+        self.tasks.discard(task)
+        self.eval_seconds.append(time.perf_counter() - start)
+
+    async def send(self, chat_id, text, dedupe_key=None):
+        """The scheduler's send: the notifier's queue, as bot.py wires it, plus bookkeeping."""
+        self.counts["signals"] += 1
+        if self.notifier.enqueue(chat_id, text, dedupe_key=dedupe_key):
+            self.counts["enqueued"] += 1
+            self.enqueued.setdefault(chat_id, deque()).append(_candle_tick.get())
+        else:
+            self.counts["deduped"] += 1
+
+    async def run(self, ticks, clock):
+        """Replay the tape; returns the wall seconds it took."""
+        ts = ticks["ts"].to_numpy(dtype=np.int64)
+        codes, names = pd.factorize(ticks["symbol"])
+        names = list(names)
+        prices = ticks["price"].to_numpy(dtype=float)
+        volumes = ticks["volume"].to_numpy(dtype=float)
+        self.live = True
+        start = time.perf_counter()
+        for i in range(len(ts)):
+            await clock.wait(ts[i])
+            self.tick_time = time.perf_counter()
+            self.resampler.on_tick(names[codes[i]], int(ts[i]), prices[i], volumes[i])
+            # Let the notifier's senders pick up new signals right away.
+            if self._yield or i % YIELD_EVERY == 0:
+                self._yield = False
+                await asyncio.sleep(0)
+        if len(ts):
+            self.tick_time = time.perf_counter()
+            self.resampler.flush(int(ts[-1]))
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+        return time.perf_counter() - start
+
+    def latencies(self, deliveries):
+        """Tick-to-delivery seconds per signal from [(receipt time, chat, text)] in arrival order."""
+        pending = {chat: deque(times) for chat, times in self.enqueued.items()}
+        out = []
+        for received, chat, text in deliveries:
+            queue = pending.get(chat)
+            # Coalesced messages carry several signals; each one is matched separately.
+            for _ in range(text.count(SIGNAL_PREFIX)):
+                if queue:
+                    out.append(received - queue.popleft())
+        return out
+
+# ========== REPORT ==========
+
+def percentiles(values):
+    """p50/p95/p99/max of `values` (seconds) in milliseconds."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1] * 1000, "count": len(ordered)}
+
+def max_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def print_report(report):
+    conv, rep, sig, mem = report["conversation"], report["replay"], report["signals"], report["memory"]
+    if "skipped" in conv:
+        print(f"conversation   skipped: {conv['skipped']}")
+    else:
+        lat = conv["latency_ms"]
+        print(
+            f"conversation   {conv['updates']} updates from {conv['users']} users, {conv['updates_per_second']:.0f}/s, "
+            f"p50 {lat['p50']:.2f} ms p99 {lat['p99']:.2f} ms, {conv['mismatched']} mismatched"
+        )
+    print(
+        f"replay         {rep['ticks']} ticks in {rep['wall_seconds']:.2f} s ({rep['ticks_per_second']:.0f}/s, "
+        f"x{rep['speedup']:.0f} real time), {rep['candles']} candles, {rep['evaluations']} evaluations, "
+        f"{rep['dropped_groups']} groups dropped, max lag {rep['max_lag_seconds']:.3f} s"
+    )
+    print(
+        f"signals        {sig['fired']} fired, {sig['deduped']} deduped, "
+        f"{sig['delivered_signals']}/{sig['enqueued']} delivered in {sig['messages']} messages"
+    )
+    lat = sig["latency_ms"]
+    if lat:
+        print(f"latency        p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms  p99 {lat['p99']:.2f} ms  max {lat['max']:.2f} ms")
+    print(
+        f"memory         max RSS {mem['max_rss_mb']:.1f} MB (warmup {mem['max_rss_mb_warmup']:.1f}, "
+        f"users {mem['max_rss_mb_users']:.1f}), live bars {mem['live_bars_mb']:.2f} MB"
+        + (f", traced peak {mem['traced_peak_mb']:.1f} MB" if "traced_peak_mb" in mem else "")
+    )
+
+# ========== MAIN ==========
+
+async def _replay(args, ticks, history, api, url):
+    store = get_store()
+    deliveries = []
+
+    def on_call(method, payload, received):
+        if method == "sendMessage":
+            deliveries.append((received, int(payload.get("chat_id") or 0), payload.get("text", "")))
+
+    api.on_call = on_call
+
+    async with aiohttp.ClientSession() as session:
+        async def send(chat_id, text, **kwargs):
+            # Straight to the fake Bot API, so this runs under either python-telegram-bot major version.
+            async with session.post(f"{url}/bot{TOKEN}/sendMessage", json={"chat_id": chat_id, "text": text}) as response:
+                return await response.json(content_type=None)
+
+        limits = {} if args.throttle else {"global_rate": 1e9, "global_burst": 10**9, "chat_rate": 1e9, "chat_burst": 10**9}
+        # The dedupe window is wall-clock; scale it so it covers the same stretch of market time.
+        notifier = Notifier(send, dedupe_ttl=DEDUPE_TTL / args.speed if args.speed else 0.0, **limits)
+        pool = None
+        if args.workers > 1:
+            from workers import WorkerPool
+
+            pool = WorkerPool(args.workers)
+        with tempfile.TemporaryDirectory() as root:
+            journal = SignalJournal(root)
+            replay = Replay(args.timeframes, notifier, store, pool=pool, journal=journal)
+            replay.warm_up(history)
+            notifier.start()
+            clock = ReplayClock(args.speed)
+            try:
+                wall = await replay.run(ticks, clock)
+            finally:
+                await notifier.stop(drain_timeout=DRAIN_TIMEOUT)
+                if pool is not None:
+                    pool.drain()
+                journaled = len(journal)
+                journal.close()
+    api.on_call = None
+
+    tape = (ticks["ts"].iloc[-1] - ticks["ts"].iloc[0]) / NS if len(ticks) else 0.0
+    latencies = replay.latencies(deliveries)
+    evaluation = percentiles(replay.eval_seconds)
+    return replay, {
+        "replay": {
+            "ticks": len(ticks),
+            "tape_seconds": tape,
+            "wall_seconds": wall,
+            "ticks_per_second": len(ticks) / wall if wall else None,
+            "speedup": tape / wall if wall else None,
+            "max_lag_seconds": clock.max_lag,
+            "candles": replay.counts["candles"],
+            "evaluations": replay.counts["evaluations"],
+            "evaluation_ms": evaluation,
+            "dropped_groups": replay.scheduler.dropped,
+            "late_ticks": replay.resampler.late,
+            "indicator_cache": replay.scheduler.cache.stats(),
+        },
+        "signals": {
+            "fired": replay.counts["signals"],
+            "deduped": replay.counts["deduped"],
+            "enqueued": replay.counts["enqueued"],
+            "messages": len(deliveries),
+            "delivered_signals": len(latencies),
+            "failed": notifier.counters["failed"],
+            "journaled": journaled,
+            "latency_ms": percentiles(latencies),
+        },
+    }
+
+def run(args):
+    symbols = args.symbol_list
+    if args.ticks:
+        ticks = load_ticks(args.ticks)
+        ticks = ticks[ticks["symbol"].isin(symbols)] if args.symbol_list_given else ticks
+        # Known symbols keep their universe order, so the same users watch the same symbols as in the original run.
+        taped = set(ticks["symbol"])
+        symbols = [s for s in symbols if s in taped] + [s for s in dict.fromkeys(ticks["symbol"]) if s not in symbols]
+        start = pd.Timestamp(ticks["ts"].iloc[0], tz="UTC").floor("1min")
+        first = ticks.groupby("symbol", sort=False)["price"].first()
+        history = {s: warmup_bars(s, start, args.warmup, args.seed, end_price=float(first[s])) for s in symbols}
+    else:
+        start = pd.Timestamp(START, tz="UTC")
+        history = {s: warmup_bars(s, start, args.warmup, args.seed) for s in symbols}
+        last_close = {s: float(bars["Close"].iloc[-1]) for s, bars in history.items()}
+        ticks = synthetic_ticks(symbols, start, args.duration, args.tick_seconds, args.seed, last_close)
+    if args.save_ticks:
+        save_ticks(ticks, args.save_ticks)
+    if args.trace_memory:
+        tracemalloc.start()
+    memory = {"max_rss_mb_warmup": max_rss_mb()}
+
+    rng = random.Random(args.seed)
+    scripts = {user_id: user_script(user_id, rng, symbols, args.timeframes) for user_id in range(1, args.users + 1)}
+    api = FakeBotApi()
+    url = api.start_thread()
+    try:
+        try:
+            conversation = simulate_users(url, scripts)
+        except ImportError as e:
+            # bot.py's async stack has no synchronous dispatcher; write the strategies directly.
+            conversation = {"skipped": f"python-telegram-bot v13 handlers not importable: {e}"}
+            store = get_store()
+            for user_id, (_, strategy) in scripts.items():
+                store.save_strategy(user_id, strategy)
+        memory["max_rss_mb_users"] = max_rss_mb()
+        replay, report = asyncio.run(_replay(args, ticks, history, api, url))
+    finally:
+        api.stop_thread()
+
+    memory["max_rss_mb"] = max_rss_mb()
+    memory["live_bars_mb"] = replay.resampler.live.nbytes() / 2**20
+    if args.trace_memory:
+        memory["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return {
+        "config": {
+            "ticks": args.ticks or "synthetic",
+            "symbols": symbols,
+            "users": args.users,
+            "timeframes": args.timeframes,
+            "speed": args.speed,
+            "seed": args.seed,
+            "throttle": args.throttle,
+            "warmup_bars": args.warmup,
+            "workers": args.workers,
+        },
+        "conversation": conversation,
+        **report,
+        "memory": memory,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a tick tape through the whole signal pipeline offline and report latency, throughput and memory.")
+    parser.add_argument("--ticks", help="recorded tape (CSV: ts, symbol, price[, volume]); default: synthetic")
+    parser.add_argument("--save-ticks", help="write the replayed tape to this CSV, e.g. to replay it again later")
+    parser.add_argument("--symbols", help=f"comma-separated symbols, or a count of the scan universe (default {SYMBOLS})")
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--timeframes", type=lambda s: s.split(","), default=TIMEFRAMES)
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds of synthetic market time")
+    parser.add_argument("--tick-seconds", type=float, default=TICK_SECONDS, help="spacing of synthetic ticks per symbol")
+    parser.add_argument("--warmup", type=int, default=WARMUP_BARS, help="1m bars of history before the tape")
+    parser.add_argument("--speed", type=float, default=SPEED, help="market seconds per wall second; 0 = as fast as possible, with notifier dedupe off")
+    parser.add_argument("--throttle", action="store_true", help="keep the notifier's Telegram rate limits")
+    parser.add_argument("--workers", type=int, default=0, help="evaluate large groups in a worker pool of this size, as bot.py does with EVAL_WORKERS")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    unknown = [tf for tf in args.timeframes if tf not in TIMEFRAME_SECONDS]
+    if unknown:
+        parser.error(f"unknown timeframe(s): {', '.join(unknown)}")
+    args.symbol_list_given = bool(args.symbols) and not args.symbols.isdigit()
+    if args.symbol_list_given:
+        args.symbol_list = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    else:
+        args.symbol_list = DEFAULT_UNIVERSE[: int(args.symbols or SYMBOLS)]
+
+    report = run(args)
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[replay] Wrote report to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import logging
+
+from market_data import TIMEFRAME_SECONDS
+from ring_buffer import LiveBars
+
+NS = 1_000_000_000
+BASE_TIMEFRAME = "1m"
+DEFAULT_TIMEFRAMES = ["5m", "15m", "1h", "4h", "1d"]
+
+class Resampler:
+    """Builds higher-timeframe candles per symbol from one 1m-bar or tick stream.
+
+    Buckets are aligned to the UTC epoch (so 4h candles start at 00/04/08... and daily
+    ones at midnight), the same bins pandas `resample(rule)` uses. Every timeframe lives
+    in a BarRing from `live`; subscribers are called as callback(symbol, timeframe, ring)
+    once a candle is complete.
+    """
+
+    def __init__(self, timeframes=None, live=None, base=BASE_TIMEFRAME):
+        self.base = base
+        self.timeframes = [base] + [tf for tf in (timeframes or DEFAULT_TIMEFRAMES) if tf != base]
+        self.live = live if live is not None else LiveBars()
+        self._steps = {tf: TIMEFRAME_SECONDS[tf] * NS for tf in self.timeframes}
+        # (symbol, timeframe) -> [bucket start, closed?] of the newest candle.
+        self._current = {}
+        self._subscribers = []
+        self.late = 0
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def _emit(self, symbol, timeframe):
+        ring = self.live.get(symbol, timeframe)
+        for callback in self._subscribers:
+            try:
+                callback(symbol, timeframe, ring)
+            except Exception as e:
+                logging.error(f"[resampler] Subscriber failed on {symbol} {timeframe}: {e}")
+
+    def _fold(self, symbol, timeframe, ts, o, h, l, c, v, span):
+        """Merge a base bar covering [ts, ts + span) into the `timeframe` candle."""
+        step = self._steps[timeframe]
+        bucket = ts - ts % step
+        key = (symbol, timeframe)
+        ring = self.live.get(symbol, timeframe)
+        current = self._current.get(key)
+        if current is not None and bucket < current[0]:
+            self.late += 1
+            return
+        if current is None or bucket > current[0]:
+            if current is not None and not current[1]:
+                self._emit(symbol, timeframe)
+            ring.append(bucket, o, h, l, c, v)
+            current = self._current[key] = [bucket, False]
+        else:
+            last = ring.last()
+            ring.update_last(high=h, low=l, close=c, volume=last["Volume"] + v)
+        # A base bar that reaches the bucket end completes the candle without waiting for the next one.
+        if span and ts + span >= bucket + step and not current[1]:
+            current[1] = True
+            self._emit(symbol, timeframe)
+
+    def on_bar(self, symbol, ts, open, high, low, close, volume=0.0):
+        """Feed one closed base-timeframe bar starting at `ts` (ns since epoch, UTC)."""
+        span = self._steps[self.base]
+        for timeframe in self.timeframes:
+            self._fold(symbol, timeframe, ts, open, high, low, close, volume, span)
+
+    def on_tick(self, symbol, ts, price, volume=0.0):
+        """Feed a trade/quote at `ts` (ns). Candles close on the next tick past them or on flush()."""
+        for timeframe in self.timeframes:
+            self._fold(symbol, timeframe, ts, price, price, price, price, volume, 0)
+
+    def flush(self, now):
+        """Close every candle whose period ended at or before `now` (ns), for quiet markets."""
+        for (symbol, timeframe), current in self._current.items():
+            if not current[1] and current[0] + self._steps[timeframe] <= now:
+                current[1] = True
+                self._emit(symbol, timeframe)
+
+    def feed(self, symbol, bars):
+        """Replay a base-timeframe frame (e.g. 1m history) through on_bar."""
+        ts = bars.index.as_unit("ns").asi8
+        cols = [bars[f].to_numpy(dtype=float) for f in ("Open", "High", "Low", "Close", "Volume")]
+        for i in range(len(bars)):
+            self.on_bar(symbol, ts[i], *(col[i] for col in cols))
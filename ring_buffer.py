@@ -0,0 +1,149 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+# HL2 is kept as a stored row so reading it never allocates.
+COLUMNS = FIELDS + ["HL2"]
+_ROW = {name: i for i, name in enumerate(COLUMNS)}
+DEFAULT_CAPACITY = 1024
+
+class BarRing:
+    """Fixed-capacity OHLCV ring buffer for one (symbol, timeframe).
+
+    Every bar is written twice, at slot i and slot i + capacity, so the most recent
+    `len(ring)` bars always sit in one contiguous stretch of each row. `ring["Close"]`
+    is therefore a zero-copy read-only NumPy view that indicators can take as-is, and
+    the ring can be passed anywhere a bars frame (or column mapping) is accepted.
+    Memory is fixed at construction: 2 * capacity * (6 float64 + 1 int64) bytes.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._data = np.zeros((len(COLUMNS), 2 * capacity))
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._head = 0
+        self._count = 0
+        # Bumped on every append/update, so caches can tell two states apart even when
+        # the ring is full and the new close equals the old one.
+        self.version = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, name):
+        return name in _ROW
+
+    def keys(self):
+        return list(COLUMNS)
+
+    def __getitem__(self, name):
+        return self._view(self._data[_ROW[name]])
+
+    def _view(self, row):
+        end = self._head + self.capacity
+        view = row[end - self._count:end]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes + self._ts.nbytes
+
+    # --- writes ---
+
+    def _write(self, slot, ts, o, h, l, c, v):
+        data = self._data
+        hl2 = (h + l) / 2.0
+        for i in (slot, slot + self.capacity):
+            data[0, i] = o
+            data[1, i] = h
+            data[2, i] = l
+            data[3, i] = c
+            data[4, i] = v
+            data[5, i] = hl2
+            self._ts[i] = ts
+        self.version += 1
+
+    def append(self, ts, open, high, low, close, volume=0.0):
+        """Add a new bar (ts in ns since epoch), overwriting the oldest once full."""
+        self._write(self._head, ts, open, high, low, close, volume)
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def update_last(self, high=None, low=None, close=None, volume=None):
+        """Revise the forming bar in place; high/low only ever widen the range."""
+        if not self._count:
+            raise IndexError("update_last on an empty ring")
+        slot = (self._head - 1) % self.capacity
+        o, h, l, c, v = self._data[:5, slot]
+        if high is not None:
+            h = max(h, high)
+        if low is not None:
+            l = min(l, low)
+        self._write(slot, self._ts[slot], o, h, l, c if close is None else close, v if volume is None else volume)
+
+    def on_tick(self, ts, price, volume=0.0):
+        """Fold a tick into the bar starting at `ts` (the tick's bucket start, ns)."""
+        if self._count and self._ts[(self._head - 1) % self.capacity] == ts:
+            slot = (self._head - 1) % self.capacity
+            self.update_last(high=price, low=price, close=price, volume=self._data[4, slot] + volume)
+        else:
+            self.append(ts, price, price, price, price, volume)
+
+    def extend(self, bars):
+        """Load a history frame (e.g. from MarketData.bars); only the last `capacity` rows are kept."""
+        bars = bars.iloc[-self.capacity:]
+        ts = bars.index.as_unit("ns").asi8
+        cols = [bars[f].to_numpy(dtype=float) if f in bars else np.zeros(len(bars)) for f in FIELDS]
+        for i in range(len(bars)):
+            self.append(ts[i], *(col[i] for col in cols))
+
+    # --- reads ---
+
+    @property
+    def timestamps(self):
+        """Bar start times as a zero-copy int64 (ns) view."""
+        return self._view(self._ts)
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self.timestamps, tz="UTC")
+
+    def last(self):
+        if not self._count:
+            return None
+        slot = (self._head - 1) % self.capacity
+        return {name: float(self._data[i, slot]) for name, i in _ROW.items()}
+
+    def to_frame(self):
+        """Copy into a DataFrame, for callers that need pandas semantics."""
+        return pd.DataFrame({f: self[f] for f in FIELDS}, index=self.index)
+
+class LiveBars:
+    """Registry of rings, one per (symbol, timeframe), all with the same capacity."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        ring = self._rings.get(key)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(key, BarRing(self.capacity))
+        return ring
+
+    def __contains__(self, key):
+        return key in self._rings
+
+    def __len__(self):
+        return len(self._rings)
+
+    def nbytes(self):
+        return sum(ring.nbytes for ring in self._rings.values())
@@ -1,7 +1,10 @@
+import startup
+
+startup.enable_from_env()
+
 import asyncio
 import logging
 from threading import Thread
-from bot import main as run_bot  # async function that runs your Telegram bot
 import subprocess
 import shutil
 import re
@@ -9,15 +12,13 @@ import time
 import os
 import signal
 import sys
-import pytz
 import nest_asyncio
-import requests
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app import create_app
 
+# The bot, Flask, APScheduler and requests are imported where they are first needed,
+# so the process gets to its first useful work sooner.
 nest_asyncio.apply()
-logging.basicConfig(level=logging.DEBUG)
-app = create_app()
+# DEBUG logs every request and scheduler tick; opt in with LOG_LEVEL=DEBUG when needed.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 
 def is_tunnel_running():
     """Check if an existing tunnel is running via LOCAL_TUNNEL_URL."""
@@ -25,6 +26,8 @@ def is_tunnel_running():
     if not url:
         return False
     try:
+        import requests
+
         r = requests.get(url, timeout=2)
         return r.status_code < 500
     except Exception:
@@ -39,7 +42,9 @@ def load_cached_tunnel_url():
 
 def start_web():
     """Start the Flask web app."""
-    app.run(host="0.0.0.0", port=8001)
+    from app import create_app
+
+    create_app().run(host="0.0.0.0", port=8001)
 
 def start_cloudflared_tunnel(max_retries=1):
     """Start or reuse a free Cloudflare tunnel and return its URL."""
@@ -94,6 +99,9 @@ def start_cloudflared_tunnel(max_retries=1):
 def shutdown_handler(signum, frame):
     """Graceful shutdown without killing cloudflared."""
     print(f"\n🛑 Received signal {signum}, shutting down app (tunnel remains alive).")
+    from workers import drain_pool
+
+    drain_pool()
     print("✅ App shutdown complete.")
     sys.exit(0)
 
@@ -104,18 +112,22 @@ def check_app_disabled():
         
 if __name__ == "__main__":
     check_app_disabled()
-    AsyncIOScheduler.timezone = pytz.utc  # change if needed
     signal.signal(signal.SIGINT, shutdown_handler)
     signal.signal(signal.SIGTERM, shutdown_handler)
 
     load_cached_tunnel_url()  # restore tunnel URL if exists
 
-    Thread(target=start_web, daemon=True).start()  # Start Flask
+    if os.getenv("BOT_MODE", "polling") != "webhook":
+        Thread(target=start_web, daemon=True).start()  # Start Flask; webhook mode serves pages itself
 
-    url = start_cloudflared_tunnel()
+    with startup.phase("tunnel"):
+        url = start_cloudflared_tunnel()
     if url:
         print(f"🌐 LOCAL_TUNNEL_URL set to: {url}")
     else:
         print("⚠️ Running bot without tunnel URL.")
 
+    with startup.phase("import bot"):
+        from bot import main as run_bot  # async function that runs your Telegram bot
+
     asyncio.run(run_bot())
\ No newline at end of file
@@ -0,0 +1,185 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine import apply_operator, compile_strategy, describe_condition, indicator_key, required_keys
+from kernels import FusedRun
+from market_data import FIELDS, TIMEFRAME_SECONDS, get_market_data
+
+# The 28 pairs between the eight major currencies; SCAN_SYMBOLS (comma separated) overrides it.
+DEFAULT_UNIVERSE = [
+    "EURUSD", "GBPUSD", "USDJPY", "USDCHF", "AUDUSD", "USDCAD", "NZDUSD",
+    "EURGBP", "EURJPY", "EURCHF", "EURAUD", "EURCAD", "EURNZD",
+    "GBPJPY", "GBPCHF", "GBPAUD", "GBPCAD", "GBPNZD",
+    "AUDJPY", "AUDCHF", "AUDCAD", "AUDNZD",
+    "CADJPY", "CADCHF", "CHFJPY", "NZDJPY", "NZDCHF", "NZDCAD",
+]
+# Bars per symbol in the panel; enough for the slowest indicator to warm up.
+SCAN_BARS = 500
+# Symbols with fewer bars than this are left out; longer ones are padded to SCAN_BARS.
+MIN_SCAN_BARS = 50
+SCAN_LIMIT = 20
+
+def scan_universe():
+    symbols = os.getenv("SCAN_SYMBOLS")
+    return [s.strip().upper() for s in symbols.split(",") if s.strip()] if symbols else list(DEFAULT_UNIVERSE)
+
+# ========== PANEL ==========
+
+class Panel:
+    """OHLCV for many symbols as one C-contiguous (symbols x bars) float64 array per field.
+
+    Rows are right-aligned on each symbol's latest bar, so column -1 is every symbol's
+    last closed bar. A symbol with less history is left-padded with NaN rather than
+    cutting everyone else's to its length, so its indicators equal those computed on its
+    own bars and the others' keep their full warm-up.
+    """
+
+    def __init__(self, symbols, fields, last_times=None):
+        self.symbols = list(symbols)
+        self._fields = fields
+        self.last_times = list(last_times) if last_times is not None else [None] * len(self.symbols)
+
+    @classmethod
+    def from_frames(cls, frames, length=SCAN_BARS, min_length=MIN_SCAN_BARS):
+        """Build from {symbol: OHLCV frame}; returns (panel, symbols skipped for short history)."""
+        usable = {s: df for s, df in frames.items() if df is not None and len(df) >= min_length}
+        skipped = [s for s in frames if s not in usable]
+        length = min(length, max((len(df) for df in usable.values()), default=0))
+        symbols = list(usable)
+        fields = {field: np.full((len(symbols), length), np.nan) for field in FIELDS}
+        for row, symbol in enumerate(symbols):
+            tail = usable[symbol].iloc[-length:]
+            for field in FIELDS:
+                fields[field][row, length - len(tail):] = tail[field].to_numpy(dtype=float)
+        last_times = [usable[s].index[-1] for s in symbols]
+        return cls(symbols, fields, last_times), skipped
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def length(self):
+        return self._fields["Close"].shape[1]
+
+    def __contains__(self, field):
+        return field in self._fields
+
+    def __getitem__(self, field):
+        return self._fields[field]
+
+    def nbytes(self):
+        return sum(values.nbytes for values in self._fields.values())
+
+# ========== PANEL INDICATORS ==========
+
+def compute_panel(panel, indicator, params=None):
+    """`indicator` for every symbol in the panel at once (through the fused kernels), as a
+    (symbols x bars) float array."""
+    key = indicator_key(indicator, params)
+    return np.ascontiguousarray(FusedRun(panel).many(panel, [key])[key].T)
+
+# ========== SCAN ==========
+
+def _margin(cond, lhs, rhs):
+    """How far past its threshold each symbol is, relative to the threshold (higher is stronger)."""
+    if cond.kind == "zone":
+        lo, hi = cond.rhs
+        centre, half = (lo + hi) / 2, max((hi - lo) / 2, 1e-12)
+        return 1 - np.abs(lhs - centre) / half
+    scale = np.maximum(np.abs(rhs), 1e-12)
+    if cond.operator in ("<", "cross_below"):
+        return (rhs - lhs) / scale
+    if cond.operator in (">", "cross_above"):
+        return (lhs - rhs) / scale
+    return -np.abs(lhs - rhs) / scale
+
+def scan(panel, strategy, limit=SCAN_LIMIT):
+    """Symbols whose last closed bar satisfies `strategy`'s conditions, strongest first.
+
+    Each distinct indicator is computed once for the whole panel; conditions are then
+    compared on the last column (the last two for crosses). Matches are ranked by their mean
+    relative margin past the thresholds. Returns {"matches": [...], "scanned": n,
+    "timings": {...}} with seconds per indicator and for the comparison step.
+    """
+    compiled = compile_strategy(strategy)
+    timings = {"indicators": {}}
+    series = {}
+    run = FusedRun(panel)
+    for key in sorted(required_keys(compiled)):
+        start = time.perf_counter()
+        # (bars x symbols): axis 0 is time, as engine.apply_operator expects.
+        values = run.many(panel, [key])[key]
+        timings["indicators"][f"{key[0]}({', '.join(f'{k}={v}' for k, v in key[1])})"] = time.perf_counter() - start
+        series[key] = values[-2:]
+
+    start = time.perf_counter()
+    hits, margins = [], []
+    for cond in compiled.conditions:
+        lhs = series[cond.lhs]
+        rhs = series[cond.rhs] if cond.kind == "indicator" else cond.rhs
+        hits.append(apply_operator(cond.operator, lhs, rhs)[-1])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            margins.append(_margin(cond, lhs[-1], rhs[-1] if cond.kind == "indicator" else rhs))
+    if hits:
+        reduce = np.logical_and if compiled.logic == "AND" else np.logical_or
+        matched = reduce.reduce(hits)
+        score = np.nanmean(np.vstack(margins), axis=0) if margins else np.zeros(len(panel))
+    else:
+        matched = np.zeros(len(panel), dtype=bool)
+        score = np.zeros(len(panel))
+    rows = np.flatnonzero(matched)
+    rows = rows[np.argsort(-np.nan_to_num(score[rows], nan=-np.inf), kind="stable")]
+    matches = [
+        {
+            "symbol": panel.symbols[row],
+            "score": float(score[row]),
+            "time": str(panel.last_times[row]),
+            "values": {
+                describe_condition(raw): float(series[cond.lhs][-1, row])
+                for raw, cond in zip(strategy["conditions"], compiled.conditions)
+            },
+        }
+        for row in rows[:limit]
+    ]
+    timings["evaluate"] = time.perf_counter() - start
+    return {"matches": matches, "matched": int(matched.sum()), "scanned": len(panel), "timings": timings}
+
+def run_scan(strategy, timeframe, symbols=None, refresh=True, market=None, limit=SCAN_LIMIT):
+    """Load the universe into a panel and scan it, timing each stage."""
+    if timeframe not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    market = market or get_market_data()
+    symbols = symbols or scan_universe()
+    started = time.perf_counter()
+    frames = market.load_group(symbols, timeframe, limit=SCAN_BARS, refresh=refresh)
+    loaded = time.perf_counter()
+    panel, skipped = Panel.from_frames(frames)
+    built = time.perf_counter()
+    if not len(panel):
+        result = {"matches": [], "matched": 0, "scanned": 0, "timings": {"indicators": {}, "evaluate": 0.0}}
+    else:
+        result = scan(panel, strategy, limit=limit)
+    result["timeframe"] = timeframe
+    result["skipped"] = skipped
+    result["bars"] = panel.length if len(panel) else 0
+    result["timings"].update(
+        load=loaded - started, panel=built - loaded, total=time.perf_counter() - started
+    )
+    return result
+
+def format_scan(result, limit=SCAN_LIMIT):
+    t = result["timings"]
+    lines = [f"🔎 Scan {result['timeframe']}: {result['matched']} of {result['scanned']} symbols match"]
+    for i, match in enumerate(result["matches"][:limit], 1):
+        values = ", ".join(f"{v:.5g}" for v in match["values"].values())
+        lines.append(f"{i}. {match['symbol']}  score {match['score']:+.3f}  ({values})")
+    if result["skipped"]:
+        lines.append(f"Skipped (not enough history): {', '.join(result['skipped'])}")
+    lines.append(
+        f"⏱ {t['total'] * 1000:.0f} ms: load {t['load'] * 1000:.0f}, panel {t['panel'] * 1000:.0f}, "
+        f"indicators {sum(t['indicators'].values()) * 1000:.0f}, compare {t['evaluate'] * 1000:.1f}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytz
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from engine import ConditionIndex, compute_series, describe_condition
+from indicator_cache import indicator_cache
+from market_data import TIMEFRAME_SECONDS, get_market_data
+from metrics import EVALUATION_SECONDS, registry
+from planner import planner as shared_planner
+from storage import get_store
+
+# Cron fields for each timeframe's candle boundary (UTC).
+CANDLE_CRON = {
+    "1m": {"minute": "*"},
+    "5m": {"minute": "*/5"},
+    "15m": {"minute": "*/15"},
+    "30m": {"minute": "*/30"},
+    "1h": {"minute": 0},
+    "4h": {"hour": "*/4", "minute": 0},
+    "1d": {"hour": 0, "minute": 0},
+}
+# Seconds after the boundary before fetching, so the provider has published the closed bar.
+SETTLE_SECONDS = 5
+# Random spread added to each firing so every timeframe doesn't hit the provider at once.
+JITTER_SECONDS = 3
+# Bars of history loaded per group; enough for the slowest indicator to warm up.
+HISTORY_BARS = 500
+MAX_CONCURRENT_GROUPS = 4
+MAX_PENDING_GROUPS = 200
+# Groups up to this size go through the short-circuiting planner; larger ones share
+# nearly every indicator anyway and use the condition index (bench.py evaluate.* puts
+# the crossover between 48 and 64 strategies).
+PLANNER_MAX_GROUP = 32
+# How often the planner's statistics are pruned to live strategies and saved (if changed).
+PLANNER_SAVE_SECONDS = 300
+
+def load_strategies(timeframe):
+    """Default strategy source: every stored strategy on `timeframe`, in one indexed query."""
+    return get_store().strategies_for(timeframe=timeframe)
+
+def group_strategies(strategies):
+    """{user_id: strategy} -> {(symbol, timeframe): {user_id: strategy}}, skipping empty ones."""
+    groups = {}
+    for user_id, strategy in strategies.items():
+        if not strategy.get("conditions") or not strategy.get("symbol") or not strategy.get("timeframe"):
+            continue
+        groups.setdefault((strategy["symbol"], strategy["timeframe"]), {})[user_id] = strategy
+    return groups
+
+def closed_bars(bars, timeframe, now):
+    """Drop the still-forming candle: keep bars whose period ended at or before `now`."""
+    if bars.empty:
+        return bars
+    cutoff = pd.Timestamp(now) - pd.Timedelta(seconds=TIMEFRAME_SECONDS[timeframe])
+    return bars[bars.index <= cutoff]
+
+def describe_strategy(strategy):
+    joiner = f" {strategy.get('logic', 'AND')} "
+    return joiner.join(describe_condition(c) for c in strategy["conditions"])
+
+def format_signal(symbol, timeframe, strategy):
+    return "\n".join([f"📈 Signal on {symbol} {timeframe}:", describe_strategy(strategy)])
+
+class SignalScheduler:
+    """Evaluates every strategy at its timeframe's candle close and sends the hits through the bot.
+
+    `send` is called as send(chat_id=, text=, dedupe_key=), e.g. Notifier.send_message, so a
+    signal that keeps holding over several candles is only alerted once per dedupe window.
+
+    Strategies are grouped by (symbol, timeframe): each timeframe's symbols are refreshed in one
+    batch and each group's bars are loaded once. Groups run concurrently up to
+    `max_concurrent`, with the CPU work in worker threads (or processes, given a
+    workers.WorkerPool) so the polling loop keeps running; groups beyond `max_pending` are
+    dropped for that candle instead of queueing up.
+    """
+
+    def __init__(
+        self,
+        send,
+        strategy_source=load_strategies,
+        market_data=None,
+        cache=indicator_cache,
+        max_concurrent=MAX_CONCURRENT_GROUPS,
+        max_pending=MAX_PENDING_GROUPS,
+        history=HISTORY_BARS,
+        pool=None,
+        planner=shared_planner,
+        journal=None,
+    ):
+        self.send = send
+        self.strategy_source = strategy_source
+        self.market_data = market_data or get_market_data()
+        self.cache = cache
+        self.max_pending = max_pending
+        self.history = history
+        self.pool = pool
+        self.planner = planner
+        self.journal = journal
+        self.pending = 0
+        self.dropped = 0
+        self.scheduler = None
+        # (symbol, timeframe) -> ConditionIndex kept across candles; only changed strategies recompile.
+        self._indexes = {}
+        # (symbol, timeframe) -> close of the last evaluated bar, journaled with each signal.
+        self._last_close = {}
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._timeframes = list(CANDLE_CRON)
+        registry.gauge("scheduler_pending_groups", "Strategy groups queued or running", fn=lambda: self.pending)
+        registry.counter("scheduler_dropped_groups_total", "Groups skipped under backpressure", fn=lambda: self.dropped)
+
+    def start(self, timeframes=None):
+        """Add one cron job per timeframe to an AsyncIOScheduler on the running loop."""
+        self._timeframes = list(timeframes or CANDLE_CRON)
+        self.scheduler = AsyncIOScheduler(timezone=pytz.utc)
+        if self.planner is not None:
+            self.planner.load(get_store())
+            self.scheduler.add_job(
+                self.save_planner, "interval", seconds=PLANNER_SAVE_SECONDS, id="planner-save", max_instances=1, coalesce=True
+            )
+        for timeframe in self._timeframes:
+            trigger = CronTrigger(
+                second=SETTLE_SECONDS, jitter=JITTER_SECONDS, timezone=pytz.utc, **CANDLE_CRON[timeframe]
+            )
+            self.scheduler.add_job(
+                self.on_candle_close,
+                trigger,
+                args=[timeframe],
+                id=f"candle-close-{timeframe}",
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=TIMEFRAME_SECONDS[timeframe] // 2,
+            )
+        self.scheduler.start()
+        logging.info(f"[scheduler] Signal scheduler started for {', '.join(self._timeframes)}")
+        return self.scheduler
+
+    def shutdown(self):
+        if self.scheduler and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+            if self.save_planner():
+                get_store().flush()
+
+    def save_planner(self):
+        """Prune the planner to the live strategies and save its statistics if they changed."""
+        if self.planner is None:
+            return False
+        try:
+            live = {}
+            for timeframe in self._timeframes:
+                live.update(self.strategy_source(timeframe))
+            self.planner.prune(live)
+            return self.planner.save(get_store())
+        except Exception as e:
+            logging.error(f"[scheduler] Saving planner statistics failed: {e}")
+            return False
+
+    async def on_candle_close(self, timeframe, now=None):
+        with EVALUATION_SECONDS.time(timeframe=timeframe):
+            return await self._on_candle_close(timeframe, now)
+
+    async def _on_candle_close(self, timeframe, now=None):
+        now = now or datetime.now(timezone.utc)
+        groups = {k: v for k, v in group_strategies(self.strategy_source(timeframe)).items() if k[1] == timeframe}
+        for key in [k for k in self._indexes if k[1] == timeframe and k not in groups]:
+            del self._indexes[key]
+        if not groups:
+            return 0
+        symbols = [symbol for symbol, _ in groups]
+        await asyncio.to_thread(self.market_data.refresh, symbols, timeframe)
+        tasks = [self.submit_group(symbol, tf, group, now) for (symbol, tf), group in groups.items()]
+        results = await asyncio.gather(*[task for task in tasks if task is not None], return_exceptions=True)
+        sent = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logging.error(f"[scheduler] Group evaluation failed: {result}")
+            else:
+                sent += result
+        return sent
+
+    def submit_group(self, symbol, timeframe, group, now):
+        """Start evaluating one group as a task; None if `max_pending` groups are already queued."""
+        if self.pending >= self.max_pending:
+            self.dropped += 1
+            logging.warning(f"[scheduler] Backpressure: skipping {symbol} {timeframe} this candle")
+            return None
+        self.pending += 1
+        return asyncio.create_task(self._run_group(symbol, timeframe, group, now))
+
+    async def _run_group(self, symbol, timeframe, group, now):
+        try:
+            async with self._semaphore:
+                if self.pool is not None and not self.uses_planner(group):
+                    bars = await asyncio.to_thread(self.load_group_bars, symbol, timeframe, now)
+                    hits = await self.pool.evaluate(bars, group) if not bars.empty else []
+                else:
+                    hits = await asyncio.to_thread(self.evaluate_group, symbol, timeframe, group, now)
+            if hits and self.journal is not None:
+                self.record_signals(symbol, timeframe, group, hits, now)
+            for user_id in hits:
+                try:
+                    text = format_signal(symbol, timeframe, group[user_id])
+                    await self.send(chat_id=user_id, text=text, dedupe_key=("signal", user_id, text))
+                except Exception as e:
+                    logging.error(f"[scheduler] Failed to send signal to {user_id}: {e}")
+            return len(hits)
+        finally:
+            self.pending -= 1
+
+    def load_group_bars(self, symbol, timeframe, now):
+        bars = closed_bars(self.market_data.bars(symbol, timeframe, limit=self.history + 1), timeframe, now)
+        if not bars.empty:
+            self._last_close[(symbol, timeframe)] = float(bars["Close"].iloc[-1])
+        return bars
+
+    def record_signals(self, symbol, timeframe, group, hits, now):
+        """Append the candle's hits to the journal, one batch per distinct strategy text."""
+        ts = pd.Timestamp(now).value
+        close = self._last_close.get((symbol, timeframe), float("nan"))
+        batches = {}
+        for user_id in hits:
+            batches.setdefault(f"{timeframe}: {describe_strategy(group[user_id])}", []).append(user_id)
+        try:
+            for condition, users in batches.items():
+                self.journal.append_many(ts, users, symbol, condition, close)
+        except Exception as e:
+            logging.error(f"[scheduler] Journal write failed for {symbol} {timeframe}: {e}")
+
+    def evaluate_group(self, symbol, timeframe, group, now):
+        bars = self.load_group_bars(symbol, timeframe, now)
+        if bars.empty:
+            return []
+        compute = self.cache.compute_for(symbol, timeframe, bars) if self.cache else None
+        return self.group_signals(symbol, timeframe, bars, group, compute=compute)
+
+    def uses_planner(self, group):
+        """Small groups short-circuit through the planner in-process, even when a pool is set."""
+        return self.planner is not None and len(group) <= PLANNER_MAX_GROUP
+
+    def group_signals(self, symbol, timeframe, bars, group, compute=None):
+        """Users in `group` whose strategy holds on the last bar of `bars` (a frame or a live BarRing)."""
+        if self.uses_planner(group):
+            self._indexes.pop((symbol, timeframe), None)
+            return self.planner.signals(bars, group, compute=compute)
+        index = self._indexes.setdefault((symbol, timeframe), ConditionIndex()).sync(group)
+        return index.signals(compute_series(bars, index.required_keys(), compute=compute))
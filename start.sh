@@ -3,5 +3,12 @@
 # Start the Telegram bot in the background
 python bot.py &
 
+# Start the strategy-builder bot, polling in one process and handling updates in
+# BOT_WORKERS worker processes that share conversation state through the store.
+# TG_BOT_TOKEN1 must be its own bot's token: two pollers can't share one.
+if [ -n "$TG_BOT_TOKEN1" ]; then
+    BOT_WORKERS=${BOT_WORKERS:-4} python tg_bot.py &
+fi
+
 # Start the Flask app in the foreground (keeps container alive)
 python app.py
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import logging
+import contextlib
+
+# Set STARTUP_TIMING=1 to log where cold-start time goes (imports by module, then init phases).
+ENV_FLAG = "STARTUP_TIMING"
+REPORT_TOP = 25
+
+_enabled = False
+_started = None
+_imports = {}
+_stack = []
+_phases = []
+
+class _TimedLoader:
+    """Wraps a module's loader to time exec_module; everything else is delegated."""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        start = time.perf_counter()
+        _stack.append(0.0)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += total
+            _imports[self._name] = (total, total - children)
+
+class _TimingFinder:
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name)
+                return spec
+        return None
+
+def enable():
+    """Start recording import times. Call before the imports you want measured."""
+    global _enabled, _started
+    if _enabled:
+        return
+    _enabled = True
+    _started = time.perf_counter()
+    sys.meta_path.insert(0, _TimingFinder())
+
+def enable_from_env():
+    if os.getenv(ENV_FLAG, "").lower() in ("1", "true", "yes"):
+        enable()
+
+def enabled():
+    return _enabled
+
+@contextlib.contextmanager
+def phase(name):
+    """Time an init step (app build, scheduler start...) for the report; free when disabled."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - start))
+
+def report(top=REPORT_TOP, log=None):
+    """Log the breakdown once the process is ready to answer updates; returns it as a dict."""
+    if not _enabled:
+        return None
+    log = log or logging.getLogger("startup").info
+    elapsed = time.perf_counter() - _started
+    packages = {}
+    for name, (_, own) in _imports.items():
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0.0) + own
+    import_total = sum(own for _, own in _imports.values())
+
+    log(f"[startup] Ready after {elapsed * 1000:.0f} ms; {import_total * 1000:.0f} ms in {len(_imports)} imports")
+    log("[startup] Import time by package (self, incl. submodules):")
+    for root, own in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        log(f"[startup]   {root:<30} {own * 1000:8.1f} ms")
+    log("[startup] Slowest modules (cumulative / self):")
+    for name, (total, own) in sorted(_imports.items(), key=lambda kv: -kv[1][0])[:top]:
+        log(f"[startup]   {name:<40} {total * 1000:8.1f} / {own * 1000:6.1f} ms")
+    for name, seconds in _phases:
+        log(f"[startup] Phase {name:<30} {seconds * 1000:8.1f} ms")
+    return {
+        "elapsed": elapsed,
+        "imports": {name: {"cumulative": t, "self": s} for name, (t, s) in _imports.items()},
+        "packages": packages,
+        "phases": dict(_phases),
+    }
@@ -0,0 +1,104 @@
+import os
+import json
+import asyncio
+import logging
+import tempfile
+from types import MappingProxyType
+
+FLUSH_INTERVAL = 5.0
+FLUSH_EVERY = 100
+
+class StatsSink:
+    """In-memory counters flushed to a JSON file in the background.
+
+    incr() is a dict update and never touches disk. A background task writes the counters
+    every `flush_interval` seconds, or sooner once `flush_every` increments are pending;
+    each write goes to a temp file that is renamed over the old one, so a crash can't
+    leave a torn file.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._counters = {}
+        self._dirty = 0
+        self._wakeup = None
+        self._task = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self._counters.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logging.error(f"[stats] Could not read {self.path}: {e}")
+        return self
+
+    def incr(self, name, amount=1):
+        self._counters[name] = self._counters.get(name, 0) + amount
+        self._dirty += 1
+        if self._dirty >= self.flush_every and self._wakeup is not None:
+            self._wakeup.set()
+
+    def get(self, name, default=0):
+        return self._counters.get(name, default)
+
+    def snapshot(self):
+        """Read-only copy of the current counters."""
+        return MappingProxyType(dict(self._counters))
+
+    def start(self):
+        """Start the background flusher on the running event loop."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        data, pending = dict(self._counters), self._dirty
+        self._dirty = 0
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception:
+            self._dirty += pending
+            raise
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"[stats] Flush failed: {e}")
+
+    def _write(self, data):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".stats-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
@@ -0,0 +1,430 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+DATA_DIR = "data"
+DB_FILE = "bot.db"
+# Pending writes are flushed when this many are queued or FLUSH_INTERVAL seconds pass.
+# The interval is also how long other bot workers may see a user's previous state.
+BATCH_SIZE = 100
+FLUSH_INTERVAL = float(os.getenv("STORE_FLUSH_INTERVAL", "0.1"))
+
+_DELETED = object()
+
+# ========== BACKENDS ==========
+
+class Store:
+    """Strategy and conversation-state storage.
+
+    Strategies are {"logic", "conditions", "symbol", "timeframe"} dicts keyed by user id;
+    conversations are the in-progress condition a user is building; handler states are
+    the ConversationHandler step per (handler name, conversation key); stats are JSON
+    blobs a component keeps under its own name (e.g. the planner's statistics).
+    """
+
+    def get_strategy(self, user_id):
+        raise NotImplementedError
+
+    def save_strategy(self, user_id, strategy):
+        raise NotImplementedError
+
+    def delete_strategy(self, user_id):
+        raise NotImplementedError
+
+    def strategies_for(self, symbol=None, timeframe=None):
+        """{user_id: strategy} for every strategy matching the given symbol and/or timeframe."""
+        raise NotImplementedError
+
+    def get_conversation(self, user_id):
+        raise NotImplementedError
+
+    def save_conversation(self, user_id, state):
+        raise NotImplementedError
+
+    def delete_conversation(self, user_id):
+        raise NotImplementedError
+
+    def user_ids(self, kind):
+        raise NotImplementedError
+
+    def get_handler_state(self, name, key):
+        raise NotImplementedError
+
+    def save_handler_state(self, name, key, state):
+        raise NotImplementedError
+
+    def delete_handler_state(self, name, key):
+        raise NotImplementedError
+
+    def handler_states(self, name):
+        """{conversation key: state} for every live conversation of handler `name`."""
+        raise NotImplementedError
+
+    def get_stats(self, name):
+        raise NotImplementedError
+
+    def save_stats(self, name, stats):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+class MemoryStore(Store):
+    """Single-process store; useful for tests and offline runs."""
+
+    def __init__(self):
+        self._tables = {"strategy": {}, "conversation": {}, "handler_state": {}, "stats": {}}
+
+    def get_strategy(self, user_id):
+        return self._tables["strategy"].get(user_id)
+
+    def save_strategy(self, user_id, strategy):
+        self._tables["strategy"][user_id] = strategy
+
+    def delete_strategy(self, user_id):
+        self._tables["strategy"].pop(user_id, None)
+
+    def strategies_for(self, symbol=None, timeframe=None):
+        return {
+            uid: s
+            for uid, s in self._tables["strategy"].items()
+            if symbol in (None, s.get("symbol")) and timeframe in (None, s.get("timeframe"))
+        }
+
+    def get_conversation(self, user_id):
+        return self._tables["conversation"].get(user_id)
+
+    def save_conversation(self, user_id, state):
+        self._tables["conversation"][user_id] = state
+
+    def delete_conversation(self, user_id):
+        self._tables["conversation"].pop(user_id, None)
+
+    def user_ids(self, kind):
+        return list(self._tables[kind])
+
+    def get_handler_state(self, name, key):
+        return self._tables["handler_state"].get((name, tuple(key)))
+
+    def save_handler_state(self, name, key, state):
+        self._tables["handler_state"][(name, tuple(key))] = state
+
+    def delete_handler_state(self, name, key):
+        self._tables["handler_state"].pop((name, tuple(key)), None)
+
+    def handler_states(self, name):
+        return {key: state for (n, key), state in self._tables["handler_state"].items() if n == name}
+
+    def get_stats(self, name):
+        return self._tables["stats"].get(name)
+
+    def save_stats(self, name, stats):
+        self._tables["stats"][name] = stats
+
+class SQLiteStore(Store):
+    """SQLite-backed store with write batching.
+
+    Writes are queued in memory (later writes for the same user replace earlier ones) and
+    committed in a single transaction by a background flusher, so a burst of button taps
+    costs one fsync. Reads see queued writes immediately.
+    """
+
+    def __init__(self, path=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path or os.path.join(DATA_DIR, DB_FILE)
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS strategies (
+                user_id INTEGER PRIMARY KEY,
+                symbol TEXT,
+                timeframe TEXT,
+                body TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_strategies_symbol_tf ON strategies (symbol, timeframe);
+            CREATE INDEX IF NOT EXISTS idx_strategies_tf ON strategies (timeframe);
+            CREATE TABLE IF NOT EXISTS conversations (
+                user_id INTEGER PRIMARY KEY,
+                body TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS handler_states (
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (name, key)
+            );
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._lock = threading.RLock()
+        self._pending = {"strategy": {}, "conversation": {}, "handler_state": {}, "stats": {}}
+        self._pending_count = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="store-flusher", daemon=True)
+        self._flusher.start()
+
+    # --- strategies ---
+
+    def get_strategy(self, user_id):
+        return self._get("strategy", "strategies", user_id)
+
+    def save_strategy(self, user_id, strategy):
+        self._queue("strategy", user_id, json.dumps(strategy))
+
+    def delete_strategy(self, user_id):
+        self._queue("strategy", user_id, _DELETED)
+
+    def strategies_for(self, symbol=None, timeframe=None):
+        sql = "SELECT user_id, body FROM strategies"
+        clauses, args = [], []
+        if symbol is not None:
+            clauses.append("symbol = ?")
+            args.append(symbol)
+        if timeframe is not None:
+            clauses.append("timeframe = ?")
+            args.append(timeframe)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = {uid: json.loads(body) for uid, body in self._conn.execute(sql, args)}
+            for uid, body in self._pending["strategy"].items():
+                if body is _DELETED:
+                    rows.pop(uid, None)
+                    continue
+                strategy = json.loads(body)
+                if symbol in (None, strategy.get("symbol")) and timeframe in (None, strategy.get("timeframe")):
+                    rows[uid] = strategy
+                else:
+                    rows.pop(uid, None)
+        return rows
+
+    # --- conversations ---
+
+    def get_conversation(self, user_id):
+        return self._get("conversation", "conversations", user_id)
+
+    def save_conversation(self, user_id, state):
+        self._queue("conversation", user_id, json.dumps(state))
+
+    def delete_conversation(self, user_id):
+        self._queue("conversation", user_id, _DELETED)
+
+    def user_ids(self, kind):
+        table = "strategies" if kind == "strategy" else "conversations"
+        with self._lock:
+            ids = {row[0] for row in self._conn.execute(f"SELECT user_id FROM {table}")}
+            for uid, body in self._pending[kind].items():
+                if body is _DELETED:
+                    ids.discard(uid)
+                else:
+                    ids.add(uid)
+        return list(ids)
+
+    # --- handler states ---
+
+    def get_handler_state(self, name, key):
+        pending_key = (name, json.dumps(list(key)))
+        with self._lock:
+            body = self._pending["handler_state"].get(pending_key)
+            if body is None:
+                row = self._conn.execute(
+                    "SELECT state FROM handler_states WHERE name = ? AND key = ?", pending_key
+                ).fetchone()
+                body = row[0] if row else None
+        if body is None or body is _DELETED:
+            return None
+        return json.loads(body)
+
+    def save_handler_state(self, name, key, state):
+        self._queue("handler_state", (name, json.dumps(list(key))), json.dumps(state))
+
+    def delete_handler_state(self, name, key):
+        self._queue("handler_state", (name, json.dumps(list(key))), _DELETED)
+
+    def handler_states(self, name):
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT key, state FROM handler_states WHERE name = ?", (name,)))
+            for (n, key), body in self._pending["handler_state"].items():
+                if n != name:
+                    continue
+                if body is _DELETED:
+                    rows.pop(key, None)
+                else:
+                    rows[key] = body
+        return {tuple(json.loads(key)): json.loads(body) for key, body in rows.items()}
+
+    # --- stats ---
+
+    def get_stats(self, name):
+        with self._lock:
+            body = self._pending["stats"].get(name)
+            if body is None:
+                row = self._conn.execute("SELECT body FROM stats WHERE name = ?", (name,)).fetchone()
+                body = row[0] if row else None
+        return json.loads(body) if body is not None else None
+
+    def save_stats(self, name, stats):
+        self._queue("stats", name, json.dumps(stats))
+
+    # --- batching ---
+
+    def _get(self, kind, table, user_id):
+        with self._lock:
+            body = self._pending[kind].get(user_id)
+            if body is None:
+                row = self._conn.execute(f"SELECT body FROM {table} WHERE user_id = ?", (user_id,)).fetchone()
+                body = row[0] if row else None
+        if body is None or body is _DELETED:
+            return None
+        return json.loads(body)
+
+    def _queue(self, kind, key, body):
+        with self._lock:
+            self._pending[kind][key] = body
+            self._pending_count += 1
+            if self._pending_count >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending_count:
+                return
+            now = time.time()
+            strategies, conversations = self._pending["strategy"], self._pending["conversation"]
+            handler_states, stats = self._pending["handler_state"], self._pending["stats"]
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM strategies WHERE user_id = ?",
+                    [(uid,) for uid, body in strategies.items() if body is _DELETED],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO strategies (user_id, symbol, timeframe, body, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (uid, s.get("symbol"), s.get("timeframe"), body, now)
+                        for uid, body in strategies.items()
+                        if body is not _DELETED
+                        for s in [json.loads(body)]
+                    ],
+                )
+                self._conn.executemany(
+                    "DELETE FROM conversations WHERE user_id = ?",
+                    [(uid,) for uid, body in conversations.items() if body is _DELETED],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO conversations (user_id, body, updated_at) VALUES (?, ?, ?)",
+                    [(uid, body, now) for uid, body in conversations.items() if body is not _DELETED],
+                )
+                self._conn.executemany(
+                    "DELETE FROM handler_states WHERE name = ? AND key = ?",
+                    [key for key, body in handler_states.items() if body is _DELETED],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO handler_states (name, key, state, updated_at) VALUES (?, ?, ?, ?)",
+                    [(name, key, body, now) for (name, key), body in handler_states.items() if body is not _DELETED],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO stats (name, body, updated_at) VALUES (?, ?, ?)",
+                    [(name, body, now) for name, body in stats.items()],
+                )
+            self._pending = {"strategy": {}, "conversation": {}, "handler_state": {}, "stats": {}}
+            self._pending_count = 0
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"[storage] Flush failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+def open_store(url=None):
+    """Build a store from a URL: "memory", "sqlite:///path/to.db" or a bare .db path.
+
+    Defaults to the STRATEGY_STORE env var, then data/bot.db.
+    """
+    url = url or os.getenv("STRATEGY_STORE") or os.path.join(DATA_DIR, DB_FILE)
+    if url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteStore(url)
+
+_store = None
+
+def get_store():
+    """Process-wide default store."""
+    global _store
+    if _store is None:
+        _store = open_store()
+    return _store
+
+# ========== MAPPING ADAPTER ==========
+
+class StoredMapping(MutableMapping):
+    """Dict-like view over one kind of record, so existing `user_data[uid][...] = x` code keeps working.
+
+    Values are cached on first read; nested edits are written back with `save(key)`
+    (tg_bot does this after every handler).
+    """
+
+    def __init__(self, store, kind):
+        self.store = store
+        self.kind = kind
+        self._cache = {}
+
+    def __getitem__(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            value = getattr(self.store, f"get_{self.kind}")(key)
+            if value is None:
+                raise KeyError(key)
+            self._cache[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._cache[key] = value
+        getattr(self.store, f"save_{self.kind}")(key, value)
+
+    def __delitem__(self, key):
+        self[key]
+        self._cache.pop(key, None)
+        getattr(self.store, f"delete_{self.kind}")(key)
+
+    def __iter__(self):
+        return iter(self.store.user_ids(self.kind))
+
+    def __len__(self):
+        return len(self.store.user_ids(self.kind))
+
+    def save(self, key):
+        if key in self._cache:
+            getattr(self.store, f"save_{self.kind}")(key, self._cache[key])
+
+    def forget(self, key):
+        """Drop the cached copy so the next read comes from the store."""
+        self._cache.pop(key, None)
@@ -0,0 +1,298 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from indicators import INDICATORS, resolve_params
+
+NAN = float("nan")
+
+# ========== HELPERS ==========
+
+def bar_source(bar, source):
+    """Value of `source` for a single bar mapping (Open/High/Low/Close/Volume)."""
+    if source == "HL2":
+        return (float(bar["High"]) + float(bar["Low"])) / 2.0
+    return float(bar[source])
+
+def _divide(num, den):
+    # Match pandas/NumPy float semantics instead of raising on a flat window.
+    if den == 0:
+        return NAN if num == 0 else math.copysign(math.inf, num)
+    return num / den
+
+class _Ewm:
+    """`Series.ewm(alpha=..., min_periods=..., adjust=False).mean()`, one value at a time."""
+
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha, min_periods):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        self.count += 1
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value if self.count >= self.min_periods else NAN
+
+class _RollingSum:
+    """Ring-buffer window keeping a running sum and sum of squares."""
+
+    # Re-sum the window from scratch this often to stop float drift accumulating.
+    RESYNC_EVERY = 10_000
+
+    __slots__ = ("window", "buf", "pos", "count", "total", "total_sq", "since_resync")
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = [0.0] * window
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.since_resync = 0
+
+    def update(self, x):
+        old = self.buf[self.pos]
+        if self.count >= self.window:
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.count += 1
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        self.total += x
+        self.total_sq += x * x
+        self.since_resync += 1
+        if self.since_resync >= self.RESYNC_EVERY:
+            values = self.buf[: self.count]
+            self.total = math.fsum(values)
+            self.total_sq = math.fsum(v * v for v in values)
+            self.since_resync = 0
+
+    @property
+    def full(self):
+        return self.count >= self.window
+
+    def mean(self):
+        return self.total / self.window if self.full else NAN
+
+    def std(self):
+        if not self.full:
+            return NAN
+        mean = self.total / self.window
+        return math.sqrt(max(self.total_sq / self.window - mean * mean, 0.0))
+
+class _RollingExtreme:
+    """Monotonic-deque rolling max (or min); amortized O(1) per update."""
+
+    __slots__ = ("window", "is_max", "items", "index")
+
+    def __init__(self, window, is_max):
+        self.window = window
+        self.is_max = is_max
+        self.items = deque()
+        self.index = 0
+
+    def update(self, x):
+        items = self.items
+        if self.is_max:
+            while items and items[-1][1] <= x:
+                items.pop()
+        else:
+            while items and items[-1][1] >= x:
+                items.pop()
+        items.append((self.index, x))
+        if items[0][0] <= self.index - self.window:
+            items.popleft()
+        self.index += 1
+        return items[0][1] if self.index >= self.window else NAN
+
+# ========== STREAMING INDICATORS ==========
+
+class StreamingIndicator:
+    """Base class: feed closed bars one at a time with update(bar); `value` is the latest output."""
+
+    value = NAN
+
+    def update(self, bar):
+        raise NotImplementedError
+
+    def warm_up(self, bars):
+        """Feed a history frame (or column mapping) bar by bar; returns the output series."""
+        names = [name for name in ("Open", "High", "Low", "Close", "Volume") if name in bars]
+        cols = {name: np.asarray(bars[name], dtype=float) for name in names}
+        n = len(next(iter(cols.values()))) if cols else 0
+        out = np.empty(n)
+        for i in range(n):
+            out[i] = self.update({name: col[i] for name, col in cols.items()})
+        return out
+
+class RSIStream(StreamingIndicator):
+    def __init__(self, period=14, source="Close"):
+        self.source = source
+        self._prev = None
+        self._up = _Ewm(1.0 / period, period)
+        self._down = _Ewm(1.0 / period, period)
+
+    def update(self, bar):
+        x = bar_source(bar, self.source)
+        diff = 0.0 if self._prev is None else x - self._prev
+        self._prev = x
+        up = self._up.update(diff if diff > 0 else 0.0)
+        down = self._down.update(-diff if diff < 0 else 0.0)
+        if math.isnan(down):
+            self.value = NAN
+        elif down == 0:
+            self.value = 100.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + up / down)
+        return self.value
+
+class EMAStream(StreamingIndicator):
+    def __init__(self, period=20, source="Close"):
+        self.source = source
+        self._ema = _Ewm(2.0 / (period + 1), period)
+
+    def update(self, bar):
+        self.value = self._ema.update(bar_source(bar, self.source))
+        return self.value
+
+class SMAStream(StreamingIndicator):
+    def __init__(self, period=50, source="Close"):
+        self.source = source
+        self._window = _RollingSum(period)
+
+    def update(self, bar):
+        self._window.update(bar_source(bar, self.source))
+        self.value = self._window.mean()
+        return self.value
+
+class MACDStream(StreamingIndicator):
+    signal_value = NAN
+
+    def __init__(self, fast=12, slow=26, signal=9, source="Close"):
+        self.source = source
+        self._fast = _Ewm(2.0 / (fast + 1), fast)
+        self._slow = _Ewm(2.0 / (slow + 1), slow)
+        self._signal = _Ewm(2.0 / (signal + 1), signal)
+
+    def update(self, bar):
+        x = bar_source(bar, self.source)
+        self.value = self._fast.update(x) - self._slow.update(x)
+        if not math.isnan(self.value):
+            self.signal_value = self._signal.update(self.value)
+        return self.value
+
+class StochasticStream(StreamingIndicator):
+    signal_value = NAN
+
+    def __init__(self, k_period=14, d_period=3, source="High"):
+        self.source = source
+        self._low = _RollingExtreme(k_period, is_max=False)
+        self._high = _RollingExtreme(k_period, is_max=True)
+        self._d = _RollingSum(d_period)
+
+    def update(self, bar):
+        lo = self._low.update(float(bar["Low"]))
+        hi = self._high.update(float(bar["High"]))
+        self.value = 100.0 * _divide(bar_source(bar, self.source) - lo, hi - lo)
+        if not math.isnan(self.value):
+            self._d.update(self.value)
+            self.signal_value = self._d.mean()
+        return self.value
+
+class BollingerStream(StreamingIndicator):
+    hband = NAN
+    lband = NAN
+
+    def __init__(self, period=20, stddev=2.0, source="Close"):
+        self.source = source
+        self.stddev = stddev
+        self._window = _RollingSum(period)
+
+    def update(self, bar):
+        self._window.update(bar_source(bar, self.source))
+        self.value = self._window.mean()
+        width = self.stddev * self._window.std()
+        self.hband = self.value + width
+        self.lband = self.value - width
+        return self.value
+
+class ATRStream(StreamingIndicator):
+    def __init__(self, period=14):
+        self.period = period
+        self._prev_close = None
+        self._count = 0
+        self._tr_sum = 0.0
+        self.value = 0.0
+
+    def update(self, bar):
+        high, low = float(bar["High"]), float(bar["Low"])
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = float(bar["Close"])
+        self._count += 1
+        # `ta` seeds with the plain mean of the first window, then applies Wilder smoothing.
+        if self._count < self.period:
+            self._tr_sum += tr
+            self.value = 0.0
+        elif self._count == self.period:
+            self.value = (self._tr_sum + tr) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+class OBVStream(StreamingIndicator):
+    def __init__(self, source="Close"):
+        self.source = source
+        self._prev = None
+        self.value = 0.0
+
+    def update(self, bar):
+        x = bar_source(bar, self.source)
+        volume = float(bar["Volume"])
+        self.value += -volume if self._prev is not None and x < self._prev else volume
+        self._prev = x
+        return self.value
+
+STREAMS = {
+    "RSI": RSIStream,
+    "EMA": EMAStream,
+    "SMA": SMAStream,
+    "MACD": MACDStream,
+    "Stochastic": StochasticStream,
+    "BollingerBands": BollingerStream,
+    "ATR": ATRStream,
+    "OBV": OBVStream,
+}
+
+def make_stream(indicator, params=None):
+    """Build the streaming counterpart of an `INDICATORS` entry."""
+    if indicator not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {indicator}")
+    return STREAMS[indicator](**resolve_params(indicator, params))
+
+class StreamSet:
+    """Streaming indicators for one (symbol, timeframe), keyed by engine.indicator_key."""
+
+    def __init__(self):
+        self.streams = {}
+
+    def add(self, key, bars=None):
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = make_stream(key[0], dict(key[1]))
+            if bars is not None:
+                stream.warm_up(bars)
+        return stream
+
+    def update(self, bar):
+        """Advance every stream by one closed bar; returns {key: latest value}."""
+        return {key: stream.update(bar) for key, stream in self.streams.items()}
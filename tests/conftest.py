@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules live at the repo root; tests never touch the real strategy DB.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("STRATEGY_STORE", "memory")
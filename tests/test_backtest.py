@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+from backtest import backtest
+from market_data import synthetic_bars
+
+RSI_BELOW_50 = {
+    "logic": "AND",
+    "conditions": [{"indicator": "RSI", "params": {"period": 14}, "operator": "<", "compare_to": {"value": 50}}],
+}
+EMA_OVER_SMA = {
+    "logic": "AND",
+    "conditions": [
+        {"indicator": "EMA", "params": {"period": 9}, "operator": ">", "compare_to": {"indicator": "SMA", "params": {"period": 20}}}
+    ],
+}
+EMPTY_RESULT = {
+    "trades": 0, "win_rate": 0.0, "total_return": 0.0, "max_drawdown": 0.0, "avg_trade": 0.0,
+    "best_trade": 0.0, "worst_trade": 0.0, "exposure": 0.0, "sharpe": None,
+}
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_bars(pd.date_range("2024-01-01", periods=1000, freq="1h", tz="UTC"), seed=7)
+
+def test_long_golden(bars):
+    result = backtest(bars, RSI_BELOW_50, timeframe="1h")
+    assert result == pytest.approx({
+        "bars": 1000,
+        "start": "2024-01-01 00:00:00+00:00",
+        "end": "2024-02-11 15:00:00+00:00",
+        "trades": 51,
+        "win_rate": 0.6666666666666666,
+        "total_return": -0.06725177856594355,
+        "max_drawdown": -0.07672483841065525,
+        "avg_trade": -0.0013463597789774005,
+        "best_trade": 0.0017653880210034977,
+        "worst_trade": -0.036562660314972364,
+        "exposure": 0.616,
+        "sharpe": -7.6602688949961255,
+    }, rel=1e-9)
+
+def test_short_golden(bars):
+    result = backtest(bars, EMA_OVER_SMA, side=-1, timeframe="1h")
+    assert result == pytest.approx({
+        "bars": 1000,
+        "start": "2024-01-01 00:00:00+00:00",
+        "end": "2024-02-11 15:00:00+00:00",
+        "trades": 26,
+        "win_rate": 0.6538461538461539,
+        "total_return": 0.0026731222696150247,
+        "max_drawdown": -0.021248806241906948,
+        "avg_trade": 0.00010654534199427166,
+        "best_trade": 0.003666243618151915,
+        "worst_trade": -0.008031416186491202,
+        "exposure": 0.375,
+        "sharpe": 0.3993228349247226,
+    }, rel=1e-9)
+
+def test_repeatable(bars):
+    assert backtest(bars, RSI_BELOW_50, timeframe="1h") == backtest(bars.copy(), RSI_BELOW_50, timeframe="1h")
+
+def test_empty_bars(bars):
+    result = backtest(bars.iloc[:0], RSI_BELOW_50, timeframe="1h")
+    assert result == {"bars": 0, "start": None, "end": None, **EMPTY_RESULT}
+
+def test_single_bar(bars):
+    result = backtest(bars.iloc[:1], RSI_BELOW_50, timeframe="1h")
+    start = "2024-01-01 00:00:00+00:00"
+    assert result == {"bars": 1, "start": start, "end": start, **EMPTY_RESULT}
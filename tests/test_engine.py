@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from engine import ConditionIndex, compile_strategy, evaluate, evaluate_condition, indicator_key
+from indicators import OPERATORS
+
+NAN = float("nan")
+# Last two bars of the series under test, and thresholds on, between and beyond them.
+POINTS = [1.0, 2.0, 3.0, NAN]
+THRESHOLDS = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, NAN]
+LHS = {"indicator": "RSI", "params": {"period": 14}}
+RHS = {"indicator": "EMA", "params": {"period": 9}}
+
+def _conditions():
+    conditions = []
+    for operator in OPERATORS:
+        for value in THRESHOLDS:
+            conditions.append(dict(LHS, operator=operator, compare_to={"value": value}))
+        conditions.append(dict(LHS, operator=operator, compare_to=RHS))
+    # A zone (including an empty-width one) only means something to in_zone.
+    for lo, hi in itertools.combinations_with_replacement([0.5, 1.0, 2.0, 3.0, NAN], 2):
+        conditions.append(dict(LHS, operator="in_zone", compare_to={"zone": [lo, hi]}))
+    return conditions
+
+def _series(lhs, rhs):
+    # A few leading bars so only the tail matters, as on a live candle.
+    return {
+        indicator_key("RSI", {"period": 14}): np.array([5.0, 5.0, *lhs]),
+        indicator_key("EMA", {"period": 9}): np.array([0.0, 0.0, *rhs]),
+    }
+
+CONDITIONS = _conditions()
+STRATEGIES = {i: {"logic": "AND", "conditions": [cond]} for i, cond in enumerate(CONDITIONS)}
+
+@pytest.mark.parametrize("prev,now", list(itertools.product(POINTS, POINTS)))
+def test_fired_matches_brute_force_for_every_operator(prev, now):
+    index = ConditionIndex.from_strategies(STRATEGIES)
+    for rhs in itertools.product(POINTS, POINTS):
+        series = _series((prev, now), rhs)
+        fired = {index.conditions[node] for node in index.fired(series)}
+        expected = {cond for cond in index.conditions if evaluate_condition(cond, series)[-1]}
+        assert fired == expected, (prev, now, rhs, fired ^ expected)
+
+@pytest.mark.parametrize("logic", ["AND", "OR"])
+def test_signals_match_evaluate(logic):
+    rng = np.random.default_rng(1)
+    strategies = {
+        user_id: {"logic": logic, "conditions": [CONDITIONS[i] for i in rng.choice(len(CONDITIONS), size=3)]}
+        for user_id in range(300)
+    }
+    index = ConditionIndex.from_strategies(strategies)
+    for prev, now in itertools.product(POINTS, POINTS):
+        series = _series((prev, now), (now, prev))
+        expected = [u for u, s in strategies.items() if evaluate(compile_strategy(s), series)[-1]]
+        assert sorted(index.signals(series)) == expected
@@ -0,0 +1,108 @@
+import time
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+try:
+    from http_client import AiohttpRequest, HttpClient
+except ImportError as e:  # telegram.request is python-telegram-bot v20+
+    pytest.skip(f"http_client not importable: {e}", allow_module_level=True)
+
+from telegram import Bot
+from telegram.error import NetworkError
+
+from fake_telegram import BOT_USER, FakeBotApi
+
+def _probe_app(hits):
+    async def ok(request):
+        hits.append(request.path)
+        return web.Response()
+
+    async def slow(request):
+        hits.append(request.path)
+        await asyncio.sleep(float(request.query.get("delay", "0.3")))
+        return web.Response()
+
+    async def broken(request):
+        hits.append(request.path)
+        return web.Response(status=503)
+
+    app = web.Application()
+    app.router.add_route("*", "/ok", ok)
+    app.router.add_route("*", "/slow", slow)
+    app.router.add_route("*", "/broken", broken)
+    return app
+
+async def _with_server(test):
+    hits = []
+    server = TestServer(_probe_app(hits))
+    await server.start_server()
+    http = HttpClient()
+    try:
+        return await test(http, lambda path: str(server.make_url(path)), hits)
+    finally:
+        await http.close()
+        await server.close()
+
+def test_first_alive_prefers_priority_over_speed():
+    async def test(http, url, hits):
+        # The slow candidate answers last but is listed first, so it wins.
+        assert await http.first_alive([url("/broken"), url("/slow"), url("/ok")]) == url("/slow")
+
+    asyncio.run(_with_server(test))
+
+def test_first_alive_falls_back_past_dead_candidates():
+    async def test(http, url, hits):
+        refused = "http://127.0.0.1:9/"
+        assert await http.first_alive([None, refused, url("/broken"), url("/ok")]) == url("/ok")
+        assert await http.first_alive([refused, url("/broken")]) is None
+
+    asyncio.run(_with_server(test))
+
+def test_first_alive_stops_at_the_first_healthy_candidate():
+    async def test(http, url, hits):
+        start = time.monotonic()
+        assert await http.first_alive([url("/ok"), url("/slow?delay=5")]) == url("/ok")
+        assert time.monotonic() - start < 2
+
+    asyncio.run(_with_server(test))
+
+def test_probe_results_are_cached():
+    async def test(http, url, hits):
+        assert await http.is_alive(url("/ok"))
+        assert await http.is_alive(url("/ok"))
+        assert hits == ["/ok"]
+        http.alive_ttl = 0
+        http._alive.clear()
+        assert not await http.is_alive(url("/broken"))
+        assert not await http.is_alive(url("/broken"))
+        assert hits == ["/ok", "/broken", "/broken"]
+
+    asyncio.run(_with_server(test))
+
+async def _round_trip():
+    api = FakeBotApi()
+    http = HttpClient(api_url=await api.start())
+    try:
+        bot = Bot("123:ABC", base_url=api.url + "/bot", request=AiohttpRequest(http))
+        async with bot:
+            me = await bot.get_me()
+            message = await bot.send_message(chat_id=42, text="hi")
+        body = await http.bot_api("123:ABC", "sendMessage", {"chat_id": 7, "text": "raw"})
+        refused = Bot("123:ABC", base_url="http://127.0.0.1:9/bot", request=AiohttpRequest(http))
+        with pytest.raises(NetworkError):
+            await refused.get_me()
+        return me, message, body, api.calls
+    finally:
+        await http.close()
+        await api.stop()
+
+def test_requests_round_trip_through_the_shared_pool():
+    me, message, body, calls = asyncio.run(_round_trip())
+    assert me.username == BOT_USER["username"]
+    assert (message.chat.id, message.text) == (42, "hi")
+    assert body["ok"] and body["result"]["text"] == "raw"
+    assert [name for name, _ in calls] == ["getMe", "getMe", "sendMessage", "sendMessage"]
+    assert calls[2][1]["chat_id"] in (42, "42") and calls[2][1]["text"] == "hi"
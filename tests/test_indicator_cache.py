@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import kernels
+from engine import compute_series, indicator_key
+from indicator_cache import IndicatorCache
+from indicators import compute_indicator
+from market_data import synthetic_bars
+
+KEYS = [
+    indicator_key("RSI", {"period": 14}),
+    indicator_key("EMA", {"period": 9}),
+    indicator_key("SMA", {"period": 20}),
+    indicator_key("MACD"),
+]
+
+@pytest.fixture
+def bars():
+    return synthetic_bars(pd.date_range("2024-01-01", periods=300, freq="1h", tz="UTC"), seed=3)
+
+def test_misses_fill_through_one_fused_call(bars, monkeypatch):
+    runs = []
+    many = kernels.FusedRun.many
+    monkeypatch.setattr(kernels.FusedRun, "many", lambda run, b, keys: runs.append(sorted(keys)) or many(run, b, keys))
+    cache = IndicatorCache()
+    series = compute_series(bars, KEYS, compute=cache.compute_for("EURUSD", "1h", bars))
+    assert runs == [sorted(KEYS)]
+    for key in KEYS:
+        np.testing.assert_allclose(series[key], compute_indicator(bars, key[0], dict(key[1])), equal_nan=True)
+    assert cache.stats()["misses"] == len(KEYS)
+
+def test_hits_skip_the_fused_call(bars, monkeypatch):
+    cache = IndicatorCache()
+    compute_series(bars, KEYS[:2], compute=cache.compute_for("EURUSD", "1h", bars))
+    runs = []
+    many = kernels.FusedRun.many
+    monkeypatch.setattr(kernels.FusedRun, "many", lambda run, b, keys: runs.append(sorted(keys)) or many(run, b, keys))
+    series = compute_series(bars, KEYS, compute=cache.compute_for("EURUSD", "1h", bars))
+    assert runs == [sorted(KEYS[2:])]
+    assert set(series) == set(KEYS)
+    assert cache.stats()["hits"] == 2
+
+def test_new_bars_invalidate(bars):
+    cache = IndicatorCache()
+    compute_series(bars, KEYS, compute=cache.compute_for("EURUSD", "1h", bars))
+    compute_series(bars.iloc[:-1], KEYS, compute=cache.compute_for("EURUSD", "1h", bars.iloc[:-1]))
+    assert cache.stats()["misses"] == 2 * len(KEYS)
+    assert cache.stats()["invalidations"] == 1
+
+def test_overlapping_bar_sets_never_share_entries(bars):
+    # Two candles of one series in flight at once: each must see only its own bars.
+    cache = IndicatorCache()
+    older, newer = bars.iloc[:-1], bars
+    old_hook = cache.compute_for("EURUSD", "1h", older)
+    new_hook = cache.compute_for("EURUSD", "1h", newer)
+    for hook, frame in ((old_hook, older), (new_hook, newer), (old_hook, older)):
+        series = compute_series(frame, KEYS, compute=hook)
+        for key in KEYS:
+            np.testing.assert_allclose(series[key], compute_indicator(frame, key[0], dict(key[1])), equal_nan=True)
+    assert compute_series(newer, KEYS, compute=new_hook) and cache.stats()["hits"] == len(KEYS)
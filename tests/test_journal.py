@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+import journal
+from journal import SignalJournal
+
+@pytest.fixture
+def writer(tmp_path):
+    return SignalJournal(str(tmp_path), segment_records=8)
+
+def _fill(writer):
+    # 20 records over three 8-record segments: users 0-4 in turn, EURUSD for even ts, GBPUSD odd.
+    for ts in range(1, 21):
+        writer.append_many(ts, [ts % 5], "EURUSD" if ts % 2 == 0 else "GBPUSD", "1h: RSI > 70", float(ts))
+
+def _pages(reader, **filters):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = reader.history(before=cursor, limit=3, **filters)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+def test_append_many_writes_one_record_per_user(writer):
+    assert writer.append_many(5, [1, 2, 3], "EURUSD", "1h: EMA crosses above SMA", [0.5, 0.6, 0.7]) == 3
+    rows, cursor = writer.history()
+    assert cursor is None
+    assert [(r["user"], r["value"], r["symbol"], r["ts"]) for r in rows] == [
+        (3, 0.7, "EURUSD", 5), (2, 0.6, "EURUSD", 5), (1, 0.5, "EURUSD", 5)
+    ]
+    assert {r["condition"] for r in rows} == {"1h: EMA crosses above SMA"}
+
+def test_batch_spans_segments(writer):
+    writer.append_many(1, range(20), "EURUSD", "c", 1.0)
+    assert writer.stats()["segments"] == 3 and len(writer) == 20
+    assert [r["user"] for r in _pages(writer)[0]] == list(range(19, -1, -1))
+
+def test_cursor_pages_cross_segment_boundaries(writer):
+    _fill(writer)
+    rows, pages = _pages(writer)
+    assert [r["ts"] for r in rows] == list(range(20, 0, -1))
+    assert [r["seq"] for r in rows] == sorted({r["seq"] for r in rows}, reverse=True)
+    assert pages == 7
+    rows, _ = _pages(writer, user=2)
+    assert [r["ts"] for r in rows] == [17, 12, 7, 2]
+
+def test_user_and_symbol_filter(writer):
+    _fill(writer)
+    rows, _ = _pages(writer, user=2, symbol="EURUSD")
+    assert [r["ts"] for r in rows] == [12, 2]
+    rows, _ = _pages(writer, user=3, symbol="GBPUSD")
+    assert [(r["ts"], r["user"], r["symbol"]) for r in rows] == [(13, 3, "GBPUSD"), (3, 3, "GBPUSD")]
+    assert writer.history(symbol="USDJPY") == ([], None)
+    assert writer.history(user=99) == ([], None)
+
+def test_reader_picks_up_the_writers_appends(writer, tmp_path):
+    writer.append(1, 7, "EURUSD", "c")
+    reader = SignalJournal(str(tmp_path), writable=False)
+    assert [r["ts"] for r in reader.history(user=7)[0]] == [1]
+    for ts in range(2, 12):
+        writer.append(ts, 7, "USDJPY" if ts == 11 else "EURUSD", "c")
+    rows, _ = _pages(reader, user=7)
+    assert [r["ts"] for r in rows] == list(range(11, 0, -1))
+    assert [r["ts"] for r in reader.history(symbol="USDJPY")[0]] == [11]
+    with pytest.raises(PermissionError):
+        reader.append(12, 7, "EURUSD", "c")
+
+def test_full_segments_are_read_through_their_saved_index(writer, tmp_path, monkeypatch):
+    _fill(writer)
+    names = set(os.listdir(tmp_path))
+    for number in (0, 1):
+        for field in journal.INDEX_FIELDS:
+            assert {f"segment-{number:06d}.{field}.keys.npy", f"segment-{number:06d}.{field}.slots.npy"} <= names
+    assert not any(name.startswith("segment-000002.") and name.endswith(".npy") for name in names)
+    grouped = []
+    group = journal._group
+    monkeypatch.setattr(journal, "_group", lambda keys, slots, index: grouped.append(len(keys)) or group(keys, slots, index))
+    reader = SignalJournal(str(tmp_path), writable=False)
+    rows, _ = _pages(reader, user=2, symbol="EURUSD")
+    assert [r["ts"] for r in rows] == [12, 2]
+    # Only the 4 records of the segment still being written were indexed in memory.
+    assert grouped == [4, 4]
+    np.testing.assert_array_equal(reader.segments[0].users.get(2), [1, 6])
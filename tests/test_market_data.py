@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from market_data import BarStore, FakeProvider, MarketData, resample_bars, synthetic_bars
+
+def assert_bars_equal(left, right):
+    # The store keeps ns timestamps; frames built by pandas may use another resolution.
+    pd.testing.assert_frame_equal(
+        left.set_axis(left.index.as_unit("ns")), right.set_axis(right.index.as_unit("ns")), check_freq=False
+    )
+
+@pytest.fixture
+def market(tmp_path):
+    return MarketData(provider=FakeProvider(history=100), store=BarStore(root=str(tmp_path)))
+
+def test_refresh_fetches_only_the_tail(market):
+    assert market.refresh(["EURUSD", "GBPUSD"], "1h") == {"EURUSD": 100, "GBPUSD": 100}
+    assert market.provider.calls == [(("EURUSD", "GBPUSD"), "1h", None)]
+    last = market.store.last_timestamp("EURUSD", "1h")
+
+    market.provider.advance(3, "1h")
+    # The last stored bar is re-fetched (it may have been incomplete) plus the three new ones.
+    assert market.refresh(["EURUSD", "GBPUSD"], "1h") == {"EURUSD": 4, "GBPUSD": 4}
+    assert market.provider.calls[-1] == (("EURUSD", "GBPUSD"), "1h", last)
+
+    bars = market.bars("EURUSD", "1h")
+    assert len(bars) == 103
+    assert bars.index.is_monotonic_increasing and not bars.index.has_duplicates
+    expected = market.provider.fetch(["EURUSD"], "1h")["EURUSD"]
+    assert_bars_equal(bars.iloc[-100:], expected)
+
+def test_refresh_without_new_bars_rewrites_only_the_last(market):
+    market.refresh(["EURUSD"], "1h")
+    assert market.refresh(["EURUSD"], "1h") == {"EURUSD": 1}
+    assert len(market.bars("EURUSD", "1h")) == 100
+
+def test_bar_store_round_trip(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    frame = synthetic_bars(pd.date_range("2024-01-01", periods=50, freq="5min", tz="UTC"), seed=1)
+    assert store.append("EURUSD", "5m", frame) == 50
+    assert_bars_equal(store.load("EURUSD", "5m"), frame)
+    assert store.last_timestamp("EURUSD", "5m") == frame.index[-1]
+
+    # Overlapping appends replace bars from the new frame's first timestamp on.
+    update = frame.iloc[-5:].assign(Close=frame["Close"].iloc[-5:] + 1)
+    store.append("EURUSD", "5m", update)
+    loaded = store.load("EURUSD", "5m")
+    assert len(loaded) == 50
+    assert_bars_equal(loaded.iloc[-5:], update)
+    assert_bars_equal(loaded.iloc[:-5], frame.iloc[:-5])
+
+def test_missing_series_is_empty(tmp_path):
+    store = BarStore(root=str(tmp_path))
+    assert store.load("EURUSD", "1h").empty
+    assert store.last_timestamp("EURUSD", "1h") is None
+
+def test_bars_limit_slices_the_most_recent(market):
+    market.refresh(["EURUSD"], "1h")
+    full = market.bars("EURUSD", "1h")
+    tail = market.bars("EURUSD", "1h", limit=10)
+    assert len(tail) == 10
+    assert_bars_equal(tail, full.iloc[-10:])
+    assert len(market.bars("EURUSD", "1h", limit=1000)) == 100
+
+def test_resample_bars_builds_4h_from_1h():
+    hourly = synthetic_bars(pd.date_range("2024-01-01 02:00", periods=30, freq="1h", tz="UTC"), seed=2)
+    four = resample_bars(hourly, "4h")
+    # Bins start at 00/04/08...; the leading 02:00-03:00 bars form a partial 00:00 candle.
+    assert list(four.index[:3].hour) == [0, 4, 8]
+    window = hourly.loc["2024-01-01 04:00":"2024-01-01 07:00"]
+    candle = four.loc["2024-01-01 04:00"]
+    assert candle["Open"] == window["Open"].iloc[0] and candle["Close"] == window["Close"].iloc[-1]
+    assert candle["High"] == window["High"].max() and candle["Low"] == window["Low"].min()
+    assert candle["Volume"] == window["Volume"].sum()
+
+def test_load_during_a_write_sees_a_consistent_prefix(tmp_path, monkeypatch):
+    import market_data
+
+    store = BarStore(root=str(tmp_path))
+    frame = synthetic_bars(pd.date_range("2024-01-01", periods=60, freq="1h", tz="UTC"), seed=4)
+    store.append("EURUSD", "1h", frame.iloc[:40])
+    seen = []
+    replace = market_data.os.replace
+
+    def replace_then_load(src, dst):
+        # A reader loads after every file the writer swaps in.
+        replace(src, dst)
+        seen.append(store.load("EURUSD", "1h"))
+
+    monkeypatch.setattr(market_data.os, "replace", replace_then_load)
+    store.append("EURUSD", "1h", frame.iloc[40:])
+    assert len(seen) == 6
+    for loaded in seen:
+        assert len(loaded) in (40, 60)
+        assert_bars_equal(loaded, frame.iloc[:len(loaded)])
+    assert len(seen[-1]) == 60
@@ -0,0 +1,35 @@
+import asyncio
+
+from notifier import Notifier
+
+async def _send_all(enqueue):
+    sent = []
+
+    async def send(chat_id, text, **kwargs):
+        sent.append((chat_id, text))
+
+    notifier = Notifier(send, global_rate=1e9, global_burst=10**9, chat_rate=1e9, chat_burst=10**9)
+    notifier.start()
+    enqueue(notifier)
+    await notifier.stop(drain_timeout=5)
+    return notifier, sent
+
+def test_replies_are_never_deduped():
+    def enqueue(notifier):
+        notifier.enqueue(1, "❌ Error processing strategy.")
+        notifier.enqueue(1, "❌ Error processing strategy.")
+
+    notifier, sent = asyncio.run(_send_all(enqueue))
+    assert notifier.counters["deduped"] == 0
+    # Both arrive, coalesced into one message for the chat.
+    assert sent == [(1, "❌ Error processing strategy.\n\n❌ Error processing strategy.")]
+
+def test_keyed_messages_are_sent_once():
+    def enqueue(notifier):
+        for _ in range(3):
+            notifier.enqueue(1, "📈 Signal on EURUSD 1h", dedupe_key=("signal", 1, "EURUSD"))
+        notifier.enqueue(2, "📈 Signal on EURUSD 1h", dedupe_key=("signal", 2, "EURUSD"))
+
+    notifier, sent = asyncio.run(_send_all(enqueue))
+    assert notifier.counters["deduped"] == 2
+    assert sorted(sent) == [(1, "📈 Signal on EURUSD 1h"), (2, "📈 Signal on EURUSD 1h")]
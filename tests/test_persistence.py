@@ -0,0 +1,85 @@
+import os
+import sys
+import subprocess
+
+import pytest
+import telegram.ext
+
+from persistence import HandlerStates
+from storage import SQLiteStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# StorePersistence and the sharded poller are python-telegram-bot v13 (Dispatcher) code.
+needs_v13 = pytest.mark.skipif(not hasattr(telegram.ext, "Dispatcher"), reason="needs python-telegram-bot v13")
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "bot.db")
+
+def test_handler_states_cache_reads_within_the_ttl(db):
+    store = SQLiteStore(db, flush_interval=60)
+    mine = HandlerStates(store, "conv", ttl=60)
+    theirs = HandlerStates(SQLiteStore(db, flush_interval=60), "conv", ttl=0)
+    mine[(1, 1)] = 2
+    # Read after write inside the TTL: served from the local cache, even before any flush.
+    assert mine[(1, 1)] == 2
+    with pytest.raises(KeyError):
+        theirs[(1, 1)]
+    store.flush()
+    assert theirs[(1, 1)] == 2 and dict(theirs) == {(1, 1): 2}
+    theirs[(1, 1)] = 3
+    theirs.store.flush()
+    # The cached state stands until the TTL runs out; a fresh reader sees the new one.
+    assert mine[(1, 1)] == 2
+    assert HandlerStates(store, "conv", ttl=0)[(1, 1)] == 3
+    del mine[(1, 1)]
+    assert (1, 1) not in mine and len(mine) == 0
+
+def test_handler_states_keep_run_async_pairs_local(db):
+    store = SQLiteStore(db, flush_interval=60)
+    states = HandlerStates(store, "conv", ttl=60)
+    states[(1, 1)] = (1, object())
+    assert isinstance(states[(1, 1)], tuple)
+    assert store.get_handler_state("conv", (1, 1)) is None
+
+@needs_v13
+def test_store_persistence_round_trip(db):
+    from persistence import StorePersistence
+
+    persistence = StorePersistence(SQLiteStore(db, flush_interval=60), ttl=0)
+    persistence.get_conversations("conv")[(5, 5)] = 1
+    persistence.update_conversation("conv", (5, 5), 1)
+    persistence.flush()
+    reloaded = StorePersistence(SQLiteStore(db), ttl=0)
+    assert dict(reloaded.get_conversations("conv")) == {(5, 5): 1}
+    assert reloaded.get_user_data() == {} and reloaded.get_bot_data() == {}
+
+# Starts the sharded poller with a stub Bot whose first getUpdates delivers SIGTERM.
+SHARDED = """
+import os, signal, multiprocessing
+import tg_bot
+
+class StubBot:
+    def __init__(self, token, base_url=None):
+        pass
+    def delete_webhook(self):
+        pass
+    def get_updates(self, offset=None, timeout=None):
+        os.kill(os.getpid(), signal.SIGTERM)
+        return []
+
+tg_bot.Bot = StubBot
+tg_bot.store.save_strategy(1, {"logic": "AND", "conditions": [], "symbol": "EURUSD", "timeframe": "1h"})
+tg_bot.run_sharded(2, token="123:SHARDED")
+print(len(multiprocessing.active_children()))
+"""
+
+@needs_v13
+def test_sigterm_drains_workers_and_flushes(db):
+    env = dict(os.environ, STRATEGY_STORE=db, STORE_FLUSH_INTERVAL="60")
+    result = subprocess.run(
+        [sys.executable, "-c", SHARDED], cwd=ROOT, env=env, capture_output=True, text=True, timeout=30
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "0"
+    assert SQLiteStore(db).get_strategy(1)["symbol"] == "EURUSD"
@@ -0,0 +1,135 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from bench import random_strategies
+from engine import last_signals
+from indicator_cache import IndicatorCache
+from market_data import synthetic_bars
+from planner import Planner
+from scheduler import SignalScheduler
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_bars(pd.date_range("2024-01-01", periods=500, freq="1h", tz="UTC"), seed=11)
+
+@pytest.mark.parametrize("count", [1, 10, 32, 200])
+def test_matches_last_signals(bars, count):
+    strategies = random_strategies(count, seed=count)
+    planner = Planner()
+    expected = sorted(last_signals(bars, strategies))
+    assert sorted(planner.signals(bars, strategies)) == expected
+    # A second pass reorders by the gathered statistics and must agree too.
+    assert sorted(planner.signals(bars, strategies)) == expected
+
+def test_cache_hook_matches(bars):
+    strategies = random_strategies(32, seed=5)
+    cache = IndicatorCache()
+    hits = Planner().signals(bars, strategies, compute=cache.compute_for("EURUSD", "1h", bars))
+    assert sorted(hits) == sorted(last_signals(bars, strategies))
+    assert cache.stats()["misses"] > 0
+
+class FramesMarket:
+    def __init__(self, bars):
+        self.frame = bars
+
+    def bars(self, symbol, timeframe, limit=None):
+        return self.frame.iloc[-limit:] if limit else self.frame
+
+class RefusingPool:
+    async def evaluate(self, bars, group):
+        raise AssertionError("small groups should not reach the pool")
+
+def test_small_groups_skip_the_pool(bars):
+    sent = []
+
+    async def send(chat_id, text, dedupe_key=None):
+        sent.append(chat_id)
+
+    strategies = random_strategies(10, seed=3)
+    scheduler = SignalScheduler(send, market_data=FramesMarket(bars), cache=IndicatorCache(), pool=RefusingPool(), planner=Planner())
+    scheduler.pending = 1
+    now = bars.index[-1] + pd.Timedelta(hours=1)
+    count = asyncio.run(scheduler._run_group("EURUSD", "1h", strategies, now))
+    assert sorted(sent) == sorted(last_signals(bars, strategies))
+    assert count == len(sent) > 0
+
+def test_statistics_round_trip_through_the_store(bars, tmp_path):
+    from storage import SQLiteStore
+
+    strategies = random_strategies(20, seed=9)
+    planner = Planner()
+    planner.signals(bars, strategies)
+    store = SQLiteStore(str(tmp_path / "bot.db"))
+    assert planner.save(store)
+    assert store.handler_states("planner") == {}
+    store.flush()
+    loaded = Planner().load(SQLiteStore(str(tmp_path / "bot.db")))
+    assert loaded.costs == planner.costs
+    assert loaded.nodes == planner.nodes
+    for strategy in strategies.values():
+        assert loaded.explain(strategy) == planner.explain(strategy)
+
+def test_load_without_saved_statistics_keeps_priors():
+    from storage import MemoryStore
+
+    assert Planner().load(MemoryStore()).nodes == {}
+
+def test_saves_only_when_the_statistics_change(bars):
+    from storage import MemoryStore
+
+    strategies = random_strategies(10, seed=4)
+    planner, store = Planner(), MemoryStore()
+    planner.signals(bars, strategies)
+    assert planner.save(store)
+    assert not planner.save(store)
+    planner.signals(bars, strategies)
+    assert planner.save(store)
+    assert not Planner().load(store).save(store)
+
+def test_prune_keeps_only_live_conditions(bars):
+    from engine import compile_strategy
+
+    strategies = random_strategies(20, seed=6)
+    planner = Planner()
+    planner.signals(bars, strategies)
+    live = dict(list(strategies.items())[:5])
+    conditions = {cond for strategy in live.values() for cond in compile_strategy(strategy).conditions}
+    kept = {cond: stats for cond, stats in planner.nodes.items() if cond in conditions}
+    before = len(planner.nodes)
+    assert planner.prune(live) == before - len(kept) > 0
+    assert planner.nodes == kept
+    keys = {key for cond in conditions for key in ((cond.lhs, cond.rhs) if cond.kind == "indicator" else (cond.lhs,))}
+    assert set(planner.costs) <= keys
+    planner.prune({})
+    assert planner.nodes == {} and planner.costs == {}
+
+def test_concurrent_updates_are_not_lost(bars):
+    strategies = random_strategies(10, seed=8)
+    planner = Planner()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: planner.signals(bars, strategies), range(16)))
+    assert sum(evaluations for evaluations, _ in planner.nodes.values()) == planner.counts["conditions"]
+
+def test_scheduler_saves_on_its_timer_not_per_candle(bars, monkeypatch):
+    import scheduler as scheduler_module
+    from storage import MemoryStore
+
+    async def send(chat_id, text, dedupe_key=None):
+        pass
+
+    store = MemoryStore()
+    monkeypatch.setattr(scheduler_module, "get_store", lambda: store)
+    strategies = {user_id: dict(s, symbol="EURUSD", timeframe="1h") for user_id, s in random_strategies(10, seed=2).items()}
+    scheduler = SignalScheduler(
+        send, strategy_source=lambda tf: strategies if tf == "1h" else {},
+        market_data=FramesMarket(bars), cache=IndicatorCache(), planner=Planner(),
+    )
+    scheduler.market_data.refresh = lambda symbols, timeframe: None
+    asyncio.run(scheduler.on_candle_close("1h", bars.index[-1] + pd.Timedelta(hours=1)))
+    assert store.get_stats("planner") is None
+    assert scheduler.save_planner()
+    assert not scheduler.save_planner()
+    assert Planner().load(store).nodes == scheduler.planner.nodes
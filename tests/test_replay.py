@@ -0,0 +1,21 @@
+import json
+
+import replay
+
+def test_replay_drives_the_scheduler(tmp_path, monkeypatch):
+    submitted = []
+    submit = replay.SignalScheduler.submit_group
+    monkeypatch.setattr(
+        replay.SignalScheduler, "submit_group",
+        lambda self, *args: submitted.append(args[:2]) or submit(self, *args),
+    )
+    output = tmp_path / "replay.json"
+    args = ["--users", "30", "--symbols", "2", "--timeframes", "1m,5m", "--duration", "900", "--output", str(output)]
+    assert replay.main(args) == 0
+    report = json.loads(output.read_text())
+    assert submitted and {tf for _, tf in submitted} == {"1m", "5m"}
+    signals = report["signals"]
+    assert signals["fired"] > 0
+    assert signals["fired"] == signals["enqueued"] == signals["delivered_signals"] == signals["journaled"]
+    assert report["replay"]["dropped_groups"] == 0
+    assert report["replay"]["indicator_cache"]["misses"] > 0
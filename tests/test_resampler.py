@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from resampler import Resampler
+from ring_buffer import LiveBars
+
+TIMEFRAMES = ["5m", "1h", "4h", "1d"]
+RULES = {"5m": "5min", "1h": "1h", "4h": "4h", "1d": "1D"}
+
+@pytest.fixture(scope="module")
+def ticks():
+    rng = np.random.default_rng(5)
+    start = pd.Timestamp("2024-01-01", tz="UTC").value
+    # Irregular ticks over four days: seconds apart, with a few multi-hour gaps.
+    steps = rng.exponential(20.0, 20_000)
+    steps[rng.choice(len(steps), 6, replace=False)] += rng.uniform(3600, 6 * 3600, 6)
+    ts = start + (np.cumsum(steps) * 1e9).astype(np.int64)
+    ts = ts[ts < start + 4 * 86_400 * 10**9]
+    return pd.DataFrame(
+        {"price": 1.1 + np.cumsum(rng.normal(0, 1e-4, len(ts))), "volume": rng.integers(1, 50, len(ts)).astype(float)},
+        index=pd.DatetimeIndex(ts, tz="UTC"),
+    )
+
+@pytest.fixture(scope="module")
+def live(ticks):
+    live = LiveBars(capacity=8192)
+    resampler = Resampler(TIMEFRAMES, live=live)
+    ts = ticks.index.asi8
+    for t, price, volume in zip(ts, ticks["price"].to_numpy(), ticks["volume"].to_numpy()):
+        resampler.on_tick("EURUSD", int(t), float(price), float(volume))
+    resampler.flush(int(ts[-1]))
+    return live
+
+@pytest.mark.parametrize("timeframe", TIMEFRAMES)
+def test_matches_pandas_resample(ticks, live, timeframe):
+    expected = (
+        ticks.resample(RULES[timeframe])
+        .agg({"price": ["first", "max", "min", "last"], "volume": "sum"})
+        .dropna()
+    )
+    expected.columns = ["Open", "High", "Low", "Close", "Volume"]
+    got = live.get("EURUSD", timeframe).to_frame()
+    pd.testing.assert_index_equal(got.index.as_unit("ns"), expected.index.as_unit("ns"), exact=False)
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=0, atol=1e-12)
+
+def test_gaps_leave_no_empty_candles(ticks, live):
+    hours = live.get("EURUSD", "1h").to_frame()
+    assert len(hours) < 4 * 24
+    assert hours["Volume"].gt(0).all()
@@ -0,0 +1,53 @@
+import pytest
+
+from app import create_app
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("API_TOKEN", "secret")
+    return create_app().test_client()
+
+@pytest.mark.parametrize("path", ["/backtest", "/scan"])
+def test_stored_strategy_needs_token(client, path):
+    assert client.post(path, json={"user_id": 42}).status_code == 404
+    assert client.post(f"{path}?token=wrong", json={"user_id": 42}).status_code == 404
+    # With the token the lookup runs; user 42 has no strategy.
+    response = client.post(f"{path}?token=secret", json={"user_id": 42})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "No strategy conditions given"
+
+def test_inline_strategy_needs_no_token(client):
+    response = client.post("/backtest", json={"strategy": {"conditions": []}})
+    assert response.status_code == 400
+
+def test_history_needs_token_and_user(client, monkeypatch, tmp_path):
+    import journal
+
+    monkeypatch.setattr(journal, "_journals", {False: journal.SignalJournal(str(tmp_path), writable=False)})
+    assert client.get("/history?user_id=42").status_code == 404
+    assert client.get("/history?user_id=42&token=wrong").status_code == 404
+    assert client.get("/history?token=secret").status_code == 400
+    response = client.get("/history?user_id=42&token=secret")
+    assert response.status_code == 200
+    assert response.get_json()["signals"] == []
+
+@pytest.mark.parametrize("user_id", ["abc", None, [1], {"id": 1}])
+def test_bad_user_id_is_a_400(client, user_id):
+    response = client.post("/backtest?token=secret", json={"user_id": user_id})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "user_id must be an integer"
+
+def test_scan_symbols_stay_inside_the_universe(client, monkeypatch):
+    import scanner
+
+    scans = []
+    monkeypatch.setenv("SCAN_SYMBOLS", "EURUSD,GBPUSD")
+    monkeypatch.setattr(scanner, "run_scan", lambda strategy, timeframe, symbols=None, **kw: scans.append(symbols) or {})
+    strategy = {"conditions": [{"indicator": "RSI", "operator": "<", "compare_to": {"value": 30}}]}
+    response = client.post("/scan", json={"strategy": strategy, "symbols": ["EURUSD", "AAPL", "TSLA"]})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Not in the scan universe: AAPL, TSLA"
+    assert client.post("/scan", json={"strategy": strategy, "symbols": "EURUSD"}).status_code == 400
+    assert client.post("/scan", json={"strategy": strategy, "symbols": [" gbpusd"]}).status_code == 200
+    assert client.post("/scan", json={"strategy": strategy}).status_code == 200
+    assert scans == [["GBPUSD"], None]
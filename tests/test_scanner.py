@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import INDICATORS, compute_indicator
+from market_data import synthetic_bars
+from scanner import Panel, compute_panel, scan
+
+@pytest.fixture(scope="module")
+def frames():
+    index = pd.date_range("2024-01-01", periods=500, freq="1h", tz="UTC")
+    frames = {f"S{i}": synthetic_bars(index, seed=i) for i in range(4)}
+    # A young symbol with a fifth of the history, and one too short to scan.
+    frames["YOUNG"] = synthetic_bars(index[-100:], seed=10)
+    frames["TINY"] = synthetic_bars(index[-20:], seed=11)
+    return frames
+
+def test_short_history_is_padded_not_cut(frames):
+    panel, skipped = Panel.from_frames(frames)
+    assert skipped == ["TINY"]
+    assert panel.length == 500
+    row = panel.symbols.index("YOUNG")
+    assert np.isnan(panel["Close"][row, :400]).all()
+    np.testing.assert_array_equal(panel["Close"][row, 400:], frames["YOUNG"]["Close"].to_numpy())
+
+@pytest.mark.parametrize("indicator", list(INDICATORS))
+@pytest.mark.parametrize("params", [{}, {"source": "HL2"}])
+def test_panel_matches_per_symbol(frames, indicator, params):
+    if "source" in params and "source" not in INDICATORS[indicator]["params"]:
+        pytest.skip("indicator has no source")
+    panel, _ = Panel.from_frames(frames)
+    values = compute_panel(panel, indicator, params)
+    for row, symbol in enumerate(panel.symbols):
+        expected = compute_indicator(frames[symbol], indicator, params)
+        np.testing.assert_allclose(values[row, -len(expected):], expected, rtol=1e-12, atol=1e-9, equal_nan=True)
+
+def test_scan_ranks_matches(frames):
+    panel, _ = Panel.from_frames(frames)
+    strategy = {"logic": "AND", "conditions": [{"indicator": "RSI", "params": {}, "operator": ">", "compare_to": {"value": 0}}]}
+    result = scan(panel, strategy)
+    assert result["scanned"] == len(panel)
+    assert {m["symbol"] for m in result["matches"]} == set(panel.symbols)
+    scores = [m["score"] for m in result["matches"]]
+    assert scores == sorted(scores, reverse=True)
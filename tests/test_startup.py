@@ -0,0 +1,26 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imports tg_bot and builds its dispatcher, as a worker does before the first update.
+SCRIPT = """
+import sys
+try:
+    import tg_bot
+except ImportError:
+    sys.exit(3)
+from telegram import Bot
+tg_bot.build_dispatcher(Bot("123:STARTUP"), workers=0)
+print(",".join(m for m in ("pandas", "numpy", "ta") if m in sys.modules))
+"""
+
+def test_tg_bot_startup_skips_scientific_imports():
+    env = dict(os.environ, STRATEGY_STORE="memory")
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode == 3:
+        pytest.skip("tg_bot needs python-telegram-bot v13")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
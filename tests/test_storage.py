@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from storage import MemoryStore, SQLiteStore
+
+STRATEGY = {"logic": "AND", "conditions": [{"indicator": "RSI"}], "symbol": "EURUSD", "timeframe": "1h"}
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "bot.db")
+
+def test_writes_are_read_back_before_the_flush(db):
+    store = SQLiteStore(db, flush_interval=60)
+    store.save_strategy(1, STRATEGY)
+    store.save_handler_state("conv", (1, 1), 2)
+    store.save_stats("planner", {"costs": []})
+    assert store.get_strategy(1) == STRATEGY
+    assert store.strategies_for(timeframe="1h") == {1: STRATEGY}
+    assert store.get_handler_state("conv", (1, 1)) == 2
+    assert store.get_stats("planner") == {"costs": []}
+    # Nothing reached the file yet: another connection still sees an empty DB.
+    other = SQLiteStore(db, flush_interval=60)
+    assert other.get_strategy(1) is None and other.handler_states("conv") == {}
+
+def test_flush_and_deletes_reach_other_connections(db):
+    store = SQLiteStore(db, flush_interval=60)
+    store.save_strategy(1, STRATEGY)
+    store.save_strategy(2, dict(STRATEGY, timeframe="4h"))
+    store.save_handler_state("conv", (2, 2), 1)
+    store.flush()
+    store.delete_strategy(2)
+    store.delete_handler_state("conv", (2, 2))
+    assert store.strategies_for() == {1: STRATEGY}
+    assert store.get_handler_state("conv", (2, 2)) is None
+    other = SQLiteStore(db, flush_interval=60)
+    assert set(other.strategies_for()) == {1, 2}
+    store.flush()
+    assert other.strategies_for() == {1: STRATEGY}
+    assert other.handler_states("conv") == {}
+
+def test_close_flushes_pending_writes(db):
+    store = SQLiteStore(db, flush_interval=60)
+    store.save_conversation(7, {"step": "operator"})
+    store.save_stats("planner", {"nodes": []})
+    store.close()
+    reopened = SQLiteStore(db)
+    assert reopened.get_conversation(7) == {"step": "operator"}
+    assert reopened.user_ids("conversation") == [7]
+    assert reopened.get_stats("planner") == {"nodes": []}
+
+def test_batch_size_and_interval_trigger_a_flush(db):
+    store = SQLiteStore(db, flush_interval=60, batch_size=3)
+    other = SQLiteStore(db, flush_interval=60)
+    store.save_strategy(1, STRATEGY)
+    store.save_strategy(2, STRATEGY)
+    assert other.strategies_for() == {}
+    store.save_strategy(3, STRATEGY)
+    assert set(other.strategies_for()) == {1, 2, 3}
+
+    timed = SQLiteStore(db, flush_interval=0.01)
+    timed.save_strategy(4, STRATEGY)
+    deadline = time.monotonic() + 5
+    while 4 not in other.strategies_for():
+        assert time.monotonic() < deadline, "the flusher thread never wrote"
+        time.sleep(0.01)
+
+def test_memory_store_matches():
+    store = MemoryStore()
+    store.save_strategy(1, STRATEGY)
+    store.save_handler_state("conv", (1, 1), 3)
+    store.save_stats("planner", {"costs": []})
+    assert store.strategies_for(symbol="EURUSD") == {1: STRATEGY}
+    assert store.handler_states("conv") == {(1, 1): 3}
+    assert store.get_stats("planner") == {"costs": []}
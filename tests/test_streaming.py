@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicators import INDICATORS, compute_indicator
+from market_data import synthetic_bars
+from streaming import make_stream
+
+def _cases():
+    for indicator, spec in INDICATORS.items():
+        sources = ["Close", "HL2"] if "source" in spec["params"] else [None]
+        for source in sources:
+            yield indicator, source
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_bars(pd.date_range("2024-01-01", periods=500, freq="1h", tz="UTC"), seed=3)
+
+@pytest.mark.parametrize("indicator,source", list(_cases()))
+def test_stream_matches_batch(bars, indicator, source):
+    params = {"source": source} if source else {}
+    streamed = make_stream(indicator, params).warm_up(bars)
+    batch = np.asarray(compute_indicator(bars, indicator, params), dtype=float)
+    assert streamed.shape == batch.shape
+    assert np.allclose(streamed, batch, rtol=1e-9, atol=1e-12, equal_nan=True)
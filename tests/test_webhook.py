@@ -0,0 +1,125 @@
+import socket
+import asyncio
+
+import aiohttp
+import pytest
+
+try:
+    import bot
+except ImportError as e:  # bot.py needs python-telegram-bot v20+
+    pytest.skip(f"bot.py not importable: {e}", allow_module_level=True)
+
+from fake_telegram import FakeBotApi, FakeTelegramClient, message_update
+from http_client import get_http
+from webhook import WEBHOOK_PATH, run_webhook
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def _wait_for(predicate, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+async def _drive():
+    api = FakeBotApi()
+    http = get_http()
+    http.api_url = await api.start()
+    app = bot.build_application("123:TEST", "https://example.org/form-test")
+    notifier = app.bot_data["notifier"]
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = asyncio.create_task(run_webhook(app, host="127.0.0.1", port=port))
+    results = {}
+    try:
+        async with aiohttp.ClientSession() as session:
+            async def up():
+                try:
+                    async with session.get(f"{base}/healthz") as response:
+                        return response.status == 200
+                except aiohttp.ClientError:
+                    return False
+
+            await _wait_for(up)
+            notifier.start()
+            async with FakeTelegramClient(base + WEBHOOK_PATH) as client:
+                results["webhook"] = await client.post(message_update(7, "/start"))
+
+            async def replied():
+                return api.count("sendMessage") >= 1
+
+            await _wait_for(replied)
+            results["reply"] = [p for m, p in api.calls if m == "sendMessage"][0]
+            # Blueprint routes are served through the Flask bridge.
+            async with session.post(f"{base}/backtest", json={"strategy": {"conditions": []}}) as response:
+                results["backtest"] = (response.status, await response.json())
+            async with session.get(f"{base}/metrics") as response:
+                results["metrics"] = response.status
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+        await notifier.stop(drain_timeout=0)
+        await api.stop()
+        await http.close()
+    return results
+
+def test_fake_client_drives_webhook():
+    results = asyncio.run(_drive())
+    assert results["webhook"] == 200
+    assert int(results["reply"]["chat_id"]) == 7
+    assert results["reply"]["text"] == "Click to open Mini App:"
+    assert results["backtest"] == (400, {"status": "error", "message": "No strategy conditions given"})
+    assert results["metrics"] == 200
+
+class StubApplication:
+    def __init__(self):
+        self.update_queue = asyncio.Queue()
+        self.bot = None
+        self.bot_data = {}
+
+async def _post_updates(secret_token, requests):
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from webhook import SECRET_HEADER, create_web_app
+
+    application = StubApplication()
+    statuses = []
+    async with TestClient(TestServer(create_web_app(application, secret_token=secret_token))) as client:
+        for secret, body in requests:
+            headers = {SECRET_HEADER: secret} if secret is not None else {}
+            response = await client.post(WEBHOOK_PATH, data=body, headers=headers)
+            statuses.append(response.status)
+    return statuses, application.update_queue.qsize()
+
+def test_webhook_checks_secret_and_body():
+    update = '{"update_id": 1, "message": {"message_id": 1, "date": 0, "chat": {"id": 7, "type": "private"}, "text": "hi"}}'
+    statuses, queued = asyncio.run(_post_updates("s3cret", [
+        (None, update),
+        ("wrong", update),
+        ("s3cret", "not json"),
+        ("s3cret", "[1, 2]"),
+        ("s3cret", '{"hello": "world"}'),
+        ("s3cret", update),
+    ]))
+    assert statuses == [403, 403, 400, 400, 400, 200]
+    assert queued == 1
+
+def test_public_webhook_needs_shared_secret(monkeypatch):
+    monkeypatch.delenv("WEBHOOK_SECRET", raising=False)
+    with pytest.raises(RuntimeError, match="WEBHOOK_SECRET"):
+        asyncio.run(run_webhook(StubApplication(), public_url="https://example.org"))
+
+def test_submit_goes_through_flask():
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from webhook import create_web_app
+
+    async def post():
+        async with TestClient(TestServer(create_web_app(StubApplication()))) as client:
+            response = await client.post("/submit", data={"symbol": "EURUSD"})
+            return response.status, await response.json()
+
+    assert asyncio.run(post()) == (200, {"status": "success", "data": {"symbol": "EURUSD"}})
@@ -0,0 +1,75 @@
+import asyncio
+from multiprocessing import shared_memory
+
+import pandas as pd
+import pytest
+
+import workers
+from bench import random_strategies
+from engine import last_signals
+from indicator_cache import IndicatorCache
+from market_data import synthetic_bars
+from planner import Planner
+from scheduler import PLANNER_MAX_GROUP, SignalScheduler
+from workers import WorkerPool
+
+class FramesMarket:
+    def __init__(self, bars):
+        self.frame = bars
+
+    def bars(self, symbol, timeframe, limit=None):
+        return self.frame.iloc[-limit:] if limit else self.frame
+
+class RecordingSharedMemory(shared_memory.SharedMemory):
+    created = []
+
+    def __init__(self, name=None, create=False, size=0):
+        super().__init__(name=name, create=create, size=size)
+        if create:
+            self.created.append(self.name)
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = WorkerPool(workers=2)
+    yield pool
+    pool.drain()
+
+def test_large_groups_run_in_the_pool_and_release_shared_memory(pool, monkeypatch):
+    monkeypatch.setattr(workers.shared_memory, "SharedMemory", RecordingSharedMemory)
+    RecordingSharedMemory.created.clear()
+    sent = []
+
+    async def send(chat_id, text, dedupe_key=None):
+        sent.append(chat_id)
+
+    bars = synthetic_bars(pd.date_range("2024-01-01", periods=400, freq="1h", tz="UTC"), seed=21)
+    strategies = random_strategies(4 * PLANNER_MAX_GROUP, seed=21)
+    scheduler = SignalScheduler(send, market_data=FramesMarket(bars), cache=IndicatorCache(), pool=pool, planner=Planner())
+    assert not scheduler.uses_planner(strategies)
+    scheduler.pending = 2
+    now = bars.index[-1] + pd.Timedelta(hours=1)
+    items = list(strategies.items())
+    halves = [dict(items[:2 * PLANNER_MAX_GROUP]), dict(items[2 * PLANNER_MAX_GROUP:])]
+
+    async def run():
+        return await asyncio.gather(*[scheduler._run_group("EURUSD", "1h", group, now) for group in halves])
+
+    counts = asyncio.run(run())
+    expected = sorted(last_signals(bars, strategies))
+    assert sorted(sent) == expected and sum(counts) == len(expected) > 0
+    assert len(RecordingSharedMemory.created) == 2
+    assert pool._inflight == {}
+    for name in RecordingSharedMemory.created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+def test_drain_refuses_new_work_and_frees_blocks():
+    pool = WorkerPool(workers=1)
+    bars = synthetic_bars(pd.date_range("2024-01-01", periods=200, freq="1h", tz="UTC"), seed=2)
+    strategies = random_strategies(2 * PLANNER_MAX_GROUP, seed=2)
+    future = pool.submit(bars, strategies)
+    pool.drain()
+    assert sorted(future.result()) == sorted(last_signals(bars, strategies))
+    assert pool._inflight == {}
+    with pytest.raises(RuntimeError):
+        pool.submit(bars, strategies)
@@ -1,30 +1,49 @@
+import startup
+
+startup.enable_from_env()
+
 import os
+import copy
+import time
 import logging
 import json
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import signal
+import functools
+import multiprocessing
+from queue import Queue
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import NetworkError
 from telegram.ext import (
     Updater,
+    Dispatcher,
     CommandHandler,
     CallbackQueryHandler,
     ConversationHandler,
     CallbackContext,
     MessageHandler,
-    filters,
+    Filters,
 )
-import yfinance as yf
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.trend import EMAIndicator, SMAIndicator, MACD
-from ta.volatility import BollingerBands, AverageTrueRange
-from ta.volume import OnBalanceVolumeIndicator
-
-from telegram.ext import Filters
-from telegram.ext import MessageHandler, Filters
+# Only the registry is imported here; numpy, pandas, engine, market data, backtest and ta
+# load on the first command that evaluates indicators.
+from indicator_registry import INDICATORS, OPERATORS
+from storage import StoredMapping, get_store
+from persistence import StorePersistence
+from metrics import HANDLER_SECONDS, timed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ========== CONFIG ==========
 BOT_TOKEN = os.getenv("TG_BOT_TOKEN1") or "YOUR_BOT_TOKEN"  # Prefer env var
+BASE_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/") + "/bot"
+DEFAULT_SYMBOL = "EURUSD"
+DEFAULT_TIMEFRAME = "1h"
+# More than one worker: this process polls and routes each user's updates to a worker
+# process; conversation state lives in the shared store so any worker can pick it up.
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+DISPATCHER_THREADS = 4
+POLL_TIMEOUT = 30
+CONVERSATION_NAME = "strategy_builder"
 
 # ========== STATES ==========
 (
@@ -37,61 +56,23 @@ BOT_TOKEN = os.getenv("TG_BOT_TOKEN1") or "YOUR_BOT_TOKEN"  # Prefer env var
     SET_COMPARE_TO_PARAMS,
     CONFIRM_CONDITION,
 ) = range(8)
-
-# ========== GLOBALS ==========
-strategies = {}
-user_data = {}
-
-# ========== Indicator Registry ==========
-INDICATORS = {
-    "RSI": {
-        "class": RSIIndicator,
-        "params": {"period": (int, 14, None), "source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"])},
-    },
-    "EMA": {
-        "class": EMAIndicator,
-        "params": {"period": (int, 20, None), "source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"])},
-    },
-    "SMA": {
-        "class": SMAIndicator,
-        "params": {"period": (int, 50, None), "source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"])},
-    },
-    "MACD": {
-        "class": MACD,
-        "params": {
-            "fast": (int, 12, None),
-            "slow": (int, 26, None),
-            "signal": (int, 9, None),
-            "source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"]),
-        },
-    },
-    "Stochastic": {
-        "class": StochasticOscillator,
-        "params": {
-            "k_period": (int, 14, None),
-            "d_period": (int, 3, None),
-            "source": (str, "High", ["Close", "Open", "High", "Low", "HL2"]),
-        },
-    },
-    "BollingerBands": {
-        "class": BollingerBands,
-        "params": {
-            "period": (int, 20, None),
-            "stddev": (float, 2, None),
-            "source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"]),
-        },
-    },
-    "ATR": {
-        "class": AverageTrueRange,
-        "params": {"period": (int, 14, None)},
-    },
-    "OBV": {
-        "class": OnBalanceVolumeIndicator,
-        "params": {"source": (str, "Close", ["Close", "Open", "High", "Low", "HL2"])},
-    },
+# Label for each state in the handler latency histogram.
+STATE_NAMES = {
+    SELECT_INDICATOR: "select_indicator",
+    SET_PARAMS: "set_params",
+    SET_OPERATOR: "set_operator",
+    SET_COMPARE_TO_TYPE: "set_compare_to_type",
+    SET_COMPARE_TO_VALUE: "set_compare_to_value",
+    SET_COMPARE_TO_INDICATOR: "set_compare_to_indicator",
+    SET_COMPARE_TO_PARAMS: "set_compare_to_params",
+    CONFIRM_CONDITION: "confirm_condition",
 }
 
-OPERATORS = ["<", ">", "==", "cross_above", "cross_below", "in_zone"]
+# ========== GLOBALS ==========
+# Backed by the strategy store so strategies and half-built conditions survive restarts.
+store = get_store()
+strategies = StoredMapping(store, "strategy")
+user_data = StoredMapping(store, "conversation")
 
 # ========== HELPERS ==========
 
@@ -112,19 +93,53 @@ def build_yes_no_keyboard():
     return InlineKeyboardMarkup(buttons)
 
 def get_user_strategy(user_id):
-    return strategies.setdefault(user_id, {"logic": "AND", "conditions": []})
+    return strategies.setdefault(
+        user_id, {"logic": "AND", "conditions": [], "symbol": DEFAULT_SYMBOL, "timeframe": DEFAULT_TIMEFRAME}
+    )
+
+def read_user_strategy(user_id):
+    """A snapshot of the stored strategy, for read-only commands.
+
+    Goes straight to the store: run_async commands must not forget() the cached objects a
+    conversation handler for the same user may be editing at that moment.
+    """
+    strategy = store.get_strategy(user_id)
+    if strategy is None:
+        return {"logic": "AND", "conditions": [], "symbol": DEFAULT_SYMBOL, "timeframe": DEFAULT_TIMEFRAME}
+    return copy.deepcopy(strategy)
+
+def persisted(handler):
+    """Re-read the acting user's strategy and conversation state, then write them back after the handler.
+
+    The re-read lets any worker continue a conversation that another worker started.
+    """
+    @functools.wraps(handler)
+    def wrapper(update: Update, context: CallbackContext):
+        user_id = update.effective_user.id if update.effective_user else None
+        if user_id is not None:
+            user_data.forget(user_id)
+            strategies.forget(user_id)
+        try:
+            return handler(update, context)
+        finally:
+            if user_id is not None:
+                user_data.save(user_id)
+                strategies.save(user_id)
+    return wrapper
 
 # ========== CONVERSATION HANDLERS ==========
 
 def start(update: Update, context: CallbackContext):
     update.message.reply_text("Welcome! Use /newstrategy to create a new trading strategy.")
 
+@persisted
 def new_strategy(update: Update, context: CallbackContext):
     user_id = update.message.from_user.id
     user_data[user_id] = {}
     update.message.reply_text("Choose indicator for your first condition:", reply_markup=build_indicator_keyboard())
     return SELECT_INDICATOR
 
+@persisted
 def select_indicator(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -154,6 +169,7 @@ def ask_param(update: Update, context: CallbackContext):
         update.callback_query.edit_message_text(prompt)
     return SET_PARAMS
 
+@persisted
 def set_param(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -181,6 +197,7 @@ def set_param(update: Update, context: CallbackContext):
         query.message.reply_text("Choose operator:", reply_markup=build_operator_keyboard())
         return SET_OPERATOR
 
+@persisted
 def set_operator(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -206,6 +223,7 @@ def set_operator(update: Update, context: CallbackContext):
         )
         return SET_COMPARE_TO_TYPE
 
+@persisted
 def set_compare_to_type(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -219,6 +237,7 @@ def set_compare_to_type(update: Update, context: CallbackContext):
         query.message.reply_text("Select compare-to indicator:", reply_markup=build_indicator_keyboard())
         return SET_COMPARE_TO_INDICATOR
 
+@persisted
 def set_compare_to_value(update: Update, context: CallbackContext):
     user_id = update.message.from_user.id
     text = update.message.text.strip()
@@ -238,6 +257,7 @@ def set_compare_to_value(update: Update, context: CallbackContext):
     user_data.pop(user_id, None)
     return ConversationHandler.END
 
+@persisted
 def set_compare_to_indicator(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -272,6 +292,7 @@ def ask_compare_param(update: Update, context: CallbackContext):
         update.callback_query.edit_message_text(prompt)
     return SET_COMPARE_TO_PARAMS
 
+@persisted
 def set_compare_param(update: Update, context: CallbackContext):
     query = update.callback_query
     query.answer()
@@ -304,26 +325,11 @@ def set_compare_param(update: Update, context: CallbackContext):
         return ConversationHandler.END
 
 def build_condition_summary(user_id):
-    d = user_data[user_id]
-    ind = d["indicator"]
-    params = d.get("params", {})
-    op = d.get("operator", "?")
-    comp = d.get("compare_to")
-    pstr = ", ".join(f"{k}={v}" for k, v in params.items())
-    cond = f"{ind}({pstr}) {op} "
-    if comp is None:
-        cond += "???"
-    elif "value" in comp:
-        cond += str(comp["value"])
-    elif "indicator" in comp:
-        cind = comp["indicator"]
-        cparams = comp.get("params", {})
-        cstr = ", ".join(f"{k}={v}" for k, v in cparams.items())
-        cond += f"{cind}({cstr})"
-    else:
-        cond += "???"
-    return cond
+    from engine import describe_condition
+
+    return describe_condition(user_data[user_id])
 
+@persisted
 def done(update: Update, context: CallbackContext):
     user_id = update.message.from_user.id
     strat = get_user_strategy(user_id)
@@ -335,6 +341,114 @@ def done(update: Update, context: CallbackContext):
         text += f"{i}. {json.dumps(cond)}\n"
     update.message.reply_text(text)
 
+@persisted
+def watch(update: Update, context: CallbackContext):
+    from market_data import TIMEFRAME_SECONDS
+
+    user_id = update.message.from_user.id
+    strat = get_user_strategy(user_id)
+    if not context.args:
+        update.message.reply_text(
+            f"Watching {strat['symbol']} on {strat['timeframe']}.\n"
+            f"Usage: /watch EURUSD 1h (timeframes: {', '.join(TIMEFRAME_SECONDS)})"
+        )
+        return
+    symbol = context.args[0].upper()
+    timeframe = context.args[1] if len(context.args) > 1 else strat["timeframe"]
+    if timeframe not in TIMEFRAME_SECONDS:
+        update.message.reply_text(f"Unknown timeframe '{timeframe}'. Use one of: {', '.join(TIMEFRAME_SECONDS)}")
+        return
+    strat["symbol"] = symbol
+    strat["timeframe"] = timeframe
+    update.message.reply_text(f"Signals for your strategy will be checked on {symbol} {timeframe} candle closes.")
+
+def backtest_command(update: Update, context: CallbackContext):
+    user_id = update.message.from_user.id
+    strat = read_user_strategy(user_id)
+    if not strat["conditions"]:
+        update.message.reply_text("No conditions defined yet. Use /newstrategy to add.")
+        return
+    symbol, timeframe = strat["symbol"], strat["timeframe"]
+    update.message.reply_text(f"Running backtest on {symbol} {timeframe}...")
+    try:
+        from backtest import backtest, format_backtest
+        from market_data import get_market_data
+
+
+        market = get_market_data()
+        market.refresh([symbol], timeframe)
+        bars = market.bars(symbol, timeframe)
+        if bars.empty:
+            update.message.reply_text(f"No data available for {symbol} {timeframe}.")
+            return
+        result = backtest(bars, strat, timeframe=timeframe)
+    except Exception as e:
+        logger.error(f"[backtest] Failed for {user_id}: {e}")
+        update.message.reply_text("❌ Backtest failed.")
+        return
+    update.message.reply_text(format_backtest(symbol, timeframe, result))
+
+def scan_command(update: Update, context: CallbackContext):
+    user_id = update.message.from_user.id
+    strat = read_user_strategy(user_id)
+    if not strat["conditions"]:
+        update.message.reply_text("No conditions defined yet. Use /newstrategy to add.")
+        return
+    timeframe = context.args[0] if context.args else strat["timeframe"]
+    try:
+        from market_data import TIMEFRAME_SECONDS
+        from scanner import format_scan, run_scan
+
+        if timeframe not in TIMEFRAME_SECONDS:
+            update.message.reply_text(f"Unknown timeframe '{timeframe}'. Use one of: {', '.join(TIMEFRAME_SECONDS)}")
+            return
+        update.message.reply_text(f"Scanning the universe on {timeframe}...")
+        result = run_scan(strat, timeframe)
+    except Exception as e:
+        logger.error(f"[scan] Failed for {user_id}: {e}")
+        update.message.reply_text("❌ Scan failed.")
+        return
+    update.message.reply_text(format_scan(result))
+
+def history(update: Update, context: CallbackContext):
+    from datetime import datetime, timezone
+
+    from journal import get_journal
+
+    user_id = update.message.from_user.id
+    args = list(context.args or [])
+    before = int(args.pop()) if args and args[-1].isdigit() else None
+    symbol = args[0].upper() if args else None
+    rows, cursor = get_journal().history(user=user_id, symbol=symbol, before=before)
+    if not rows:
+        update.message.reply_text("No signals recorded yet." if before is None else "No older signals.")
+        return
+    lines = ["🗂 Your signals" + (f" on {symbol}" if symbol else "") + ":"]
+    for row in rows:
+        when = datetime.fromtimestamp(row["ts"] / 1e9, tz=timezone.utc).strftime("%Y-%m-%d %H:%M")
+        lines.append(f"• {when} {row['symbol']} @ {row['value']:.5g} — {row['condition']}")
+    if cursor is not None:
+        lines.append(f"Older: /history {symbol + ' ' if symbol else ''}{cursor}")
+    update.message.reply_text("\n".join(lines))
+
+@persisted
+def explain(update: Update, context: CallbackContext):
+    from planner import Planner
+
+    user_id = update.message.from_user.id
+    strat = get_user_strategy(user_id)
+    if not strat["conditions"]:
+        update.message.reply_text("No conditions defined yet. Use /newstrategy to add.")
+        return
+    try:
+        # Candles are evaluated in bot.py's process; read the statistics its scheduler saved.
+        text = Planner().load(store).explain(strat)
+    except (KeyError, ValueError) as e:
+        update.message.reply_text(f"❌ Cannot plan this strategy: {e}")
+        return
+    update.message.reply_text(text)
+
+@persisted
 def cancel(update: Update, context: CallbackContext):
     update.message.reply_text("Strategy building canceled.")
     user_id = update.message.from_user.id
@@ -343,10 +457,12 @@ def cancel(update: Update, context: CallbackContext):
 
 # ========== MAIN ==========
 
-def main():
-    updater = Updater(BOT_TOKEN, use_context=True)
-    dp = updater.dispatcher
+def timed_handler(handler, state):
+    """Record `handler`'s callback latency under `state` in the handler histogram."""
+    handler.callback = timed(HANDLER_SECONDS, state=state)(handler.callback)
+    return handler
 
+def build_conversation_handler():
     conv_handler = ConversationHandler(
         entry_points=[CommandHandler("newstrategy", new_strategy)],
         states={
@@ -360,14 +476,103 @@ def main():
         },
         fallbacks=[CommandHandler("cancel", cancel)],
         allow_reentry=True,
+        name=CONVERSATION_NAME,
+        persistent=True,
     )
+    for handler in conv_handler.entry_points + conv_handler.fallbacks:
+        timed_handler(handler, handler.command[0])
+    for state, handlers in conv_handler.states.items():
+        for handler in handlers:
+            timed_handler(handler, STATE_NAMES[state])
+    return conv_handler
+
+def register_handlers(dp):
+    dp.add_handler(timed_handler(CommandHandler("start", start), "start"))
+    dp.add_handler(timed_handler(CommandHandler("done", done), "done"))
+    dp.add_handler(timed_handler(CommandHandler("watch", watch), "watch"))
+    dp.add_handler(timed_handler(CommandHandler("explain", explain), "explain"))
+    dp.add_handler(timed_handler(CommandHandler("history", history), "history"))
+    dp.add_handler(timed_handler(CommandHandler("backtest", backtest_command, run_async=True), "backtest"))
+    dp.add_handler(timed_handler(CommandHandler("scan", scan_command, run_async=True), "scan"))
+    dp.add_handler(build_conversation_handler())
+    dp.add_handler(timed_handler(CommandHandler("cancel", cancel), "cancel"))
+
+def build_dispatcher(bot, workers=DISPATCHER_THREADS):
+    """Dispatcher for one worker process, with conversation states in the shared store."""
+    dp = Dispatcher(bot, Queue(), workers=workers, use_context=True, persistence=StorePersistence(store))
+    register_handlers(dp)
+    return dp
+
+def shard_worker(token, updates):
+    """Worker process: handle the updates routed to it until None arrives."""
+    # Ctrl+C and SIGTERM go to the poller, which drains the queues and sends None.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    bot = Bot(token, base_url=BASE_URL)
+    dp = build_dispatcher(bot)
+    while True:
+        payload = updates.get()
+        if payload is None:
+            break
+        try:
+            dp.process_update(Update.de_json(payload, bot))
+        except Exception as e:
+            logger.error(f"[worker] Update {payload.get('update_id')} failed: {e}")
+    dp.stop()
+    store.flush()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_sharded(workers, token=BOT_TOKEN):
+    """Poll in this process and route updates to `workers` processes by user id.
+
+    Routing by user keeps each user's updates in order; the shared store is what lets a
+    user move to another worker when the count changes or a worker restarts.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue() for _ in range(workers)]
+    procs = [ctx.Process(target=shard_worker, args=(token, q), daemon=True) for q in queues]
+    for proc in procs:
+        proc.start()
+    bot = Bot(token, base_url=BASE_URL)
+    bot.delete_webhook()
+    logger.info(f"Bot started with {workers} workers")
+    offset = None
+    # SIGTERM (Render, Procfile) stops the poller like Ctrl+C, through the finally below.
+    previous = signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        while True:
+            try:
+                updates = bot.get_updates(offset=offset, timeout=POLL_TIMEOUT)
+            except NetworkError as e:
+                logger.warning(f"[poller] getUpdates failed: {e}")
+                time.sleep(1)
+                continue
+            for update in updates:
+                offset = update.update_id + 1
+                user = update.effective_user
+                queues[user.id % workers if user else 0].put(update.to_dict())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        for q in queues:
+            q.put(None)
+        for proc in procs:
+            proc.join(timeout=10)
+        store.flush()
 
-    dp.add_handler(CommandHandler("start", start))
-    dp.add_handler(CommandHandler("done", done))
-    dp.add_handler(conv_handler)
-    dp.add_handler(CommandHandler("cancel", cancel))
+def main():
+    if BOT_WORKERS > 1:
+        run_sharded(BOT_WORKERS)
+        return
+    with startup.phase("updater"):
+        updater = Updater(BOT_TOKEN, base_url=BASE_URL, use_context=True, persistence=StorePersistence(store))
+        register_handlers(updater.dispatcher)
 
     updater.start_polling()
+    startup.report()
     logger.info("Bot started")
     updater.idle()
 
@@ -0,0 +1,164 @@
+import io
+import os
+import sys
+import hmac
+import asyncio
+import logging
+
+from aiohttp import web
+from telegram import Update
+
+from metrics import registry
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "templates")
+# Same pages the Flask blueprint in app/routes.py serves.
+PAGES = {"/": "form.html", "/form-test": "form.html"}
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def _page_handler(template):
+    path = os.path.join(TEMPLATE_DIR, template)
+    with open(path, "rb") as f:
+        body = f.read()
+
+    async def handler(request):
+        return web.Response(body=body, content_type="text/html", charset="utf-8")
+
+    return handler
+
+# ========== FLASK BRIDGE ==========
+
+def _wsgi_environ(request, body):
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": request.path,
+        "QUERY_STRING": request.query_string,
+        "SERVER_NAME": request.url.host or "localhost",
+        "SERVER_PORT": str(request.url.port or 80),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "CONTENT_TYPE": request.headers.get("Content-Type", ""),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in request.headers.items():
+        key = "HTTP_" + name.upper().replace("-", "_")
+        if key not in ("HTTP_CONTENT_TYPE", "HTTP_CONTENT_LENGTH"):
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def _call_wsgi(wsgi_app, environ):
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        response["status"], response["headers"] = status, headers
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], b"".join(chunks)
+
+def flask_handler():
+    """aiohttp handler that runs a request through the Flask app (app/routes.py) in a worker thread.
+
+    Lets webhook mode serve every blueprint route (/backtest, /scan, /history, /debug/profiler...)
+    without a second server. Flask is imported on the first forwarded request.
+    """
+    wsgi = []
+
+    async def handler(request):
+        if not wsgi:
+            from app import create_app
+
+            wsgi.append(create_app().wsgi_app)
+        body = await request.read()
+        status, headers, data = await asyncio.to_thread(_call_wsgi, wsgi[0], _wsgi_environ(request, body))
+        headers = [(k, v) for k, v in headers if k.lower() not in ("content-length", "transfer-encoding", "connection")]
+        return web.Response(status=int(status.split()[0]), headers=headers, body=data)
+
+    return handler
+
+# ========== APP ==========
+
+def create_web_app(application, path=WEBHOOK_PATH, secret_token=None):
+    """aiohttp app serving the Mini App pages and feeding Telegram updates to `application`.
+
+    Updates are decoded and put straight on the Application's update queue on this loop.
+    Any other path (including /submit) goes to the Flask blueprint, so webhook mode has the
+    same HTTP API as polling mode.
+    """
+
+    async def webhook(request):
+        if secret_token and not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret_token):
+            return web.Response(status=403)
+        try:
+            payload = await request.json()
+            if not isinstance(payload, dict) or "update_id" not in payload:
+                raise ValueError("not an update")
+            update = Update.de_json(payload, application.bot)
+        except (KeyError, TypeError, ValueError):
+            return web.Response(status=400)
+        await application.update_queue.put(update)
+        return web.Response()
+
+    async def health(request):
+        body = {"status": "ok"}
+        notifier = application.bot_data.get("notifier")
+        if notifier is not None:
+            body["notifier"] = notifier.metrics()
+        return web.json_response(body)
+
+    async def metrics(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    for route, template in PAGES.items():
+        app.router.add_get(route, _page_handler(template))
+    app.router.add_get("/healthz", health)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post(path, webhook)
+    # Registered last: only paths none of the routes above claim reach Flask.
+    app.router.add_route("*", "/{tail:.*}", flask_handler())
+    return app
+
+async def run_webhook(
+    application, host="0.0.0.0", port=8001, public_url=None, path=WEBHOOK_PATH, secret_token=None
+):
+    """Serve pages and the webhook until cancelled.
+
+    With `public_url`, Telegram is told to deliver to public_url + path; without it (local
+    runs with a fake client) no webhook is registered. A public webhook needs a secret
+    shared by every replica (WEBHOOK_SECRET): whichever replica registers last sets the
+    token Telegram sends to all of them.
+    """
+    secret_token = secret_token or os.getenv("WEBHOOK_SECRET")
+    if public_url and not secret_token:
+        raise RuntimeError("WEBHOOK_SECRET must be set (the same on every replica) to register a webhook")
+    runner = web.AppRunner(create_web_app(application, path, secret_token))
+    await runner.setup()
+    await application.initialize()
+    await application.start()
+    try:
+        if public_url:
+            await application.bot.set_webhook(
+                url=public_url.rstrip("/") + path, secret_token=secret_token, drop_pending_updates=False
+            )
+        await web.TCPSite(runner, host, port).start()
+        logging.info(f"[webhook] Serving on {host}:{port}, updates at {path}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await application.stop()
+        await application.shutdown()
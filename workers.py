@@ -0,0 +1,113 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine import last_signals
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+DRAIN_TIMEOUT = 30.0
+
+def default_worker_count():
+    """EVAL_WORKERS env var, else one worker per core."""
+    return int(os.getenv("EVAL_WORKERS") or os.cpu_count() or 1)
+
+# ========== WORKER SIDE ==========
+
+def _evaluate_shared(shm_name, n, strategies):
+    """Runs in a worker: attach to the parent's bar block and evaluate one group."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray((len(FIELDS), n), dtype=np.float64, buffer=shm.buf)
+        bars = {field: block[i] for i, field in enumerate(FIELDS)}
+        hits = last_signals(bars, strategies)
+        del bars, block
+        return hits
+    finally:
+        shm.close()
+
+# ========== PARENT SIDE ==========
+
+class WorkerPool:
+    """Process pool that evaluates (symbol, timeframe) groups across cores.
+
+    Bars go to workers through one shared-memory block per group (5 x n float64, no
+    pickled DataFrames); workers return only the list of user ids whose strategy fired.
+    """
+
+    def __init__(self, workers=None, start_method="spawn"):
+        self.workers = workers or default_worker_count()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(start_method)
+        )
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._closing = False
+
+    def submit(self, bars, strategies):
+        """Queue one group; returns a concurrent Future resolving to the firing user ids."""
+        if self._closing:
+            raise RuntimeError("Worker pool is draining")
+        n = len(bars)
+        shm = shared_memory.SharedMemory(create=True, size=max(len(FIELDS) * n * 8, 1))
+        block = np.ndarray((len(FIELDS), n), dtype=np.float64, buffer=shm.buf)
+        for i, field in enumerate(FIELDS):
+            block[i] = np.asarray(bars[field], dtype=np.float64)
+        del block
+        future = self._executor.submit(_evaluate_shared, shm.name, n, dict(strategies))
+        with self._lock:
+            self._inflight[future] = shm
+        future.add_done_callback(self._release)
+        return future
+
+    async def evaluate(self, bars, strategies):
+        return await asyncio.wrap_future(self.submit(bars, strategies))
+
+    def _release(self, future):
+        with self._lock:
+            shm = self._inflight.pop(future, None)
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    def drain(self, timeout=DRAIN_TIMEOUT):
+        """Stop taking work, let in-flight groups finish (up to `timeout`), then shut down."""
+        if self._closing:
+            return
+        self._closing = True
+        with self._lock:
+            pending = list(self._inflight)
+        if pending:
+            logging.info(f"[workers] Draining {len(pending)} in-flight group(s)")
+            _, not_done = wait(pending, timeout=timeout)
+            for future in not_done:
+                future.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            leftovers = list(self._inflight.values())
+            self._inflight.clear()
+        for shm in leftovers:
+            shm.close()
+            shm.unlink()
+        logging.info("[workers] Worker pool drained")
+
+_pool = None
+
+def get_pool():
+    """Process-wide pool, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = WorkerPool()
+    return _pool
+
+def drain_pool(timeout=DRAIN_TIMEOUT):
+    """Drain the process-wide pool if one was started; safe to call from shutdown handlers."""
+    global _pool
+    if _pool is not None:
+        _pool.drain(timeout)
+        _pool = None